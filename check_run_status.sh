@@ -1,5 +1,14 @@
 #! /bin/bash
 
+if [ "$1" == "--watch" ]; then
+  # Keeps reporting the status of both mixes until every run finished (or Ctrl+C)
+  python3 -m scripts.run_parser "$PWD" "$PWD/mixes/microattack.mix" "$PWD/ae_results/microattack" 3 "$@" &
+  python3 -m scripts.run_parser "$PWD" "$PWD/mixes/microbenign.mix" "$PWD/ae_results/microbenign" 4 "$@" &
+  trap 'kill $(jobs -p) 2>/dev/null' INT TERM
+  wait
+  exit 0
+fi
+
 echo "[INFO] Checking attacker simulations"
 python3 -m scripts.run_parser "$PWD" "$PWD/mixes/microattack.mix" "$PWD/ae_results/microattack" 3
 
@@ -0,0 +1,70 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.trace_format import BINARY_TRACE_MAGIC, make_binary_header, parse_text_trace
+
+def convert_trace(input_path, output_path):
+    with open(input_path, "rb") as f:
+        data = f.read()
+    if data[:len(BINARY_TRACE_MAGIC)] == BINARY_TRACE_MAGIC:
+        raise ValueError("already a binary trace")
+    records = parse_text_trace(data)
+    if len(records) == 0:
+        raise ValueError("empty trace")
+    header = make_binary_header(len(records))
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(records.tobytes())
+    os.replace(tmp_path, output_path)
+    return len(records)
+
+def convert_trace_job(input_path, output_path):
+    try:
+        return input_path, convert_trace(input_path, output_path), None
+    except (OSError, ValueError) as e:
+        return input_path, 0, str(e)
+
+def get_trace_jobs(input_dir, output_dir, traces, force):
+    jobs = []
+    for trace in traces:
+        input_path = f"{input_dir}/{trace}"
+        output_path = f"{output_dir}/{trace}"
+        if not force and os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path):
+            continue
+        jobs.append((input_path, output_path))
+    return jobs
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="ConvertTraces",
+        description="Convert text CPU traces into the binary trace format that the simulator memory-maps"
+    )
+    argparser.add_argument("input_dir", help="directory of the text traces (e.g., cputraces)")
+    argparser.add_argument("output_dir", help="directory to write the binary traces to, with the same file names (e.g., cputraces_bin)")
+    argparser.add_argument("-t", "--traces", nargs="*", help="trace names to convert (default: every file in input_dir except .csv and .sqlite files)")
+    argparser.add_argument("-j", "--jobs", type=int, default=None, help="number of traces converted in parallel (default: number of CPU cores)")
+    argparser.add_argument("-f", "--force", action="store_true", help="convert traces even if the binary trace is up to date")
+    args = argparser.parse_args()
+
+    traces = args.traces
+    if traces is None:
+        traces = sorted(name for name in os.listdir(args.input_dir)
+                        if os.path.isfile(f"{args.input_dir}/{name}") and not name.endswith((".csv", ".sqlite")))
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = get_trace_jobs(args.input_dir, args.output_dir, traces, args.force)
+    print(f"[INFO] Converting {len(jobs)} traces ({len(traces) - len(jobs)} up to date)")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(convert_trace_job, input_path, output_path) for input_path, output_path in jobs]
+        for future in futures:
+            input_path, num_insts, error = future.result()
+            if error is None:
+                print(f"[INFO] Converted {input_path} ({num_insts} instructions)")
+            else:
+                print(f"[ERR] Could not convert {input_path}: {error}")
+                failed += 1
+    if failed > 0:
+        exit(1)
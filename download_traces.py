@@ -1,5 +1,344 @@
-import wget
+import io
+import os
+import re
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import tarfile
+import argparse
+import threading
+import http.client
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
-url = 'https://zenodo.org/records/13293692/files/cputraces.tar.gz?download=1'
+TRACE_URL = "https://zenodo.org/records/13293692/files/cputraces.tar.gz?download=1"
+ARCHIVE_NAME = "cputraces.tar.gz"
 
-wget.download(url, 'cputraces.tar.gz')
\ No newline at end of file
+# Zenodo publishes the checksum of every record file, which is verified when no checksum is given
+ZENODO_FILE_REGEX = re.compile(r"^https://zenodo\.org/records/(\d+)/files/([^?]+)")
+ZENODO_RECORD_API = "https://zenodo.org/api/records/{record}"
+
+# Byte ranges are downloaded in order, so the archive can be extracted while the later ranges are still downloading
+RANGE_SIZE = 64 << 20
+READ_SIZE = 1 << 20
+STATE_SAVE_INTERVAL = 64 << 20
+PROGRESS_INTERVAL = 256 << 20
+MAX_RETRIES = 5
+TIMEOUT = 60
+
+def get_local_path(url):
+    # file:// URLs and plain paths are read directly (e.g., a mirror on a shared file system or an offline test archive)
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == "file":
+        return urllib.request.url2pathname(parsed.path)
+    if parsed.scheme == "":
+        return url
+    return None
+
+def get_source_info(url):
+    # Returns (size, supports_ranges), size is None if the server does not report it
+    local_path = get_local_path(url)
+    if local_path is not None:
+        return os.path.getsize(local_path), True
+    request = urllib.request.Request(url, headers={"Range": "bytes=0-0"})
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        if response.status == 206:
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if total.isdigit():
+                return int(total), True
+        size = response.headers.get("Content-Length")
+        return (int(size) if response.status == 200 and size is not None else None), False
+
+def open_source(url, start, end):
+    # Opens the byte range [start, end) of the source, end=None reads until the end of the source
+    local_path = get_local_path(url)
+    if local_path is not None:
+        f = open(local_path, "rb")
+        f.seek(start)
+        return f
+    headers = {}
+    if start > 0 or end is not None:
+        headers["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+    response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=TIMEOUT)
+    if "Range" in headers and response.status != 206:
+        response.close()
+        raise OSError(f"{url} does not support range requests")
+    return response
+
+def parse_checksum(checksum):
+    algorithm, _, digest = checksum.partition(":")
+    if digest == "" or algorithm.lower() not in hashlib.algorithms_available:
+        raise ValueError(f"checksum '{checksum}' is not of the form <algorithm>:<hex digest>")
+    return algorithm.lower(), digest.lower()
+
+def get_zenodo_checksum(url):
+    match = ZENODO_FILE_REGEX.match(url)
+    if match is None:
+        return None
+    try:
+        with urllib.request.urlopen(ZENODO_RECORD_API.format(record=match.group(1)), timeout=TIMEOUT) as response:
+            record = json.load(response)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Could not fetch the checksum from Zenodo: {e}")
+        return None
+    filename = urllib.parse.unquote(match.group(2))
+    for file in record.get("files", []):
+        if file.get("key") == filename and "checksum" in file:
+            return parse_checksum(file["checksum"])
+    return None
+
+def get_state_path(archive_path):
+    return f"{archive_path}.state"
+
+class RangeDownload:
+    # Downloads the source into a preallocated file in parallel byte ranges. The progress of every range is saved to
+    # a state file so an interrupted download resumes, and readers wait for the downloaded prefix of the file.
+    def __init__(self, url, path, size, supports_ranges):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.supports_ranges = supports_ranges
+        self.state_path = get_state_path(path)
+        self.ranges = self.load_state()
+        self.file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        if size is not None:
+            self.file.truncate(size)
+        self.cond = threading.Condition()
+        self.num_finished = 0
+        self.error = None
+        self.aborted = False
+        self.unsaved = 0
+        self.downloaded = sum(done for _, _, done in self.ranges)
+        self.next_progress = self.downloaded + PROGRESS_INTERVAL
+
+    def load_state(self):
+        # Each range is [start, end, downloaded bytes], a state saved for a different source starts from scratch
+        if self.supports_ranges and os.path.exists(self.state_path) and os.path.exists(self.path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state["url"] == self.url and state["size"] == self.size:
+                return state["ranges"]
+        if not self.supports_ranges:
+            return [[0, self.size, 0]]
+        return [[start, min(start + RANGE_SIZE, self.size), 0] for start in range(0, self.size, RANGE_SIZE)]
+
+    def save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"url": self.url, "size": self.size, "ranges": self.ranges}, f)
+        os.replace(tmp_path, self.state_path)
+        self.unsaved = 0
+
+    def available(self):
+        # End of the contiguous downloaded prefix
+        end = 0
+        for start, range_end, done in self.ranges:
+            end = start + done
+            if range_end is None or start + done < range_end:
+                break
+        return end
+
+    def write(self, index, offset, data):
+        os.pwrite(self.file.fileno(), data, offset)
+        with self.cond:
+            self.ranges[index][2] += len(data)
+            self.downloaded += len(data)
+            self.unsaved += len(data)
+            if self.unsaved >= STATE_SAVE_INTERVAL and self.supports_ranges:
+                self.save_state()
+            if self.downloaded >= self.next_progress:
+                total = f"/{self.size >> 20}" if self.size is not None else ""
+                print(f"[INFO] Downloaded {self.downloaded >> 20}{total} MiB")
+                self.next_progress += PROGRESS_INTERVAL
+            self.cond.notify_all()
+
+    def download_range(self, index):
+        start, end, _ = self.ranges[index]
+        for attempt in range(MAX_RETRIES):
+            if self.aborted:
+                return
+            if not self.supports_ranges:
+                # A source without range requests can only be downloaded again from the beginning
+                with self.cond:
+                    self.downloaded -= self.ranges[index][2]
+                    self.ranges[index][2] = 0
+            done = self.ranges[index][2]
+            if end is not None and start + done >= end:
+                return
+            try:
+                with open_source(self.url, start + done, end if self.supports_ranges else None) as source:
+                    while not self.aborted:
+                        data = source.read(READ_SIZE if end is None else min(READ_SIZE, end - start - done))
+                        if not data:
+                            break
+                        self.write(index, start + done, data)
+                        done += len(data)
+                if self.aborted or end is None or start + done >= end:
+                    return
+                raise OSError(f"connection closed after {done} of {end - start} bytes")
+            except (OSError, http.client.HTTPException) as e:
+                print(f"[WARN] Download of bytes {start + done}-{end} failed (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
+                time.sleep(2 ** attempt)
+        raise OSError(f"could not download bytes {start}-{end} after {MAX_RETRIES} attempts")
+
+    def run_range(self, index):
+        try:
+            self.download_range(index)
+        except Exception as e:
+            with self.cond:
+                self.error = self.error or e
+        finally:
+            with self.cond:
+                self.num_finished += 1
+                self.cond.notify_all()
+
+    def start(self, executor):
+        for index in range(len(self.ranges)):
+            executor.submit(self.run_range, index)
+
+    def read_at(self, offset, size):
+        # Blocks until bytes after offset are downloaded, returns an empty buffer at the end of the source
+        with self.cond:
+            while True:
+                if self.error is not None:
+                    raise self.error
+                available = self.available()
+                if available > offset or self.num_finished == len(self.ranges):
+                    break
+                self.cond.wait()
+        size = min(size, available - offset)
+        return os.pread(self.file.fileno(), size, offset) if size > 0 else b""
+
+    def abort(self):
+        self.aborted = True
+
+    def close(self, completed):
+        if self.supports_ranges and not completed:
+            with self.cond:
+                self.save_state()
+        self.file.close()
+        if completed and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+class HashingReader(io.RawIOBase):
+    # Sequential file object over read_at(offset, size) that hashes every byte read through it
+    def __init__(self, read_at, digest):
+        self.read_at = read_at
+        self.digest = digest
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.read_at(self.offset, len(buffer))
+        buffer[:len(data)] = data
+        self.offset += len(data)
+        self.digest.update(data)
+        return len(data)
+
+def merge_tree(src_dir, dst_dir):
+    os.makedirs(dst_dir, exist_ok=True)
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            dst_path = f"{dst_dir}/{entry.name}"
+            if entry.is_dir(follow_symlinks=False) and os.path.isdir(dst_path) and not os.path.islink(dst_path):
+                merge_tree(entry.path, dst_path)
+            else:
+                os.replace(entry.path, dst_path)
+    os.rmdir(src_dir)
+
+def extract_verified(read_at, output_dir, checksum):
+    # Extracts the archive while it is being read into a staging directory that is moved into place only after the
+    # checksum matches, so a corrupted archive never leaves partially extracted traces behind
+    algorithm, expected = checksum if checksum is not None else ("sha256", None)
+    reader = HashingReader(read_at, hashlib.new(algorithm))
+    staging_dir = f"{output_dir}/.{ARCHIVE_NAME}.extract"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    try:
+        with tarfile.open(fileobj=reader, mode="r|*") as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(staging_dir, filter="data")
+            else:
+                tar.extractall(staging_dir)
+        while reader.read(READ_SIZE):
+            pass
+        digest = reader.digest.hexdigest()
+        if expected is not None and digest != expected:
+            raise ValueError(f"{algorithm} checksum mismatch (expected {expected}, got {digest})")
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    merge_tree(staging_dir, output_dir)
+    return algorithm, digest
+
+def discard_archive(archive_path):
+    for path in [archive_path, get_state_path(archive_path)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+def acquire_traces(url, output_dir, cache_dir, checksum, jobs):
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    archive_path = f"{cache_dir}/{ARCHIVE_NAME}"
+    # Nodes sharing a cache directory wait for the one that downloads the archive and then extract the cached copy
+    with open(f"{archive_path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(archive_path) and not os.path.exists(get_state_path(archive_path)):
+            print(f"[INFO] Extracting the cached archive {archive_path} into {output_dir}")
+            try:
+                with open(archive_path, "rb") as f:
+                    return extract_verified(lambda offset, size: os.pread(f.fileno(), size, offset), output_dir, checksum)
+            except (ValueError, tarfile.TarError) as e:
+                print(f"[WARN] Discarding the cached archive: {e}")
+                discard_archive(archive_path)
+
+        size, supports_ranges = get_source_info(url)
+        download = RangeDownload(url, archive_path, size, supports_ranges)
+        mode = f"{len(download.ranges)} ranges over {jobs} connections" if supports_ranges else "a single connection"
+        resumed = f", resuming after {download.downloaded >> 20} MiB" if download.downloaded > 0 else ""
+        print(f"[INFO] Downloading {url} to {archive_path} with {mode}{resumed} and extracting it into {output_dir}")
+        completed = False
+        try:
+            with ThreadPoolExecutor(max_workers=jobs if supports_ranges else 1) as executor:
+                download.start(executor)
+                try:
+                    result = extract_verified(download.read_at, output_dir, checksum)
+                    completed = True
+                except BaseException:
+                    download.abort()
+                    raise
+        except (ValueError, tarfile.TarError):
+            download.close(completed=True)
+            discard_archive(archive_path)
+            raise
+        finally:
+            if not download.file.closed:
+                download.close(completed)
+        return result
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="DownloadTraces",
+        description="Download the CPU traces and extract them while the download progresses"
+    )
+    argparser.add_argument("-u", "--url", default=TRACE_URL, help="source of the trace archive, an http(s) URL, a file:// URL or a local path (e.g., a mirror)")
+    argparser.add_argument("-o", "--output_dir", default=".", help="directory to extract the archive into (default: current directory)")
+    argparser.add_argument("-c", "--cache_dir", default=".", help="directory that keeps the downloaded archive, reused by later invocations (e.g., a directory shared by all nodes)")
+    argparser.add_argument("-s", "--checksum", default=None, help="expected checksum of the archive as <algorithm>:<hex digest> (default: the checksum published by Zenodo)")
+    argparser.add_argument("-j", "--jobs", type=int, default=8, help="number of parallel connections")
+    args = argparser.parse_args()
+
+    checksum = parse_checksum(args.checksum) if args.checksum is not None else get_zenodo_checksum(args.url)
+    try:
+        algorithm, digest = acquire_traces(args.url, args.output_dir.rstrip("/"), args.cache_dir.rstrip("/"), checksum, args.jobs)
+    except (OSError, ValueError, tarfile.TarError) as e:
+        print(f"[ERR] Could not acquire the traces: {e}")
+        exit(1)
+    if checksum is None:
+        print(f"[WARN] No checksum to verify against, the {algorithm} checksum of the archive is {digest}")
+    else:
+        print(f"[INFO] Verified the {algorithm} checksum of the archive")
@@ -1,9 +1,12 @@
 import os
+import sys
 import time
 import argparse
-from concurrent.futures import ThreadPoolExecutor
 
 from scripts.run_config import *
+from scripts.local_runner import run_local, get_ledger_path
+from scripts.job_cost import sort_longest_first
+from scripts.slurm_array import get_array_slots, get_queued_tasks
 
 argparser = argparse.ArgumentParser(
     prog="ExecuteRunScript",
@@ -11,16 +14,37 @@ argparser = argparse.ArgumentParser(
 )
 
 argparser.add_argument("-s", "--slurm", action="store_true")
+argparser.add_argument("-rs", "--run_script", default="run.sh")
+argparser.add_argument("-j", "--jobs", type=int, default=PERSONAL_RUN_THREADS)
+argparser.add_argument("-t", "--timeout", type=float, default=PERSONAL_RUN_TIMEOUT)
+argparser.add_argument("-r", "--retries", type=int, default=PERSONAL_RUN_RETRIES)
+argparser.add_argument("-m", "--min_free_mem_gb", type=float, default=PERSONAL_RUN_MIN_FREE_MEM_GB)
+argparser.add_argument("-tc", "--trace_combination")
+argparser.add_argument("--no_reorder", action="store_true")
 
 args = argparser.parse_args()
 
 SLURM = args.slurm
+RUN_SCRIPT = args.run_script
 
 def check_running_jobs():
-    return int(os.popen(f"squeue -u {SLURM_USERNAME} -h | wc -l").read())
+    # Pending tasks of job arrays count one by one, so arrays of earlier run scripts (e.g., the other mix) hold back new jobs
+    return get_queued_tasks()
 
 def run_slurm(commands):
+    # The arrays of a run script split MAX_SLURM_JOBS between them (see slurm_array.py), so they are submitted together
+    # once they fit next to the tasks the user already has queued or running
+    array_cmds = [cmd for cmd in commands if get_array_slots(cmd) is not None]
+    array_slots = min(MAX_SLURM_JOBS, sum(get_array_slots(cmd) for cmd in array_cmds))
+    while len(array_cmds) > 0 and check_running_jobs() + array_slots > MAX_SLURM_JOBS:
+        print(f"[INFO] Maximum Slurm Job limit ({MAX_SLURM_JOBS}) reached. Retrying in {SLURM_RETRY_DELAY} seconds")
+        time.sleep(SLURM_RETRY_DELAY)
+    for cmd in array_cmds:
+        os.system(cmd)
+        time.sleep(SLURM_SUBMIT_DELAY)
     for cmd in commands:
+        if get_array_slots(cmd) is not None:
+            continue
         while check_running_jobs() >= MAX_SLURM_JOBS:
             print(f"[INFO] Maximum Slurm Job limit ({MAX_SLURM_JOBS}) reached. Retrying in {SLURM_RETRY_DELAY} seconds")
             time.sleep(SLURM_RETRY_DELAY)
@@ -28,16 +52,20 @@ def run_slurm(commands):
         time.sleep(SLURM_SUBMIT_DELAY)
 
 def run_personal(commands):
-    with ThreadPoolExecutor(max_workers=PERSONAL_RUN_THREADS) as executor:
-        def run_command(cmd):
-            os.system(f"echo \"Running: {cmd}\"")
-            os.system(cmd)
-        executor.map(run_command, commands)
+    failed_cmds = run_local(commands, args.jobs, args.timeout, args.retries, args.min_free_mem_gb, get_ledger_path(RUN_SCRIPT))
+    if len(failed_cmds) > 0:
+        print(f"[ERR] {len(failed_cmds)} simulations failed. See {get_ledger_path(RUN_SCRIPT)} for their exit codes")
+        sys.exit(1)
 
 if __name__ == "__main__":
     lines = []
-    with open("run.sh", "r") as f:
+    with open(RUN_SCRIPT, "r") as f:
         lines = [l.strip() for l in f.readlines()]
+    lines = [l for l in lines if len(l) > 0 and not l.startswith("#")]
+
+    if not args.no_reorder:
+        print("[INFO] Ordering simulations longest-first by predicted runtime")
+        lines = sort_longest_first(lines, args.trace_combination, get_ledger_path(RUN_SCRIPT))
     
     if SLURM:
         run_slurm(lines)
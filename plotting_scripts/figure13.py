@@ -1,4 +1,3 @@
-import pandas as pd 
 import seaborn as sns 
 import matplotlib.pyplot as plt
 import matplotlib.lines as mlines
@@ -18,23 +17,28 @@ TRACE_COMBINATION_NAME = "microbenign"
 TRACE_COMBINATION_FILE = f"{TRACE_COMBINATION_DIR}/{TRACE_COMBINATION_NAME}.mix"
 CSV_DIR = f"{RESULT_DIR}/{TRACE_COMBINATION_NAME}/_csvs"
 
-def plot_figure13(csv_dir):
-    def get_path(name):
-        return f"{csv_dir}/{name}"
-
-    PLOT_NRH = 64
-    NS_PER_CYCLE = 0.234
-    SHORT_NAME = "BH"
-
-    df = pd.read_csv(get_path("multicore_mem.csv"))
+def make_figure13_df(csv_dir, plot_tRH, ns_per_cycle, short_name):
+    df = read_result_df(csv_dir, "multicore_mem_summary", categorical=False)
     df = df[(df.mitigation != "BlockHammer")]
-    df = df[(df.tRH == PLOT_NRH) | (df.mitigation == "Dummy")]
+    df = df[(df.tRH == plot_tRH) | (df.mitigation == "Dummy")]
     df["_mitigation"] = df["mitigation"].copy()
     df["_mitigation"] = df["_mitigation"].replace({"Dummy": "Baseline", "TWiCe-Ideal": "TWiCe"})
     df["_thresh_type"] = df["thresh_type"].copy()
-    df["_thresh_type"] = df["_thresh_type"].replace({"NONE": "", "MEAN": f"+{SHORT_NAME}"})
+    df["_thresh_type"] = df["_thresh_type"].replace({"NONE": "", "MEAN": f"+{short_name}"})
     df["configstr"] = df["_mitigation"] + df["_thresh_type"]
-    df["pN_val"] = df["pN_val"] * NS_PER_CYCLE
+    # Baseline rows of different thresholds fall into the same configstr, so the means are weighted by their sample counts
+    df["pN_sum"] = df["pN_mean"] * df["pN_count"]
+    df = df.groupby(["mitigation", "configstr", "pN_key"])[["pN_sum", "pN_count"]].sum().reset_index()
+    df["pN_val"] = df["pN_sum"] / df["pN_count"] * ns_per_cycle
+    return df
+
+def plot_figure13(csv_dir):
+    PLOT_NRH = 64
+    NS_PER_CYCLE = 0.234
+    SHORT_NAME = "BH"
+
+    df = cached_df_setup(csv_dir, "figure13", [get_result_path(csv_dir, "multicore_mem_summary")], (PLOT_NRH, NS_PER_CYCLE, SHORT_NAME),
+                lambda: make_figure13_df(csv_dir, PLOT_NRH, NS_PER_CYCLE, SHORT_NAME))
 
     mitigations = list(set(df.mitigation.unique()) - set(["Dummy", "TWiCe-Ideal"])) + ["TWiCe"]
 
@@ -66,7 +70,7 @@ def plot_figure13(csv_dir):
         hue_order = [mech, f"{mech}+{SHORT_NAME}", "Baseline"]
 
         sns.lineplot(data=plot_df, x="pN_key", y="pN_val", hue="configstr",
-                    hue_order=hue_order, palette=colors, ax=ax, linewidth=2, errorbar=('ci', 0))
+                    hue_order=hue_order, palette=colors, ax=ax, linewidth=2, errorbar=None)
 
         lines = ax.get_lines()
 
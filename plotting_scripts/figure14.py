@@ -1,4 +1,3 @@
-import pandas as pd 
 import seaborn as sns 
 import matplotlib.pyplot as plt
 import matplotlib.lines as mlines
@@ -10,19 +9,21 @@ TRACE_COMBINATION_NAME = "microattack"
 TRACE_COMBINATION_FILE = f"{TRACE_COMBINATION_DIR}/{TRACE_COMBINATION_NAME}.mix"
 CSV_DIR = f"{RESULT_DIR}/{TRACE_COMBINATION_NAME}/_csvs"
 
-def plot_figure14(csv_dir):
-    def get_path(name):
-        return f"{csv_dir}/{name}"
-
-    metric = "weighted_speedup"
-
-    df = pd.read_csv(get_path('merged.csv'))
+def make_figure14_df(csv_dir):
+    df = read_result_df(csv_dir, 'merged', categorical=False)
     df["mitigation"] = df["mitigation"].replace({"Dummy": "No Mitigation", "TWiCe-Ideal": "TWiCe"})
     df["thresh_type"] = df["thresh_type"].replace({"NONE": "", "MEAN": f"+BH"})
     df["configstr"] = df["mitigation"] + df["thresh_type"]
     df["itRH"] = 1 / df["tRH"]
 
     df = df[df.mitigation.isin(["BlockHammer", "AQUA", "PARA", "RFM"])]
+    return df
+
+def plot_figure14(csv_dir):
+    metric = "weighted_speedup"
+
+    df = cached_df_setup(csv_dir, "figure14", [get_result_path(csv_dir, "merged")], (),
+                lambda: make_figure14_df(csv_dir))
 
     fig, ax = plt.subplots(1,1, figsize=(6, 1.5))
 
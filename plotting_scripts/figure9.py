@@ -4,11 +4,8 @@ import matplotlib.pyplot as plt
 
 from plot_setup import *
 
-def plot_figure9(csv_dir):
-    def get_path(name):
-        return f"{csv_dir}/{name}"
-
-    df = pd.read_csv(get_path('multicore.csv'))
+def make_figure9_df(csv_dir):
+    df = read_result_df(csv_dir, 'multicore', categorical=False)
     df["mitigative_action_cnt"] = df["VRR"] + df["RFM"] + df["RRS_reswap"] + df["RRS_unswap"] + df["RRS_swap"] +\
                                 df["AQUA_migrate"] + df["AQUA_r_migrate"]
     df["mitigation"] = df["mitigation"].replace({"Dummy": "No Mitigation", "TWiCe-Ideal": "TWiCe"})
@@ -24,9 +21,11 @@ def plot_figure9(csv_dir):
         # mitdf.to_csv(f"mitcheck_{mitigation}.csv")
         dfs.append(mitdf[mitdf.norm_mitigative_action_cnt > 0])
         
-    df = pd.concat(dfs)
-    df[["tRH", "trace", "norm_mitigative_action_cnt", "configstr"]]
-    df[df["configstr"].str.contains("RRS")]
+    return pd.concat(dfs)
+
+def plot_figure9(csv_dir):
+    df = cached_df_setup(csv_dir, "figure9", [get_result_path(csv_dir, "multicore")], (),
+                lambda: make_figure9_df(csv_dir))
 
     DIM_X = 3
     DIM_Y = 2
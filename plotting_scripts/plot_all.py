@@ -1,3 +1,11 @@
+import time
+import traceback
+import matplotlib
+# Figures are only saved to files, so every process renders with the non-interactive backend
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+
 from figure2 import plot_figure2
 from figure7 import plot_figure7
 from figure8 import plot_figure8
@@ -10,39 +18,59 @@ from figure14 import plot_figure14
 
 from plot_setup import *
 
-def plot_all_figures():
+def render_figure(name, plot_func, plot_arg):
+    start = time.time()
+    error = None
+    try:
+        plot_func(plot_arg)
+    except Exception:
+        error = traceback.format_exc()
+    plt.close("all")
+    return name, time.time() - start, error
+
+def get_figure_jobs(atk_df, ben_df):
+    return [
+        ("Figure13", plot_figure13, f"{RESULT_DIR}/microbenign/_csvs"),
+        ("Figure2", plot_figure2, ben_df),
+        ("Figure7", plot_figure7, atk_df),
+        ("Figure8", plot_figure8, atk_df),
+        ("Figure9", plot_figure9, f"{RESULT_DIR}/microattack/_csvs"),
+        ("Figure10", plot_figure10, atk_df),
+        ("Figure11", plot_figure11, ben_df),
+        ("Figure12", plot_figure12, ben_df),
+        ("Figure14", plot_figure14, f"{RESULT_DIR}/microattack/_csvs")
+    ]
+
+def plot_all_figures(jobs=PLOT_JOBS):
     print(f"[INFO] Reading attacker data")
     atk_df = general_df_setup(f"{RESULT_DIR}/microattack/_csvs", TRACE_DIR, f"{TRACE_COMBINATION_DIR}/microattack.mix", 4)
     print(f"[INFO] Reading benign data")
     ben_df = general_df_setup(f"{RESULT_DIR}/microbenign/_csvs", TRACE_DIR, f"{TRACE_COMBINATION_DIR}/microbenign.mix", 4)
 
-    print(f"[INFO] Generating Figure2")
-    plot_figure2(ben_df.copy())
-    print(f"[INFO] Generated Figure2 to {PLOT_DIR}/figure2.pdf")
-    print(f"[INFO] Generating Figure7")
-    plot_figure7(atk_df.copy())
-    print(f"[INFO] Generated Figure7 to {PLOT_DIR}/figure7.pdf")
-    print(f"[INFO] Generating Figure8")
-    plot_figure8(atk_df.copy())
-    print(f"[INFO] Generated Figure8 to {PLOT_DIR}/figure8.pdf")
-    print(f"[INFO] Generating Figure9")
-    plot_figure9(f"{RESULT_DIR}/microattack/_csvs")
-    print(f"[INFO] Generated Figure9 to {PLOT_DIR}/figure9.pdf")
-    print(f"[INFO] Generating Figure10")
-    plot_figure10(atk_df.copy())
-    print(f"[INFO] Generated Figure10 to {PLOT_DIR}/figure10.pdf")
-    print(f"[INFO] Generating Figure11")
-    plot_figure11(ben_df.copy())
-    print(f"[INFO] Generated Figure11 to {PLOT_DIR}/figure11.pdf")
-    print(f"[INFO] Generating Figure12")
-    plot_figure12(ben_df.copy())
-    print(f"[INFO] Generated Figure12 to {PLOT_DIR}/figure12.pdf")
-    print(f"[INFO] Generating Figure13 (This might take a while, e.g., >3 mins)")
-    plot_figure13(f"{RESULT_DIR}/microbenign/_csvs")
-    print(f"[INFO] Generated Figure13 to {PLOT_DIR}/figure13.pdf")
-    print(f"[INFO] Generating Figure14")
-    plot_figure14(f"{RESULT_DIR}/microattack/_csvs")
-    print(f"[INFO] Generated Figure14 to {PLOT_DIR}/figure14.pdf")
+    figure_jobs = get_figure_jobs(atk_df, ben_df)
+    start = time.time()
+    results = []
+    if jobs == 1:
+        for name, plot_func, plot_arg in figure_jobs:
+            print(f"[INFO] Generating {name}")
+            results.append(render_figure(name, plot_func, plot_arg.copy() if isinstance(plot_arg, pd.DataFrame) else plot_arg))
+    else:
+        # Each worker receives a pickled copy of the preprocessed frame its figure needs
+        print(f"[INFO] Generating {len(figure_jobs)} figures in parallel")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(render_figure, name, plot_func, plot_arg) for name, plot_func, plot_arg in figure_jobs]
+            results = [future.result() for future in futures]
+
+    failed = []
+    for name, duration, error in sorted(results, key=lambda result: int(result[0][len("Figure"):])):
+        if error is None:
+            print(f"[INFO] Generated {name} to {PLOT_DIR}/{name.lower()}.pdf in {duration:.1f}s")
+        else:
+            print(f"[ERR] Failed to generate {name} after {duration:.1f}s:\n{error}")
+            failed.append(name)
+    print(f"[INFO] Generated {len(results) - len(failed)}/{len(results)} figures in {time.time() - start:.1f}s")
+    return failed
 
 if __name__ == "__main__":
-    plot_all_figures()
\ No newline at end of file
+    if len(plot_all_figures()) > 0:
+        sys.exit(1)
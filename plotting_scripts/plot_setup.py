@@ -1,4 +1,7 @@
 import os
+import sys
+import pickle
+import hashlib
 import argparse
 import warnings
 import pandas as pd
@@ -6,6 +9,10 @@ import colorsys
 from pandas.errors import SettingWithCopyWarning
 from scipy.stats import gmean
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.result_io import read_result_df, get_result_path
+from scripts.trace_profile import get_profile_df
+
 warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=UserWarning)
 warnings.simplefilter(action='ignore', category=SettingWithCopyWarning)
@@ -19,6 +26,8 @@ argparser.add_argument("-wd", "--working_directory")
 argparser.add_argument("-tc", "--trace_combination")
 argparser.add_argument("-td", "--trace_directory")
 argparser.add_argument("-rd", "--result_directory")
+argparser.add_argument("-nc", "--no_cache", action="store_true")
+argparser.add_argument("-j", "--jobs", type=int, default=None)
 
 args = argparser.parse_args()
 
@@ -27,15 +36,74 @@ TRACE_COMBINATION_DIR = args.trace_combination
 TRACE_DIR = args.trace_directory
 RESULT_DIR = args.result_directory
 PLOT_DIR = f"{RESULT_DIR}/_plots"
+USE_PLOT_CACHE = not args.no_cache
+
+# Number of worker processes rendering figures in plot_all.py (None uses all available CPU cores, 1 renders serially)
+PLOT_JOBS = args.jobs
+
+# Preprocessed frames are cached next to the parsed results, bump the version whenever a setup function changes
+PLOT_CACHE_DIR_NAME = "_plot_cache"
+PLOT_CACHE_VERSION = 3
+HASH_CHUNK_SIZE = 1 << 20
 
 if not os.path.exists(PLOT_DIR):
     os.makedirs(PLOT_DIR)
 
+def get_file_hash(path):
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def get_cache_key(input_files, params):
+    cache_key = hashlib.sha256(f"{PLOT_CACHE_VERSION}:{params!r}".encode())
+    for path in input_files:
+        cache_key.update(get_file_hash(path).encode())
+    return cache_key.hexdigest()
+
+def cached_df_setup(csv_dir, name, input_files, params, setup_func):
+    # Returns setup_func()'s frame, recomputing it only when an input file's content or the parameters change
+    if not USE_PLOT_CACHE:
+        return setup_func()
+    cache_dir = f"{csv_dir}/{PLOT_CACHE_DIR_NAME}"
+    cache_file = f"{cache_dir}/{name}.pkl"
+    cache_key = get_cache_key(input_files, params)
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                cached_key, df = pickle.load(f)
+            if cached_key == cache_key:
+                return df
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            pass
+    df = setup_func()
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        pickle.dump((cache_key, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+    return df
+
+ATTACKER_TRACES = ["atk1.trace", "atkrfm.trace", "atkrfm2.trace", "atkrfm8K.trace"]
+
+def get_mpki_df(trace_dir, trace_comb_file, num_cores):
+    # Simulated MPKI values in {trace_dir}/mpki.csv take precedence, otherwise the MPKI is estimated from the traces
+    mpki_file = f"{trace_dir}/mpki.csv"
+    if os.path.exists(mpki_file):
+        return pd.read_csv(mpki_file)
+    wldf = pd.read_csv(trace_comb_file, sep=',', header=None)
+    traces = sorted(set(wldf.iloc[:, 2:2 + num_cores].values.ravel()) - set(ATTACKER_TRACES))
+    return get_profile_df(trace_dir, traces)[["benchmark", "MPKI"]]
+
 def general_df_setup(csv_dir, trace_dir, trace_comb_file, num_cores):
-    def get_path(name):
-        return f"{csv_dir}/{name}"
+    mpkidf = get_mpki_df(trace_dir, trace_comb_file, num_cores)
+    input_files = [get_result_path(csv_dir, "merged"), trace_comb_file]
+    return cached_df_setup(csv_dir, "general", input_files, (num_cores, mpkidf.to_csv(index=False)),
+                lambda: make_general_df(csv_dir, mpkidf, trace_comb_file, num_cores))
 
-    mpkidf = pd.read_csv(f"{trace_dir}/mpki.csv")
+def make_general_df(csv_dir, mpkidf, trace_comb_file, num_cores):
     mpkidf = mpkidf[mpkidf.benchmark != 'gups']
 
     mpkidf = mpkidf.sort_values(by=['MPKI'], ascending=[False])
@@ -47,26 +115,14 @@ def general_df_setup(csv_dir, trace_dir, trace_comb_file, num_cores):
     mi_mpkidf["label"] = "M"
     lo_mpkidf["label"] = "L"
 
-    attackers = ["atk1.trace", "atkrfm.trace", "atkrfm2.trace", "atkrfm8K.trace"]
     mpkidf = pd.concat([hi_mpkidf, mi_mpkidf, lo_mpkidf, pd.DataFrame({
-        "benchmark": attackers,
-        "label": ["A"] * len(attackers),
-        "MPKI":[0] * len(attackers)
+        "benchmark": ATTACKER_TRACES,
+        "label": ["A"] * len(ATTACKER_TRACES),
+        "MPKI":[0] * len(ATTACKER_TRACES)
     })])
 
-    def label_touch(row):
-        cnts = {"H":0, "M":0, "L":0, "A":0}
-        for i in range(num_cores): 
-            cnts[row[f"label_core{i}"]] += 1
-        label = ""
-        for category in ["H", "M", "L", "A"]:
-            for i in range(cnts[category]):
-                label += category
-        row["label"] = label
-        return row 
-
     core_list = [f"core{i}" for i in range(num_cores)]
-    df = pd.read_csv(get_path('merged.csv'))
+    df = read_result_df(csv_dir, 'merged', categorical=False)
     name_list = ["trace", "w"] + core_list
     wldf = pd.read_csv(trace_comb_file, sep=',', header=None, names=name_list)
 
@@ -82,7 +138,11 @@ def general_df_setup(csv_dir, trace_dir, trace_comb_file, num_cores):
     df["MPKI"] = 0
     for i in range(num_cores):
         df["MPKI"] += df[f"MPKI_core{i}"]
-    df = df.apply(lambda row: label_touch(row), axis=1)
+    # Workload label lists the per-core intensities in H, M, L, A order (e.g., HHMA)
+    label_df = df[[f"label_core{i}" for i in range(num_cores)]]
+    df["label"] = ""
+    for category in ["H", "M", "L", "A"]:
+        df["label"] += pd.Series(category, index=df.index).str.repeat((label_df == category).sum(axis=1))
 
     df["mitigation"] = df["mitigation"].replace({"Dummy": "No Mitigation", "TWiCe-Ideal": "TWiCe"})
     base_df = df[df.thresh_type == "NONE"]
@@ -104,20 +164,14 @@ def general_df_setup(csv_dir, trace_dir, trace_comb_file, num_cores):
 
     df = df.sort_values(by="MPKI", ascending=False)
 
-    gmeans = []
-    for (configstr, tRH), subdf in df.groupby(['configstr', 'tRH']):
-        gmeans.append({
-            'label': 'geomean',
-            'MPKI': subdf.MPKI.mean(),
-            'configstr': configstr,
-            'tRH': tRH,
-            'norm_weighted_speedup': gmean(subdf["norm_weighted_speedup"]),
-            'norm_bh_speedup': gmean(subdf["norm_bh_speedup"]),
-            "norm_energy": gmean(subdf["norm_energy"]),
-            "norm_bh_energy": gmean(subdf["norm_bh_energy"])
-        })
-
-    gdf = pd.DataFrame(gmeans)
+    gdf = df.groupby(['configstr', 'tRH']).agg(
+        MPKI=("MPKI", "mean"),
+        norm_weighted_speedup=("norm_weighted_speedup", gmean),
+        norm_bh_speedup=("norm_bh_speedup", gmean),
+        norm_energy=("norm_energy", gmean),
+        norm_bh_energy=("norm_bh_energy", gmean)
+    ).reset_index()
+    gdf["label"] = "geomean"
 
     df = pd.concat([df[['label', 'configstr', 'tRH', 'MPKI', 'norm_weighted_speedup', "norm_bh_speedup", "norm_energy", "norm_bh_energy", "norm_max_slowdown"]], gdf], ignore_index=True)
     df = df[["label", "norm_weighted_speedup", "norm_bh_speedup", "configstr", "norm_energy", "norm_bh_energy", "norm_max_slowdown", "tRH"]].groupby(["label", "configstr","tRH"]).mean().reset_index()
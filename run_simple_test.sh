@@ -11,10 +11,8 @@ if [ "$(ls -A cputraces/)" ]; then
   echo "[INFO] cputraces/ directory is not empty. Skipping download"
 else
   echo "[INFO] cputraces/ directory is empty"
-  echo "[INFO] Downloading the traces into ./cputraces"
-  python3 ./download_traces.py
-  echo "[INFO] Decompressing the traces into ./cputraces"
-  tar -xvf cputraces.tar.gz --no-same-owner
+  echo "[INFO] Downloading and decompressing the traces into ./cputraces"
+  python3 ./download_traces.py || exit 1
 fi
 
 echo "[INFO] Running the simple test simulation"
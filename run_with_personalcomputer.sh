@@ -9,7 +9,7 @@ python3 setup_personalcomputer.py \
     --result_directory "$PWD/ae_results/microattack"
 
 echo "[INFO] Starting Ramulator2 attacker simulations"
-python3 execute_run_script.py
+python3 execute_run_script.py --trace_combination "$PWD/mixes/microattack.mix"
 
 echo "[INFO] Generating Ramulator2 configurations and run scripts for benign workloads (This might take a while, e.g., >3 mins)"
 python3 setup_personalcomputer.py \
@@ -20,6 +20,6 @@ python3 setup_personalcomputer.py \
     --result_directory "$PWD/ae_results/microbenign"
 
 echo "[INFO] Starting Ramulator2 benign simulations"
-python3 execute_run_script.py
+python3 execute_run_script.py --trace_combination "$PWD/mixes/microbenign.mix"
 
 echo "[INFO] You can track run status with the <check_run_status.sh> script"
\ No newline at end of file
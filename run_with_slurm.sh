@@ -9,10 +9,11 @@ python3 setup_slurm.py \
     --trace_combination "$PWD/mixes/microattack.mix" \
     --trace_directory "$PWD/cputraces" \
     --result_directory "$PWD/ae_results/microattack" \
-    --partition_name "$AE_SLURM_PART_NAME"
+    --partition_name "$AE_SLURM_PART_NAME" \
+    --job_array
 
 echo "[INFO] Starting Ramulator2 attacker simulations"
-python3 execute_run_script.py --slurm
+python3 execute_run_script.py --slurm --trace_combination "$PWD/mixes/microattack.mix"
 
 echo "[INFO] Generating Ramulator2 configurations and run scripts for benign workloads"
 python3 setup_slurm.py \
@@ -21,10 +22,11 @@ python3 setup_slurm.py \
     --trace_combination "$PWD/mixes/microbenign.mix" \
     --trace_directory "$PWD/cputraces" \
     --result_directory "$PWD/ae_results/microbenign" \
-    --partition_name "$AE_SLURM_PART_NAME"
+    --partition_name "$AE_SLURM_PART_NAME" \
+    --job_array
 
 echo "[INFO] Starting Ramulator2 benign simulations"
-python3 execute_run_script.py --slurm
+python3 execute_run_script.py --slurm --trace_combination "$PWD/mixes/microbenign.mix"
 
 echo "[INFO] You can track run status with the <check_run_status.sh> script"
 rm "$PWD/run.sh" 
\ No newline at end of file
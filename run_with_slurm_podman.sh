@@ -17,7 +17,7 @@ podman run --rm -v $PWD:/app breakhammer_artifact "python3 setup_slurm_podman.py
     --partition_name $AE_SLURM_PART_NAME"
 
 echo "[INFO] Starting Ramulator2 attacker simulations"
-python3 execute_run_script.py --slurm
+python3 execute_run_script.py --slurm --trace_combination "$PWD/mixes/microattack.mix"
 
 echo "[INFO] Generating Ramulator2 configurations and run scripts for benign workloads"
 podman run --rm -v $PWD:/app breakhammer_artifact "python3 setup_slurm_podman.py \
@@ -29,7 +29,8 @@ podman run --rm -v $PWD:/app breakhammer_artifact "python3 setup_slurm_podman.py
     --partition_name $AE_SLURM_PART_NAME"
 
 echo "[INFO] Starting Ramulator2 benign simulations"
-python3 execute_run_script.py --slurm
+python3 execute_run_script.py --slurm --trace_combination "$PWD/mixes/microbenign.mix"
 
 echo "[INFO] You can track run status with the <check_run_status.sh> script"
+echo "[INFO] You can report the Podman overhead of the finished jobs with <python3 -m scripts.podman_node $PWD>"
 rm "$PWD/run.sh" 
\ No newline at end of file
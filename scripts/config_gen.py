@@ -0,0 +1,216 @@
+import os
+import re
+import copy
+import json
+import yaml
+import shlex
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .run_config import *
+from .stats_dump import get_stats_dump_filename
+
+# Index of the per-run overrides written next to the base configs in override mode
+RUN_OVERRIDES_FILE = "run_overrides.jsonl"
+
+OVERRIDE_INDEX_REGEX = re.compile(r"\[(\d+)]")
+
+# libyaml's emitter produces the same documents as the pure-Python one, only much faster
+CONFIG_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+def make_throttler_plugin(throttle_type, flat_thresh, dynamic_thresh):
+    return {
+        "ControllerPlugin": {
+            "impl": "Throttler",
+            "throttle_type": throttle_type,
+            "throttle_flat_thresh": flat_thresh,
+            "throttle_dynamic_thresh": dynamic_thresh,
+            "window_period_ns": 64000000,
+            "snapshot_clk": -1,
+            "blacklist_max_mshr": 5,
+            "blacklist_mshr_decrement": 1,
+            "breakhammer_plus": True
+        }
+    }
+
+def make_group_config(base_config, params):
+    mitigation, throttle_type, _, tRH, flat_thresh, dynamic_thresh = params
+    config = copy.deepcopy(base_config)
+    if MEM_LAT_DUMP_FORMAT != "text":
+        config["Frontend"]["lat_dump_format"] = MEM_LAT_DUMP_FORMAT
+    config["MemorySystem"][CONTROLLER]["RowPolicy"]["cap"] = COLUMN_CAP
+    config["MemorySystem"][CONTROLLER]["plugins"].append(make_throttler_plugin(throttle_type, flat_thresh, dynamic_thresh))
+    add_mitigation(config, mitigation, tRH)
+    return config
+
+def make_run_config(group_config, run):
+    # Only the containers on the path to the per-run values are copied, everything else is shared with the group
+    config_filename, traces, no_wait_traces, latency_dump_filename, cmd_count_filename = run
+    config = dict(group_config)
+    if STATS_DUMP:
+        config["stats_dump_path"] = get_stats_dump_filename(config_filename)
+    frontend = dict(config["Frontend"])
+    frontend["lat_dump_path"] = latency_dump_filename
+    frontend["traces"] = traces
+    if len(no_wait_traces) > 0:
+        frontend["no_wait_traces"] = no_wait_traces
+    config["Frontend"] = frontend
+    memory_system = dict(config["MemorySystem"])
+    controller = dict(memory_system[CONTROLLER])
+    plugins = list(controller["plugins"])
+    plugins[0] = dict(plugins[0])
+    plugins[0]["ControllerPlugin"] = dict(plugins[0]["ControllerPlugin"])
+    plugins[0]["ControllerPlugin"]["path"] = cmd_count_filename
+    controller["plugins"] = plugins
+    memory_system[CONTROLLER] = controller
+    config["MemorySystem"] = memory_system
+    return config
+
+def dump_config(config, config_filename):
+    with open(config_filename, "w") as config_file:
+        yaml.dump(config, config_file, Dumper=CONFIG_DUMPER, default_flow_style=False)
+
+def write_group_configs(base_config, params, runs):
+    group_config = make_group_config(base_config, params)
+    for run in runs:
+        dump_config(make_run_config(group_config, run), run[0])
+    return len(runs)
+
+def get_group_config_filename(result_dir, params):
+    return f"{result_dir}/{params[0]}/base_configs/{make_stat_str(params[1:])}.yaml"
+
+def make_override_group_config(base_config, params):
+    # Traces are appended by the overrides of each run
+    config = make_group_config(base_config, params)
+    config["Frontend"]["traces"] = []
+    return config
+
+def get_run_overrides(run):
+    config_filename, traces, no_wait_traces, latency_dump_filename, cmd_count_filename = run
+    overrides = [f"Frontend.lat_dump_path={latency_dump_filename}"]
+    overrides += [f"Frontend.traces[{idx}]={trace}" for idx, trace in enumerate(traces)]
+    overrides += [f"Frontend.no_wait_traces[{idx}]={trace}" for idx, trace in enumerate(no_wait_traces)]
+    overrides.append(f"MemorySystem.{CONTROLLER}.plugins[0].ControllerPlugin.path={cmd_count_filename}")
+    if STATS_DUMP:
+        overrides.append(f"stats_dump_path={get_stats_dump_filename(config_filename)}")
+    return overrides
+
+def get_config_args(config_mode, result_dir, params, run):
+    # Arguments of ramulator2 that select the configuration of a run, quoted for the run scripts (e.g., traces[0] is a shell glob)
+    if config_mode == "override":
+        return format_config_args(get_group_config_filename(result_dir, params), get_run_overrides(run))
+    return format_config_args(run[0])
+
+def format_config_args(config_filename, overrides=()):
+    return " ".join([f"-f {shlex.quote(config_filename)}"] + [f"-p {shlex.quote(override)}" for override in overrides])
+
+def apply_overrides(config, overrides):
+    # Mirrors Config::Details::override_configs of the simulator: overrides are applied in order, missing maps
+    # and sequences are created and an index one past the end of a sequence appends to it
+    config = copy.deepcopy(config)
+    for override in overrides:
+        key, value = override.split("=", 1)
+        tokens = key.split(".")
+        node = config
+        for pos, token in enumerate(tokens):
+            is_last = pos == len(tokens) - 1
+            indices = OVERRIDE_INDEX_REGEX.findall(token)
+            name = OVERRIDE_INDEX_REGEX.sub("", token)
+            if len(indices) == 0:
+                if is_last:
+                    node[name] = value
+                else:
+                    if not isinstance(node.get(name), dict):
+                        node[name] = {}
+                    node = node[name]
+                continue
+            if len(indices) > 1:
+                raise ValueError(f"nested sequence access in override {override} is not supported")
+            if node.get(name) is None:
+                node[name] = []
+            sequence = node[name]
+            idx = int(indices[0])
+            if not isinstance(sequence, list) or idx > len(sequence):
+                raise ValueError(f"override {override} is out of bounds")
+            if idx == len(sequence):
+                sequence.append({})
+            if is_last:
+                sequence[idx] = value
+            else:
+                node = sequence[idx]
+    return config
+
+def write_override_group_config(base_config, params, config_filename):
+    os.makedirs(os.path.dirname(config_filename), exist_ok=True)
+    dump_config(make_override_group_config(base_config, params), config_filename)
+
+def write_override_configs(base_config, groups, result_dir):
+    # Writes one base config per group and the index from which the config of every run can be resolved again
+    for params in groups:
+        write_override_group_config(base_config, params, get_group_config_filename(result_dir, params))
+    with open(f"{result_dir}/{RUN_OVERRIDES_FILE}", "w") as f:
+        for params, runs in groups.items():
+            base_config_filename = os.path.relpath(get_group_config_filename(result_dir, params), result_dir)
+            for run in runs:
+                record = {"config": os.path.relpath(run[0], result_dir), "base_config": base_config_filename, "overrides": get_run_overrides(run)}
+                f.write(json.dumps(record) + "\n")
+    return sum(len(runs) for runs in groups.values())
+
+def load_run_overrides(result_dir):
+    # {config path relative to the result directory: (base config path relative to the result directory, overrides)}
+    run_overrides = {}
+    index_filename = f"{result_dir}/{RUN_OVERRIDES_FILE}"
+    if not os.path.exists(index_filename):
+        return run_overrides
+    with open(index_filename, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            run_overrides[record["config"]] = (record["base_config"], record["overrides"])
+    return run_overrides
+
+def get_rerun_config_args(result_dir, config_filename, run_overrides):
+    # Runs set up in override mode are launched from their base config, others from their own config
+    base_config_filename, overrides = run_overrides.get(os.path.relpath(config_filename, result_dir), (None, None))
+    if base_config_filename is None:
+        return format_config_args(config_filename)
+    return format_config_args(f"{result_dir}/{base_config_filename}", overrides)
+
+def resolve_run_configs(result_dir, configs=None):
+    # Writes the resolved config of each run (every run of the index if configs is None) to its config path
+    run_overrides = load_run_overrides(result_dir)
+    if configs is None:
+        configs = list(run_overrides)
+    group_configs = {}
+    for config in configs:
+        if config not in run_overrides:
+            raise ValueError(f"{config} is not in {result_dir}/{RUN_OVERRIDES_FILE}")
+        base_config_filename, overrides = run_overrides[config]
+        if base_config_filename not in group_configs:
+            with open(f"{result_dir}/{base_config_filename}", "r") as f:
+                group_configs[base_config_filename] = yaml.safe_load(f)
+        dump_config(apply_overrides(group_configs[base_config_filename], overrides), f"{result_dir}/{config}")
+    return len(configs)
+
+def write_configs(base_config, groups, jobs=CONFIG_GEN_JOBS):
+    # groups: {params: [(config_filename, traces, no_wait_traces, latency_dump_filename, cmd_count_filename), ...]}
+    params_list = list(groups.keys())
+    # The setup scripts run at import time, so workers are only forked (never spawned) from them
+    if (jobs is None or jobs > 1) and len(params_list) > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+            futures = [executor.submit(write_group_configs, base_config, params, groups[params]) for params in params_list]
+            return sum(future.result() for future in futures)
+    return sum(write_group_configs(base_config, params, groups[params]) for params in params_list)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="ConfigGen",
+        description="Resolve the configs of runs set up in override mode (--config_mode override)"
+    )
+    argparser.add_argument("result_directory")
+    argparser.add_argument("configs", nargs="*", help="config paths relative to the result directory, e.g., AQUA/configs/<run>.yaml (default: every run)")
+    args = argparser.parse_args()
+
+    num_configs = resolve_run_configs(args.result_directory, args.configs if len(args.configs) > 0 else None)
+    print(f"[INFO] Resolved {num_configs} configs in {args.result_directory}")
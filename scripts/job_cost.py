@@ -0,0 +1,101 @@
+import os
+import re
+import json
+import math
+import statistics
+
+# Relative cost of simulating one core running a workload of the given memory intensity (A: attacker)
+INTENSITY_COST = { "H": 4.0, "M": 2.0, "L": 1.0, "A": 3.0 }
+DEFAULT_INTENSITY_COST = 2.0
+
+# Relative slowdown of each mitigation over the baseline at the same RowHammer threshold
+MITIGATION_COST = {
+    "Dummy": 1.0,
+    "AQUA": 1.3,
+    "Graphene": 1.1,
+    "Hydra": 1.2,
+    "PARA": 1.1,
+    "REGA": 1.1,
+    "RFM": 1.2,
+    "RFMplus": 1.2,
+    "RRS": 1.3,
+    "TWiCe-Ideal": 1.1,
+    "BlockHammer": 1.3
+}
+DEFAULT_MITIGATION_COST = 1.2
+
+# Additional cost per halving of the RowHammer threshold below 4K (more preventive actions)
+TRH_COST_PER_HALVING = 0.15
+TRH_REFERENCE = 4096
+
+# Matches the stats (slurm) or config (personal) path of a run: <mitigation>/<stats|configs>/<stat_str>_<trace>.<ext>
+JOB_PATH_REGEX = re.compile(r"([^/\s]+)/(?:stats|configs)/([^/\s]+?)\.(?:txt|yaml)\b")
+
+def get_label_maps(trace_combination_file):
+    mix_labels = {}
+    trace_labels = {}
+    if trace_combination_file is None:
+        return mix_labels, trace_labels
+    with open(trace_combination_file, "r") as f:
+        for line in f:
+            tokens = line.strip().split(',')
+            if len(tokens) < 3:
+                continue
+            mix_labels[tokens[0]] = tokens[1]
+            for trace, label in zip(tokens[2:], tokens[1]):
+                trace_labels[trace] = label
+    return mix_labels, trace_labels
+
+def parse_job(cmd):
+    match = JOB_PATH_REGEX.search(cmd)
+    if match is None:
+        return None
+    mitigation, run_str = match.groups()
+    tokens = run_str.split("_", 5)
+    if len(tokens) != 6:
+        return None
+    try:
+        tRH = int(tokens[2])
+    except ValueError:
+        return None
+    return mitigation, tRH, tokens[5]
+
+def predict_job_cost(cmd, mix_labels, trace_labels):
+    job = parse_job(cmd)
+    if job is None:
+        return DEFAULT_INTENSITY_COST
+    mitigation, tRH, trace = job
+    label = mix_labels.get(trace, trace_labels.get(trace, ""))
+    cost = sum(INTENSITY_COST.get(category, DEFAULT_INTENSITY_COST) for category in label) or DEFAULT_INTENSITY_COST
+    cost *= MITIGATION_COST.get(mitigation, DEFAULT_MITIGATION_COST)
+    if tRH > 0 and tRH < TRH_REFERENCE:
+        cost *= 1 + TRH_COST_PER_HALVING * math.log2(TRH_REFERENCE / tRH)
+    return cost
+
+def load_recorded_runtimes(ledger_path):
+    runtimes = {}
+    if ledger_path is None or not os.path.exists(ledger_path):
+        return runtimes
+    with open(ledger_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "DONE":
+                runtimes[record["cmd"]] = record["duration"]
+    return runtimes
+
+def get_job_costs(commands, trace_combination_file=None, ledger_path=None):
+    mix_labels, trace_labels = get_label_maps(trace_combination_file)
+    predicted = [predict_job_cost(cmd, mix_labels, trace_labels) for cmd in commands]
+    runtimes = load_recorded_runtimes(ledger_path)
+    # Scale the relative predictions to seconds with the recorded runtimes so both can be compared
+    ratios = [runtimes[cmd] / cost for cmd, cost in zip(commands, predicted) if cmd in runtimes]
+    scale = statistics.median(ratios) if len(ratios) > 0 else 1.0
+    return [runtimes.get(cmd, cost * scale) for cmd, cost in zip(commands, predicted)]
+
+def sort_longest_first(commands, trace_combination_file=None, ledger_path=None):
+    costs = get_job_costs(commands, trace_combination_file, ledger_path)
+    order = sorted(range(len(commands)), key=lambda idx: -costs[idx])
+    return [commands[idx] for idx in order]
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+
+LEDGER_FILENAME = "run_ledger.jsonl"
+
+# Delay between memory admission checks, which is also the minimum delay between two runs admitted while others run
+ADMISSION_POLL_DELAY = 1
+
+# Minimum delay between two progress lines when stdout is not a terminal
+PROGRESS_LOG_DELAY = 10
+
+def get_num_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def get_available_memory_gb():
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / (1024 * 1024)
+    except OSError:
+        pass
+    return None
+
+def get_ledger_path(run_script):
+    return os.path.join(os.path.dirname(os.path.abspath(run_script)), LEDGER_FILENAME)
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m{seconds % 60:02d}s"
+
+def print_progress(state, final=False):
+    now = time.time()
+    if not final and not sys.stdout.isatty() and now - state["last_log"] < PROGRESS_LOG_DELAY:
+        return
+    state["last_log"] = now
+    finished = state["done"] + state["failed"]
+    elapsed = now - state["start"]
+    eta = "--"
+    if finished > 0:
+        eta = format_duration(elapsed / finished * (state["total"] - finished))
+    line = f"[INFO] {finished}/{state['total']} finished ({state['failed']} failed, {state['retried']} retried, {state['running']} running)" +\
+            f" elapsed {format_duration(elapsed)} ETA {eta}"
+    if sys.stdout.isatty():
+        print(f"\r\033[K{line}", end="\n" if final else "", flush=True)
+    else:
+        print(line, flush=True)
+
+def kill_job(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+async def run_job(cmd, timeout):
+    try:
+        proc = await asyncio.create_subprocess_shell(cmd, start_new_session=True)
+    except OSError as e:
+        print(f"[ERR] Could not start '{cmd}': {e}")
+        return None, False
+    timed_out = False
+    try:
+        await asyncio.wait_for(proc.wait(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        kill_job(proc)
+        await proc.wait()
+    except asyncio.CancelledError:
+        kill_job(proc)
+        raise
+    return proc.returncode, timed_out
+
+async def wait_for_admission(state, min_free_mem_gb):
+    # Always admit a run when nothing is running so that a low memory limit cannot stall the whole sweep. Otherwise runs
+    # are admitted at most one per poll delay, so that every check sees the memory taken by the run admitted before it
+    while state["running"] > 0 and min_free_mem_gb > 0:
+        admission_delay = state["last_admission"] + ADMISSION_POLL_DELAY - time.monotonic()
+        if admission_delay > 0:
+            await asyncio.sleep(admission_delay)
+            continue
+        available_mem_gb = get_available_memory_gb()
+        if available_mem_gb is None or available_mem_gb >= min_free_mem_gb:
+            break
+        await asyncio.sleep(ADMISSION_POLL_DELAY)
+    state["last_admission"] = time.monotonic()
+
+async def worker(queue, state, timeout, retries, min_free_mem_gb, ledger):
+    while True:
+        index, cmd, attempt = await queue.get()
+        await wait_for_admission(state, min_free_mem_gb)
+        state["running"] += 1
+        start = time.time()
+        returncode, timed_out = await run_job(cmd, timeout)
+        end = time.time()
+        state["running"] -= 1
+        success = returncode == 0 and not timed_out
+        if success:
+            status = "DONE"
+            state["done"] += 1
+        elif attempt < retries:
+            status = "RETRY"
+            state["retried"] += 1
+            queue.put_nowait((index, cmd, attempt + 1))
+        else:
+            status = "FAILED"
+            state["failed"] += 1
+            state["failed_cmds"].append(cmd)
+        ledger.write(json.dumps({
+            "session": state["start"],
+            "index": index,
+            "cmd": cmd,
+            "attempt": attempt,
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            "returncode": returncode,
+            "timed_out": timed_out,
+            "status": status
+        }) + "\n")
+        ledger.flush()
+        print_progress(state)
+        queue.task_done()
+
+async def run_jobs(commands, num_workers, timeout, retries, min_free_mem_gb, ledger_path):
+    state = {
+        "start": time.time(),
+        "last_log": 0,
+        "total": len(commands),
+        "running": 0,
+        "last_admission": 0,
+        "done": 0,
+        "failed": 0,
+        "retried": 0,
+        "failed_cmds": []
+    }
+    queue = asyncio.Queue()
+    for index, cmd in enumerate(commands):
+        queue.put_nowait((index, cmd, 0))
+    with open(ledger_path, "a") as ledger:
+        workers = [asyncio.create_task(worker(queue, state, timeout, retries, min_free_mem_gb, ledger)) for _ in range(num_workers)]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    print_progress(state, final=True)
+    return state["failed_cmds"]
+
+def run_local(commands, num_workers=None, timeout=None, retries=0, min_free_mem_gb=0, ledger_path=LEDGER_FILENAME):
+    if num_workers is None or num_workers <= 0:
+        num_workers = get_num_cpus()
+    print(f"[INFO] Running {len(commands)} simulations with {num_workers} parallel jobs. Job ledger at: {ledger_path}")
+    return asyncio.run(run_jobs(commands, num_workers, timeout, retries, min_free_mem_gb, ledger_path))
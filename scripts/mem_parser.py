@@ -1,17 +1,53 @@
+import numpy as np
+
 from .run_config import MEM_HIST_PREC
+from .result_parser import open_file
+
+NUM_PERCENTILES = 101
+
+# Binary histogram dumps (lat_dump_format: binary) start with this header followed by
+# the int64 bucket bases and the uint64 bucket counts, all little-endian
+MEM_HIST_MAGIC = b"BHLH"
+MEM_HIST_VERSION = 1
+MEM_HIST_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("bucket_size", "<u4"), ("num_buckets", "<u4")])
 
 def get_mem_hist(hist_file):
-    mem_hist = []
-    def cleanup(token):
-        return int(token.lstrip().strip())
-    with open(hist_file, "r", encoding="utf-8") as f:
-        for line in f:
-            tokens = line.split(",")
-            mem_hist.append((cleanup(tokens[0]), cleanup(tokens[1])))
-    mem_hist = sorted(mem_hist, key=lambda x: x[0])
-    for i in range(1, len(mem_hist)):
-        mem_hist[i] = (mem_hist[i][0], mem_hist[i][1] + mem_hist[i-1][1]) 
-    return mem_hist
+    buckets, cum_counts = load_mem_hist(hist_file)
+    return list(zip(buckets.tolist(), cum_counts.tolist()))
+
+def load_binary_mem_hist(data, hist_file):
+    if len(data) < MEM_HIST_HEADER.itemsize:
+        raise ValueError(f"Truncated memory latency histogram: {hist_file}")
+    header = np.frombuffer(data, dtype=MEM_HIST_HEADER, count=1)[0]
+    if header["version"] != MEM_HIST_VERSION:
+        raise ValueError(f"Unsupported memory latency histogram version {header['version']}: {hist_file}")
+    num_buckets = int(header["num_buckets"])
+    if len(data) < MEM_HIST_HEADER.itemsize + 16 * num_buckets:
+        raise ValueError(f"Truncated memory latency histogram: {hist_file}")
+    buckets = np.frombuffer(data, dtype="<i8", count=num_buckets, offset=MEM_HIST_HEADER.itemsize).astype(np.int64)
+    counts = np.frombuffer(data, dtype="<u8", count=num_buckets, offset=MEM_HIST_HEADER.itemsize + 8 * num_buckets).astype(np.int64)
+    return buckets, counts
+
+def load_mem_hist(hist_file, open_file=open_file):
+    # Returns the sorted bucket bases and the running sum of their counts
+    with open_file(hist_file, "rb") as f:
+        data = f.read()
+    if data[:len(MEM_HIST_MAGIC)] == MEM_HIST_MAGIC:
+        buckets, counts = load_binary_mem_hist(data, hist_file)
+    else:
+        values = np.array(data.replace(b",", b" ").split(), dtype=np.int64).reshape(-1, 2)
+        buckets, counts = values[:, 0], values[:, 1]
+    order = np.argsort(buckets, kind="stable")
+    return buckets[order], np.cumsum(counts[order])
+
+def get_percentiles(buckets, cum_counts):
+    # Bucket holding the N-th percentile is the first one whose running sum reaches N% of all requests
+    if len(buckets) == 0:
+        return np.arange(NUM_PERCENTILES), np.zeros(NUM_PERCENTILES, dtype=np.int64)
+    pN_step = cum_counts[-1] / 100
+    pN_locs = np.searchsorted(cum_counts, pN_step * np.arange(NUM_PERCENTILES), side="left")
+    pN_keys = np.flatnonzero(pN_locs < len(buckets))
+    return pN_keys, buckets[pN_locs[pN_keys]] + MEM_HIST_PREC - 1
 
 def get_pN(mem_hist, N):
     _, total_reqs = mem_hist[-1]
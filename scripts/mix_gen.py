@@ -0,0 +1,193 @@
+import os
+import math
+import random
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+
+from .trace_profile import get_profile_df, list_traces
+
+# MPKI thresholds of the high (H), medium (M) and low (L) intensity classes (see plotting_scripts/plot_setup.py)
+HIGH_MPKI = 60
+LOW_MPKI = 10
+BENIGN_CLASSES = ["H", "M", "L"]
+ATTACKER_CLASS = "A"
+ATTACKER_TRACE = "atk1.trace"
+
+# Number of rejected duplicate draws after which a pattern is assumed to have no unseen combination left
+MAX_DUPLICATE_DRAWS = 1000
+
+def get_trace_class(mpki):
+    if mpki > HIGH_MPKI:
+        return "H"
+    if mpki > LOW_MPKI:
+        return "M"
+    return "L"
+
+def load_mpki_df(trace_dir, exclude):
+    # Simulated MPKI values in {trace_dir}/mpki.csv take precedence, otherwise the MPKI is estimated from the traces
+    mpki_file = f"{trace_dir}/mpki.csv"
+    if os.path.exists(mpki_file):
+        mpki_df = pd.read_csv(mpki_file)[["benchmark", "MPKI"]]
+    else:
+        traces = [trace for trace in list_traces(trace_dir) if not trace.startswith("atk")]
+        mpki_df = get_profile_df(trace_dir, traces)[["benchmark", "MPKI"]]
+    return mpki_df[~mpki_df.benchmark.isin(exclude)]
+
+def get_trace_classes(mpki_df):
+    trace_classes = {category: [] for category in BENIGN_CLASSES}
+    for trace, mpki in sorted(zip(mpki_df.benchmark, mpki_df.MPKI)):
+        trace_classes[get_trace_class(mpki)].append(trace)
+    return trace_classes
+
+def get_patterns(num_cores, num_attackers):
+    # Every class composition of the benign cores, e.g., HHMA, most frequent class first and attackers on the last cores
+    patterns = []
+    for combination in itertools.combinations_with_replacement(BENIGN_CLASSES, num_cores - num_attackers):
+        counts = {category: combination.count(category) for category in BENIGN_CLASSES}
+        ordered = sorted(BENIGN_CLASSES, key=lambda category: (-counts[category], BENIGN_CLASSES.index(category)))
+        patterns.append("".join(category * counts[category] for category in ordered) + ATTACKER_CLASS * num_attackers)
+    return patterns
+
+def get_mix_key(pattern, traces):
+    # Mixes that run the same benign traces under the same pattern are duplicates regardless of the core order
+    return (pattern, tuple(sorted(traces)))
+
+def sample_pattern(rng, pattern, trace_classes, attacker_trace, num_mixes, seen):
+    benign_slots = [category for category in pattern if category != ATTACKER_CLASS]
+    num_attackers = len(pattern) - len(benign_slots)
+    missing_classes = sorted(set(category for category in benign_slots if len(trace_classes[category]) == 0))
+    if len(missing_classes) > 0:
+        print(f"[WARN] Skipping pattern {pattern}, there are no traces of class {', '.join(missing_classes)}")
+        return []
+    num_combinations = 1
+    for category in BENIGN_CLASSES:
+        count = benign_slots.count(category)
+        num_combinations *= math.comb(len(trace_classes[category]) + count - 1, count)
+
+    mixes = []
+    duplicate_draws = 0
+    while len(mixes) < num_mixes and duplicate_draws < MAX_DUPLICATE_DRAWS:
+        traces = [rng.choice(trace_classes[category]) for category in benign_slots]
+        key = get_mix_key(pattern, traces)
+        if key in seen:
+            duplicate_draws += 1
+            continue
+        seen.add(key)
+        mixes.append((pattern, traces + [attacker_trace] * num_attackers))
+    if len(mixes) < num_mixes:
+        print(f"[WARN] Pattern {pattern} has only {len(mixes)} unique mixes ({num_combinations} trace combinations)")
+    return mixes
+
+def generate_mixes(trace_classes, patterns, mixes_per_pattern, attacker_trace=ATTACKER_TRACE, seed=0):
+    # Stratified sampling: every pattern (stratum) gets the same number of mixes, drawn with a seeded generator
+    rng = random.Random(seed)
+    seen = set()
+    mixes = []
+    for pattern in patterns:
+        mixes += sample_pattern(rng, pattern, trace_classes, attacker_trace, mixes_per_pattern, seen)
+    return [(f"Mix{i}", pattern, traces) for i, (pattern, traces) in enumerate(mixes)]
+
+def read_mixes(mix_file):
+    mixes = []
+    with open(mix_file, "r") as f:
+        for line in f:
+            tokens = line.strip().split(',')
+            if len(tokens) < 3:
+                continue
+            mixes.append((tokens[0], tokens[1], tokens[2:]))
+    return mixes
+
+def write_mixes(mixes, mix_file):
+    with open(mix_file, "w") as f:
+        for name, pattern, traces in mixes:
+            f.write(f"{name},{pattern},{','.join(traces)}\n")
+
+def get_ks_statistic(values, subset_values):
+    # Two-sample Kolmogorov-Smirnov statistic, the largest distance between the two empirical distributions
+    values = np.sort(values)
+    subset_values = np.sort(subset_values)
+    points = np.concatenate((values, subset_values))
+    cdf = np.searchsorted(values, points, side="right") / len(values)
+    subset_cdf = np.searchsorted(subset_values, points, side="right") / len(subset_values)
+    return np.max(np.abs(cdf - subset_cdf))
+
+def get_pattern_quotas(pattern_counts, subset_size):
+    # Largest remainder allocation of subset_size over the patterns, keeping at least one mix of every pattern
+    total = sum(pattern_counts.values())
+    shares = {pattern: subset_size * count / total for pattern, count in pattern_counts.items()}
+    quotas = {pattern: max(1, int(share)) for pattern, share in shares.items()}
+    for pattern in sorted(shares, key=lambda pattern: shares[pattern] - int(shares[pattern]), reverse=True):
+        if sum(quotas.values()) >= subset_size:
+            break
+        if quotas[pattern] < pattern_counts[pattern]:
+            quotas[pattern] += 1
+    return quotas
+
+def select_quantiles(mix_ids, intensities, quota):
+    # Evenly spaced quantiles of the pattern's mixes sorted by their intensity
+    ordered = sorted(mix_ids, key=lambda mix_id: (intensities[mix_id], mix_id))
+    positions = np.round((np.arange(quota) + 0.5) * len(ordered) / quota - 0.5).astype(int)
+    return [ordered[position] for position in positions]
+
+def select_representative_mixes(mixes, mpki, tolerance):
+    # Smallest stratified subset whose pattern proportions follow the full set and whose distribution of the summed
+    # benign MPKI of a mix is within tolerance (Kolmogorov-Smirnov statistic) of the full set
+    intensities = [sum(mpki.get(trace, 0) for trace in traces) for _, _, traces in mixes]
+    by_pattern = {}
+    for mix_id, (_, pattern, _) in enumerate(mixes):
+        by_pattern.setdefault(pattern, []).append(mix_id)
+    pattern_counts = {pattern: len(mix_ids) for pattern, mix_ids in by_pattern.items()}
+    for subset_size in range(len(by_pattern), len(mixes) + 1):
+        quotas = get_pattern_quotas(pattern_counts, subset_size)
+        subset = sorted(mix_id for pattern, mix_ids in by_pattern.items()
+                        for mix_id in select_quantiles(mix_ids, intensities, quotas[pattern]))
+        statistic = get_ks_statistic(np.array(intensities), np.array(intensities)[subset])
+        if statistic <= tolerance:
+            return [mixes[mix_id] for mix_id in subset], statistic
+    return mixes, 0.0
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="MixGen",
+        description="Generate workload mixes from per-trace intensity classes or shrink a mix set to a representative subset"
+    )
+    subparsers = argparser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="sample N-core mixes stratified over intensity class patterns")
+    generate_parser.add_argument("trace_dir")
+    generate_parser.add_argument("-o", "--output", required=True, help="mix file to write (e.g., mixes/generated.mix)")
+    generate_parser.add_argument("-c", "--cores", type=int, default=4, help="number of cores of a mix")
+    generate_parser.add_argument("-a", "--attackers", type=int, default=0, help="number of attacker cores, placed on the last cores of a mix")
+    generate_parser.add_argument("--attacker_trace", default=ATTACKER_TRACE, help="trace of the attacker cores")
+    generate_parser.add_argument("-p", "--patterns", nargs="*", help="class patterns to sample (e.g., HHMA MMLA, default: every H/M/L composition)")
+    generate_parser.add_argument("-n", "--mixes_per_pattern", type=int, default=10, help="number of mixes sampled per pattern")
+    generate_parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the sampling")
+    generate_parser.add_argument("--exclude", nargs="*", default=["gups"], help="traces that are never sampled")
+
+    subset_parser = subparsers.add_parser("subset", help="select the smallest representative subset of a mix file")
+    subset_parser.add_argument("trace_dir")
+    subset_parser.add_argument("mix_file")
+    subset_parser.add_argument("-o", "--output", required=True, help="mix file to write, mixes keep their names so existing results are reused")
+    subset_parser.add_argument("-t", "--tolerance", type=float, default=0.1, help="largest Kolmogorov-Smirnov statistic between the mix intensities of the subset and the full set")
+
+    args = argparser.parse_args()
+    trace_dir = args.trace_dir.rstrip("/")
+    if args.command == "generate":
+        trace_classes = get_trace_classes(load_mpki_df(trace_dir, args.exclude))
+        patterns = args.patterns if args.patterns else get_patterns(args.cores, args.attackers)
+        invalid_patterns = [pattern for pattern in patterns
+                            if len(pattern) != args.cores or set(pattern) - set(BENIGN_CLASSES + [ATTACKER_CLASS])]
+        if len(invalid_patterns) > 0:
+            print(f"[ERR] Patterns {', '.join(invalid_patterns)} do not consist of {args.cores} of {''.join(BENIGN_CLASSES)}{ATTACKER_CLASS}")
+            exit(1)
+        mixes = generate_mixes(trace_classes, patterns, args.mixes_per_pattern, args.attacker_trace, args.seed)
+        write_mixes(mixes, args.output)
+        print(f"[INFO] Wrote {len(mixes)} mixes of {len(patterns)} patterns to {args.output}")
+    else:
+        mixes = read_mixes(args.mix_file)
+        mpki_df = load_mpki_df(trace_dir, [])
+        subset, statistic = select_representative_mixes(mixes, dict(zip(mpki_df.benchmark, mpki_df.MPKI)), args.tolerance)
+        write_mixes(subset, args.output)
+        print(f"[INFO] Wrote {len(subset)}/{len(mixes)} mixes to {args.output} (KS statistic {statistic:.3f})")
@@ -0,0 +1,53 @@
+import os
+import pickle
+import sqlite3
+
+from .result_archive import is_archived
+
+PARSE_CACHE_FILENAME = "parse_cache.sqlite"
+PARSE_CACHE_VERSION = 2
+
+def open_cache(csv_dir):
+    conn = sqlite3.connect(f"{csv_dir}/{PARSE_CACHE_FILENAME}")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS runs (run_key TEXT PRIMARY KEY, signature BLOB, parsed INTEGER, result BLOB)")
+    version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if version is None or version[0] != PARSE_CACHE_VERSION:
+        conn.execute("DELETE FROM runs")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (PARSE_CACHE_VERSION,))
+        conn.commit()
+    return conn
+
+def get_file_signature(path, archive_index=None):
+    # Archived files are read from the result archive, so their archived size and modification time are used
+    if archive_index is not None and is_archived(archive_index, path):
+        return (path,) + archive_index[path]
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns)
+
+def get_run_signature(run_files, num_cores, archive_index=None):
+    return pickle.dumps((num_cores, [get_file_signature(path, archive_index) for path in run_files]))
+
+def load_runs(conn):
+    cached_runs = {}
+    for run_key, signature, parsed, result in conn.execute("SELECT run_key, signature, parsed, result FROM runs"):
+        cached_runs[run_key] = (signature, bool(parsed), result)
+    return cached_runs
+
+def get_cached_result(cached_runs, run_key, signature, parse_results):
+    if run_key not in cached_runs:
+        return None
+    cached_signature, parsed, result = cached_runs[run_key]
+    if cached_signature != signature or (parse_results and not parsed):
+        return None
+    return pickle.loads(result)
+
+def store_runs(conn, entries):
+    conn.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)", [
+        (run_key, signature, int(parsed), pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        for run_key, signature, parsed, result in entries
+    ])
+    conn.commit()
@@ -0,0 +1,166 @@
+import os
+import glob
+import argparse
+import pandas as pd
+
+from .run_config import MAX_SLURM_JOBS
+
+PODMAN_TASK_SCRIPT = "podman_task.sh"
+PODMAN_WORKER_SCRIPT = "podman_worker.sh"
+PODMAN_DRAIN_SCRIPT = "podman_drain.sh"
+PODMAN_TIMING_DIR = "podman_timing"
+
+TIMING_COLUMNS = ["mode", "job_id", "load_state", "load_s", "container_s", "sim_s", "runs"]
+
+# Shared by the task and worker scripts: WORK_DIR is the first argument, the image is loaded at most once per node
+# (jobs on the same node wait on a node-local lock for the first one to load it) and every job appends one line
+# to the timing log of its node instead of writing to the error file of its run
+PODMAN_NODE_BODY = """#! /bin/bash
+WORK_DIR="$1"
+IMAGE=breakhammer_artifact
+ARCHIVE="$WORK_DIR/$IMAGE.tar"
+NODE_DIR="${TMPDIR:-/tmp}/$IMAGE.$USER"
+TIMING_LOG="$WORK_DIR/run_manifests/podman_timing/$(hostname -s).csv"
+mkdir -p "$NODE_DIR" "$(dirname "$TIMING_LOG")"
+
+now() { date +%s.%N; }
+
+load_image() {
+  (
+    flock -x 9
+    ARCHIVE_ID=$(stat -c "%s %Y" "$ARCHIVE") || exit 1
+    if podman image exists "$IMAGE" && [ "$(cat "$NODE_DIR/loaded" 2>/dev/null)" == "$ARCHIVE_ID" ]; then
+      echo cached
+    else
+      podman load --quiet -i "$ARCHIVE" > /dev/null || exit 1
+      echo "$ARCHIVE_ID" > "$NODE_DIR/loaded"
+      echo loaded
+    fi
+  ) 9> "$NODE_DIR/load.lock"
+}
+
+record_timing() {
+  LINE=$(awk -v mode="$1" -v job="${SLURM_JOB_ID:-0}" -v state="$LOAD_STATE" -v start="$START" -v loaded="$LOADED" -v end="$END" \\
+    '{ sim += $2 - $1; runs += 1 } END { printf "%s,%s,%s,%.3f,%.3f,%.3f,%d", mode, job, state, loaded - start, end - loaded - sim, sim, runs }' "$RUN_DIR/runs")
+  (
+    flock -x 9
+    if [ ! -f "$TIMING_LOG" ]; then
+      echo "mode,job_id,load_state,load_s,container_s,sim_s,runs" > "$TIMING_LOG"
+    fi
+    echo "$LINE" >> "$TIMING_LOG"
+  ) 9> "$NODE_DIR/timing.lock"
+  rm -rf "$RUN_DIR"
+}
+
+START=$(now)
+LOAD_STATE=$(load_image) || { echo "[ERR] Could not load $ARCHIVE" >&2; exit 1; }
+LOADED=$(now)
+RUN_DIR=$(mktemp -d "$NODE_DIR/run.XXXXXX")
+touch "$RUN_DIR/runs"
+"""
+
+# Runs a single simulation (ramulator2 arguments from $2 on) in a container, the simulator output goes to the job output.
+# The arguments are quoted again because the container shell parses them a second time
+PODMAN_TASK_BODY = PODMAN_NODE_BODY + """CONFIG_ARGS=$(printf '%q ' "${@:2}")
+podman run --rm -v "$WORK_DIR:/app" -v "$RUN_DIR:/timing" "$IMAGE" \\
+  'T0=$(date +%s.%N); /app/ramulator2 '"$CONFIG_ARGS"'; RC=$?; echo "$T0 $(date +%s.%N)" >> /timing/runs; exit $RC'
+RC=$?
+END=$(now)
+record_timing task
+exit $RC
+"""
+
+# Starts one long-lived container that drains the manifest in $2 (container path)
+PODMAN_WORKER_BODY = PODMAN_NODE_BODY + """MANIFEST="$2"
+podman run --rm -v "$WORK_DIR:/app" -v "$RUN_DIR:/timing" "$IMAGE" "/app/run_manifests/podman_drain.sh $MANIFEST"
+RC=$?
+END=$(now)
+record_timing worker
+exit $RC
+"""
+
+# Runs inside the container: claims the next line of the manifest under a lock until every line is claimed,
+# so each simulation is run by exactly one of the workers
+PODMAN_DRAIN_BODY = """#! /bin/bash
+MANIFEST="$1"
+while true; do
+  LINE=$(flock -x "$MANIFEST.lock" bash -c 'N=$(( $(cat "$1") + 1 )); echo $N > "$1"; echo $N' _ "$MANIFEST.next")
+  CMD=$(sed -n "${LINE}p" "$MANIFEST")
+  if [ -z "$CMD" ]; then
+    break
+  fi
+  T0=$(date +%s.%N)
+  eval "$CMD"
+  echo "$T0 $(date +%s.%N)" >> /timing/runs
+done
+"""
+
+def write_podman_scripts(script_dir):
+    for script, body in [
+            (PODMAN_TASK_SCRIPT, PODMAN_TASK_BODY),
+            (PODMAN_WORKER_SCRIPT, PODMAN_WORKER_BODY),
+            (PODMAN_DRAIN_SCRIPT, PODMAN_DRAIN_BODY)
+        ]:
+        with open(f"{script_dir}/{script}", "w") as f:
+            f.write(body)
+        os.system(f"chmod uog+x {script_dir}/{script}")
+
+def reset_manifest_claims(manifest_path):
+    # Workers claim lines by incrementing the counter next to the manifest
+    with open(f"{manifest_path}.next", "w") as f:
+        f.write("0\n")
+
+def get_worker_submit_commands(sbatch_cmd, work_dir, partition_name, worker_script, manifest_path, num_workers, log_dir, job_name="ramulator2"):
+    if num_workers == 0:
+        return []
+    sb_cmd = f"{sbatch_cmd} --chdir={work_dir} --output={log_dir}/podman_worker_%A_%a.out --error={log_dir}/podman_worker_%A_%a.err"
+    sb_cmd += f" --partition={partition_name} --job-name='{job_name}' --array=0-{num_workers - 1}%{MAX_SLURM_JOBS}"
+    sb_cmd += f" {worker_script} {work_dir} {manifest_path}"
+    return [sb_cmd]
+
+def read_timing_logs(timing_dir):
+    dfs = []
+    for timing_file in sorted(glob.glob(f"{timing_dir}/*.csv")):
+        df = pd.read_csv(timing_file)
+        df["node"] = os.path.splitext(os.path.basename(timing_file))[0]
+        dfs.append(df)
+    if len(dfs) == 0:
+        return pd.DataFrame(columns=TIMING_COLUMNS + ["node"])
+    return pd.concat(dfs, ignore_index=True)
+
+def summarize_timings(df):
+    summaries = []
+    for mode, mode_df in df.groupby("mode"):
+        runs = mode_df["runs"].sum()
+        overhead = mode_df["load_s"].sum() + mode_df["container_s"].sum()
+        total = overhead + mode_df["sim_s"].sum()
+        summaries.append({
+            "mode": mode,
+            "jobs": len(mode_df),
+            "runs": runs,
+            "nodes": mode_df["node"].nunique(),
+            "image_loads": (mode_df["load_state"] == "loaded").sum(),
+            "load_s_per_job": mode_df["load_s"].mean(),
+            "load_s_max": mode_df["load_s"].max(),
+            "container_s_per_run": mode_df["container_s"].sum() / max(runs, 1),
+            "sim_s_per_run": mode_df["sim_s"].sum() / max(runs, 1),
+            "overhead_pct": 100 * overhead / total if total > 0 else 0.0
+        })
+    return pd.DataFrame(summaries)
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="PodmanNode",
+        description="Report the Podman overhead of the Slurm jobs launched with run_with_slurm_podman.sh"
+    )
+    argparser.add_argument("working_directory")
+    args = argparser.parse_args()
+
+    timing_dir = f"{args.working_directory}/run_manifests/{PODMAN_TIMING_DIR}"
+    summary = summarize_timings(read_timing_logs(timing_dir))
+    if len(summary) == 0:
+        print(f"[WARN] No timing logs in {timing_dir}")
+    for row in summary.itertuples():
+        print(f"[INFO] {row.mode}: {row.jobs} jobs ran {row.runs} simulations on {row.nodes} nodes with {row.image_loads} image loads")
+        print(f"[INFO] {row.mode}: image load {row.load_s_per_job:.1f} s/job (max {row.load_s_max:.1f} s), container start/stop {row.container_s_per_run:.1f} s/run, "
+              f"simulation {row.sim_s_per_run:.1f} s/run, overhead {row.overhead_pct:.2f}% of job time")
@@ -0,0 +1,187 @@
+import io
+import os
+import re
+import zlib
+import sqlite3
+import argparse
+
+from .result_parser import DONE_TOKEN, open_file
+from .run_config import RESULT_STORE
+
+ARCHIVE_FILENAME = "results_archive.sqlite"
+ARCHIVE_VERSION = 1
+
+# Per-run artifact directories of each mitigation (see setup_*.py)
+RUN_FILE_DIRS = ["stats", "errors", "configs", "cmd_count", "mem_latency"]
+
+# Extension of each run artifact, everything before it is the run name (which itself may contain dots)
+RUN_FILE_REGEX = re.compile(r"^(.+?)\.(txt|yaml|cmd\.count|memlat\.dump\.core\d+|stats\.json)$")
+
+# Number of runs inserted between two commits of the collector
+COLLECT_BATCH_SIZE = 256
+
+# Read-only archive connections and indices, keyed by (result directory, pid) since connections cannot be shared with forked workers
+open_archives = {}
+
+def get_archive_path(result_dir):
+    return f"{result_dir}/{ARCHIVE_FILENAME}"
+
+def open_archive(result_dir, readonly=False):
+    archive_path = get_archive_path(result_dir)
+    if readonly:
+        if not os.path.exists(archive_path):
+            return None
+        return sqlite3.connect(f"file:{archive_path}?mode=ro", uri=True)
+    conn = sqlite3.connect(archive_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, data BLOB)")
+    conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", (ARCHIVE_VERSION,))
+    conn.commit()
+    return conn
+
+def load_index(conn, result_dir):
+    # Maps the on-disk path of every archived file to its (size, mtime_ns) at the time it was archived
+    index = {}
+    for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM files"):
+        index[f"{result_dir}/{path}"] = (size, mtime_ns)
+    return index
+
+def get_archive(result_dir):
+    archive_key = (result_dir, os.getpid())
+    if archive_key not in open_archives:
+        conn = open_archive(result_dir, readonly=True)
+        open_archives[archive_key] = (conn, load_index(conn, result_dir) if conn is not None else {})
+    return open_archives[archive_key]
+
+def get_archive_index(result_dir):
+    return get_archive(result_dir)[1]
+
+def get_run_stats_path(path):
+    # <mitigation>/<file dir>/<run>.<ext> -> <mitigation>/stats/<run>.txt
+    match = RUN_FILE_REGEX.match(os.path.basename(path))
+    if match is None:
+        return None
+    return f"{os.path.dirname(os.path.dirname(path))}/stats/{match.group(1)}.txt"
+
+def is_archived(index, path):
+    # Archived files are used unless their run was simulated again after it was archived: its stats file on disk then
+    # no longer matches the archived copy, and every file of the run is read from the result directory instead
+    if path not in index:
+        return False
+    stats_path = get_run_stats_path(path)
+    if stats_path is None:
+        return True
+    try:
+        st = os.stat(stats_path)
+    except FileNotFoundError:
+        return True
+    return index.get(stats_path) == (st.st_size, st.st_mtime_ns)
+
+def read_archived_file(result_dir, path):
+    conn, index = get_archive(result_dir)
+    if not is_archived(index, path):
+        return None
+    row = conn.execute("SELECT data FROM files WHERE path = ?", (path[len(result_dir) + 1:],)).fetchone()
+    return zlib.decompress(row[0]) if row is not None else None
+
+def get_file_access(result_dir):
+    # Returns (open_file, file_exists) that read archived run files first and fall back to the result directory (see is_archived)
+    index = get_archive_index(result_dir)
+    if len(index) == 0:
+        return open_file, os.path.exists
+
+    def open_run_file(path, mode="r"):
+        data = read_archived_file(result_dir, path)
+        if data is None:
+            return open_file(path, mode)
+        if "b" in mode:
+            return io.BytesIO(data)
+        return io.StringIO(data.decode("utf-8"))
+
+    def run_file_exists(path):
+        return is_archived(index, path) or os.path.exists(path)
+
+    return open_run_file, run_file_exists
+
+def list_run_files(result_dir):
+    # Groups the artifacts of every run by "<mitigation>/<stat_str>_<trace>" with one directory listing per artifact type
+    runs = {}
+    for mitigation in sorted(os.listdir(result_dir)):
+        if not os.path.isdir(f"{result_dir}/{mitigation}"):
+            continue
+        for file_dir in RUN_FILE_DIRS:
+            dir_path = f"{result_dir}/{mitigation}/{file_dir}"
+            if not os.path.isdir(dir_path):
+                continue
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    match = RUN_FILE_REGEX.match(entry.name)
+                    if match is None:
+                        continue
+                    run_name = match.group(1)
+                    stat = entry.stat()
+                    runs.setdefault(f"{mitigation}/{run_name}", []).append(
+                        (f"{mitigation}/{file_dir}/{entry.name}", stat.st_size, stat.st_mtime_ns))
+    return runs
+
+def is_run_done(result_dir, run_files):
+    for rel_path, _, _ in run_files:
+        if rel_path.split("/")[1] == "stats" and rel_path.endswith(".txt"):
+            with open_file(f"{result_dir}/{rel_path}") as f:
+                return DONE_TOKEN in f.read()
+    return False
+
+def collect_runs(result_dir, remove=False, finished_only=True, result_store=None):
+    if remove and result_store is not None:
+        # Runs of other mixes may link to the files that are about to be removed (see result_store.py)
+        from .result_store import copy_linked_files
+        num_copied = copy_linked_files(result_store, result_dir)
+        if num_copied > 0:
+            print(f"[INFO] Copied {num_copied} files that other mixes link to before removing them")
+    conn = open_archive(result_dir)
+    index = load_index(conn, result_dir)
+    runs = list_run_files(result_dir)
+    num_archived = 0
+    num_skipped = 0
+    pending_removal = []
+    for run_files in runs.values():
+        if finished_only and not is_run_done(result_dir, run_files):
+            num_skipped += 1
+            continue
+        for rel_path, size, mtime_ns in run_files:
+            path = f"{result_dir}/{rel_path}"
+            if index.get(path) != (size, mtime_ns):
+                with open(path, "rb") as f:
+                    data = zlib.compress(f.read())
+                conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (rel_path, size, mtime_ns, data))
+            pending_removal.append(path)
+        num_archived += 1
+        if num_archived % COLLECT_BATCH_SIZE == 0:
+            conn.commit()
+            if remove:
+                for path in pending_removal:
+                    os.remove(path)
+            pending_removal = []
+    conn.commit()
+    if remove:
+        for path in pending_removal:
+            os.remove(path)
+    conn.close()
+    return num_archived, num_skipped
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="ResultArchive",
+        description="Collect the per-run result files of a mix into a single indexed archive"
+    )
+    argparser.add_argument("result_dir")
+    argparser.add_argument("--remove", action="store_true", help="remove the collected files from the result directory")
+    argparser.add_argument("--all", action="store_true", help="also collect runs that have not finished")
+    argparser.add_argument("--result_store", default=RESULT_STORE, help="result store whose linked runs are copied before files are removed")
+    argparser.add_argument("--no_result_store", action="store_true")
+    args = argparser.parse_args()
+    result_dir = args.result_dir.rstrip("/")
+    num_archived, num_skipped = collect_runs(result_dir, args.remove, not args.all, None if args.no_result_store else args.result_store)
+    print(f"[INFO] Archived {num_archived} runs to {get_archive_path(result_dir)} ({num_skipped} unfinished runs skipped)")
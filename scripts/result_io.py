@@ -0,0 +1,58 @@
+import os
+import numpy as np
+import pandas as pd
+
+from .run_config import RESULT_FORMAT
+
+RESULT_FORMATS = ["csv", "parquet"]
+
+CATEGORICAL_COLUMNS = ["mitigation", "thresh_type", "trace"]
+INTEGER_COLUMNS = ["tRH", "flat_thresh", "core_id", "pN_key", "pN_val", "pN_min", "pN_max", "pN_count"]
+
+def has_parquet_support():
+    try:
+        import pyarrow
+    except ImportError:
+        return False
+    return True
+
+def set_result_dtypes(df):
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    for column in INTEGER_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(np.int64)
+    if "cache_only" in df.columns:
+        df["cache_only"] = df["cache_only"].astype(bool)
+    return df
+
+def write_result_df(df, csv_dir, name, result_format=RESULT_FORMAT, index=False):
+    if result_format == "parquet" and not has_parquet_support():
+        print(f"[WARN] pyarrow is not installed. Writing {name} as CSV")
+        result_format = "csv"
+    if result_format == "parquet":
+        set_result_dtypes(df.reset_index(drop=True)).to_parquet(f"{csv_dir}/{name}.parquet", index=False)
+    else:
+        df.to_csv(f"{csv_dir}/{name}.csv", index=index)
+
+def get_result_path(csv_dir, name):
+    csv_path = f"{csv_dir}/{name}.csv"
+    parquet_path = f"{csv_dir}/{name}.parquet"
+    if not os.path.exists(parquet_path):
+        return csv_path
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(parquet_path):
+        return csv_path
+    return parquet_path
+
+def read_result_df(csv_dir, name, categorical=True):
+    # Parquet results keep their categorical columns unless the caller edits them as strings (e.g., to build plot labels)
+    path = get_result_path(csv_dir, name)
+    if not path.endswith(".parquet"):
+        return pd.read_csv(path)
+    df = pd.read_parquet(path)
+    if not categorical:
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype(str)
+    return df
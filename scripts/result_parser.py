@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 
 from .run_config import *
@@ -44,51 +45,109 @@ for starter_token in per_core_tokens:
     obj = per_core_tokens[starter_token]
     base_dict[obj["key_name"]] = obj["def_val"]
 
+# Single precompiled matcher over all tokens, longest first so that no token shadows a longer one
+token_table = {}
+for stat_token, stat_obj in per_core_tokens.items():
+    token_table[stat_token] = (True, stat_obj)
+for stat_token, stat_obj in global_tokens.items():
+    token_table[stat_token] = (False, stat_obj)
+
+token_regex = re.compile(
+    r"^[ \t]*(" + "|".join(re.escape(t) for t in sorted(token_table, key=len, reverse=True)) + r")([^:\n]*):([^:\n]*)",
+    re.MULTILINE
+)
+
+# Matches the tokens against the stat names of a JSON stats dump (see stats_dump.py)
+stat_name_regex = re.compile(
+    r"^(" + "|".join(re.escape(t) for t in sorted(token_table, key=len, reverse=True)) + r")(.*)$"
+)
+
+DONE_TOKEN = "CommandCounter"
+PARSE_CHUNK_SIZE = 1 << 20
+
+def process_stat(stat_token, key_suffix, value, per_core_data, global_data):
+    is_per_core, stat_obj = token_table[stat_token]
+    value = value.replace(" ", "")
+    if is_per_core:
+        dict_key = int(key_suffix.replace(" ", ""))
+        if dict_key not in per_core_data:
+            per_core_data[dict_key] = base_dict.copy()
+        per_core_data[dict_key][stat_obj["key_name"]] = stat_obj["parser"](value)
+    else:
+        global_data[stat_obj["key_name"]] = stat_obj["parser"](value)
+
+def process_match(match, per_core_data, global_data):
+    process_stat(*match.groups(), per_core_data, global_data)
+
 def process_line(line, per_core_data, global_data):
-    processed_line = line.lstrip()
-    for stat_token in per_core_tokens:
-        if processed_line.startswith(stat_token):
-            stat_obj = per_core_tokens[stat_token]
-            line_tokens = processed_line.replace(" ", "").split(":")
-            dict_key = int(line_tokens[0].replace(stat_token, ""))
-            if dict_key not in per_core_data:
-                per_core_data[dict_key] = base_dict.copy()
-            per_core_data[dict_key][stat_obj["key_name"]] = stat_obj["parser"](line_tokens[1])
-            return
-
-    for stat_token in global_tokens:
-        if processed_line.startswith(stat_token):
-            stat_obj = global_tokens[stat_token]
-            line_tokens = processed_line.replace(" ", "").split(":")
-            global_data[stat_obj["key_name"]] = stat_obj["parser"](line_tokens[1])
-            return
-
-def parse(result_filename, error_filename):
+    match = token_regex.match(line)
+    if match is not None:
+        process_match(match, per_core_data, global_data)
+
+def parse_stream(f, per_core_data, global_data):
+    # Scan the file in large chunks so that matching happens inside the regex engine instead of per line
+    done = False
+    carry = ""
+    while True:
+        chunk = f.read(PARSE_CHUNK_SIZE)
+        if not chunk:
+            block = carry
+        else:
+            last_newline = chunk.rfind("\n")
+            if last_newline < 0:
+                carry += chunk
+                continue
+            block = carry + chunk[:last_newline + 1]
+            carry = chunk[last_newline + 1:]
+        if not done and DONE_TOKEN in block:
+            done = True
+        for match in token_regex.finditer(block):
+            process_match(match, per_core_data, global_data)
+        if not chunk:
+            break
+    return done
+
+def parse_stats(stats, per_core_data, global_data):
+    # Same as parse_stream for the flattened stats of a JSON stats dump, which are in the order ramulator2 prints them.
+    # Stats of components that exist more than once are named <stat>[<component>] (see stats_dump.flatten_stats), and
+    # like in the text stats the value of the last component wins
+    for name, value in stats.items():
+        match = stat_name_regex.match(name.split("[", 1)[0])
+        if match is not None:
+            process_stat(match.group(1), match.group(2), "nan" if value is None else str(value), per_core_data, global_data)
+
+def open_file(path, mode="r"):
+    if "b" in mode:
+        return open(path, mode)
+    return open(path, mode, encoding="utf-8")
+
+def parse(result_filename, error_filename, open_file=open_file, file_exists=os.path.exists, stats=None):
+    # stats: the flattened JSON stats dump of the run if it has one, which is only written once the run finished
     per_core_data = {}
     global_data = {}
     for starter_token in global_tokens:
         obj = global_tokens[starter_token]
         global_data[obj["key_name"]] = obj["def_val"]
-    status = "RUNNING"
-    if not os.path.exists(result_filename):
+    if not file_exists(result_filename):
         global_data["prog_stat"] = "MISSING"
         return per_core_data, global_data
-    if os.path.exists(error_filename):
-        with open(error_filename, "r", encoding="utf-8") as f:
+    if file_exists(error_filename):
+        with open_file(error_filename) as f:
             if len(f.readlines()) > 1:
                 global_data["prog_stat"] = "ERROR"
                 return per_core_data, global_data
-    with open(result_filename, "r", encoding="utf-8") as f:
-        for line in f:
-            if "CommandCounter" in line:
-                status = "DONE"
-            process_line(line, per_core_data, global_data)
-    global_data["prog_stat"] = status
+    if stats is not None:
+        parse_stats(stats, per_core_data, global_data)
+        global_data["prog_stat"] = "DONE"
+        return per_core_data, global_data
+    with open_file(result_filename) as f:
+        done = parse_stream(f, per_core_data, global_data)
+    global_data["prog_stat"] = "DONE" if done else "RUNNING"
     return per_core_data, global_data 
 
-def parse_command_count(file):
+def parse_command_count(file, open_file=open_file):
     commands = { "VRR": 0 }
-    with open(file, "r", encoding="utf-8") as f:
+    with open_file(file) as f:
         for line in f:
             tokens = line.split(",")
             cmd_name = tokens[0].strip()
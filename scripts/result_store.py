@@ -0,0 +1,196 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import argparse
+
+from . import result_parser as parser
+from . import result_archive
+from .run_config import CONTROLLER
+from .config_gen import make_group_config, make_run_config
+from .stats_dump import get_stats_dump_filename
+from .trace_profile import get_trace_checksum, get_trace_checksums, list_traces
+
+RESULT_STORE_VERSION = 1
+
+def open_store(store_path):
+    conn = sqlite3.connect(store_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS runs (run_key TEXT PRIMARY KEY, config TEXT)")
+    conn.execute("CREATE INDEX IF NOT EXISTS runs_config ON runs (config)")
+    version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if version is None or version[0] != RESULT_STORE_VERSION:
+        conn.execute("DELETE FROM runs")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (RESULT_STORE_VERSION,))
+        conn.commit()
+    return conn
+
+def get_run_files(config_filename, num_cores):
+    # Output files of the run configured by <result_dir>/<mitigation>/configs/<run>.yaml (see setup_*.py)
+    mitigation_dir = os.path.dirname(os.path.dirname(config_filename))
+    run_name = os.path.splitext(os.path.basename(config_filename))[0]
+    return [
+        f"{mitigation_dir}/stats/{run_name}.txt",
+        f"{mitigation_dir}/errors/{run_name}.txt",
+        f"{mitigation_dir}/cmd_count/{run_name}.cmd.count"
+    ] + [f"{mitigation_dir}/mem_latency/{run_name}.memlat.dump.core{i}" for i in range(num_cores)] + [get_stats_dump_filename(config_filename)]
+
+def get_run_status(config_filename, num_cores):
+    # Returns the status of a run (see result_parser.parse) and whether its stats are in the result directory
+    result_file, error_file = get_run_files(config_filename, num_cores)[:2]
+    result_dir = os.path.dirname(os.path.dirname(os.path.dirname(config_filename)))
+    open_file, file_exists = result_archive.get_file_access(result_dir)
+    _, global_stat = parser.parse(result_file, error_file, open_file, file_exists)
+    return global_stat["prog_stat"], os.path.exists(result_file)
+
+def link_run_files(source_config_filename, config_filename, num_cores):
+    # Relative links stay valid inside the container, which mounts the repository at a different path
+    for source_path, path in zip(get_run_files(source_config_filename, num_cores), get_run_files(config_filename, num_cores)):
+        if not os.path.isdir(os.path.dirname(path)):
+            continue
+        if os.path.lexists(path):
+            os.remove(path)
+        os.symlink(os.path.relpath(source_path, os.path.dirname(path)), path)
+
+def unlink_run_files(config_filename, num_cores):
+    # A run that is simulated again must not write its results through the links to another run. Returns whether it was linked
+    linked = False
+    for path in get_run_files(config_filename, num_cores):
+        if os.path.islink(path):
+            os.remove(path)
+            linked = True
+    return linked
+
+def get_store_result_dirs(store_path):
+    # Result directories that can hold runs linked through the store: those of its recorded runs and its sibling directories
+    store_dir = os.path.dirname(os.path.abspath(store_path))
+    if not os.path.isdir(store_dir):
+        return []
+    result_dirs = set(f"{store_dir}/{name}" for name in os.listdir(store_dir))
+    if os.path.exists(store_path):
+        conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+        try:
+            for (config,) in conn.execute("SELECT config FROM runs"):
+                result_dirs.add(os.path.normpath(f"{store_dir}/{os.path.dirname(os.path.dirname(os.path.dirname(config)))}"))
+        except sqlite3.OperationalError:
+            pass
+        conn.close()
+    return sorted(path for path in result_dirs if os.path.isdir(path))
+
+def copy_linked_files(store_path, result_dir):
+    # Replaces the links of other result directories to the run files of result_dir with copies (with the same
+    # modification time), so that the run files can be removed from result_dir. Returns the number of copied files
+    target_dir = os.path.realpath(result_dir)
+    num_copied = 0
+    for other_dir in get_store_result_dirs(store_path):
+        if os.path.realpath(other_dir) == target_dir:
+            continue
+        for mitigation in os.listdir(other_dir):
+            for file_dir in result_archive.RUN_FILE_DIRS:
+                dir_path = f"{other_dir}/{mitigation}/{file_dir}"
+                if not os.path.isdir(dir_path):
+                    continue
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if not entry.is_symlink():
+                            continue
+                        source_path = os.path.realpath(entry.path)
+                        if not source_path.startswith(target_dir + os.sep) or not os.path.exists(source_path):
+                            continue
+                        shutil.copy2(source_path, f"{entry.path}.tmp")
+                        os.replace(f"{entry.path}.tmp", entry.path)
+                        num_copied += 1
+    return num_copied
+
+class ResultStore:
+    # Maps the content of every simulation (its resolved config without output paths, the content of its traces and
+    # the simulator binary) to the first run set up with it, so identical runs of other mixes and sweeps reuse its results
+    def __init__(self, store_path, base_config, simulator_path):
+        self.store_dir = os.path.dirname(os.path.abspath(store_path))
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.conn = open_store(store_path)
+        self.base_config = base_config
+        self.simulator_checksum = get_trace_checksum(simulator_path) if os.path.exists(simulator_path) else None
+        self.group_configs = {}
+        self.trace_checksums = {}
+        self.trace_dirs = set()
+        self.num_linked = 0
+        self.num_done = 0
+
+    def get_run_key(self, params, run):
+        _, traces, no_wait_traces, _, _ = run
+        unknown_traces = [path for path in traces + no_wait_traces if path not in self.trace_checksums]
+        if not all(os.path.exists(path) for path in unknown_traces):
+            return None
+        if len(unknown_traces) > 0:
+            # The traces of a directory are hashed together (in parallel) the first time one of them is used
+            trace_dirs = set(os.path.dirname(path) for path in unknown_traces) - self.trace_dirs
+            self.trace_dirs |= trace_dirs
+            self.trace_checksums.update(get_trace_checksums([f"{trace_dir}/{trace}" for trace_dir in trace_dirs for trace in list_traces(trace_dir)]))
+            self.trace_checksums.update(get_trace_checksums([path for path in unknown_traces if path not in self.trace_checksums]))
+        if params not in self.group_configs:
+            self.group_configs[params] = make_group_config(self.base_config, params)
+        config = make_run_config(self.group_configs[params], (run[0],
+            [self.trace_checksums[path] for path in traces], [self.trace_checksums[path] for path in no_wait_traces], None, None))
+        del config["Frontend"]["lat_dump_path"]
+        config.pop("stats_dump_path", None)
+        del config["MemorySystem"][CONTROLLER]["plugins"][0]["ControllerPlugin"]["path"]
+        content = json.dumps({"simulator": self.simulator_checksum, "config": config}, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def reuse_run(self, params, run):
+        # Returns True if the run does not have to be simulated: it already finished with the same content, or an identical
+        # run finished (or is running) elsewhere and its results are linked. Otherwise the run becomes the source of its content
+        run_key = self.get_run_key(params, run)
+        if run_key is None:
+            return False
+        config_filename = run[0]
+        num_cores = len(run[1]) + len(run[2])
+        rel_config = os.path.relpath(config_filename, self.store_dir)
+        row = self.conn.execute("SELECT config FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+        if row is not None and row[0] == rel_config and get_run_status(config_filename, num_cores)[0] == "DONE":
+            self.num_done += 1
+            return True
+        # The results of this run no longer match the content it was recorded with
+        self.conn.execute("DELETE FROM runs WHERE config = ?", (rel_config,))
+        if row is not None and row[0] != rel_config:
+            source_config_filename = os.path.normpath(f"{self.store_dir}/{row[0]}")
+            if self.can_link(source_config_filename, num_cores):
+                link_run_files(source_config_filename, config_filename, num_cores)
+                self.num_linked += 1
+                return True
+        unlink_run_files(config_filename, num_cores)
+        self.conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?)", (run_key, rel_config))
+        return False
+
+    def can_link(self, source_config_filename, num_cores):
+        # Only runs that have started can be linked: a run that is set up but not started may never be submitted (e.g., its
+        # mix is not launched), archived results cannot be linked and failed runs are simulated again
+        if not os.path.isdir(os.path.dirname(os.path.dirname(source_config_filename))):
+            return False
+        status, on_disk = get_run_status(source_config_filename, num_cores)
+        return on_disk and status in ("DONE", "RUNNING")
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+        if self.num_done + self.num_linked > 0:
+            print(f"[INFO] Skipping {self.num_done} finished runs and {self.num_linked} runs linked to the results of identical runs")
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="ResultStore",
+        description="Summarize the runs recorded in a result store"
+    )
+    argparser.add_argument("store_path")
+    args = argparser.parse_args()
+
+    conn = open_store(args.store_path)
+    result_dirs = {}
+    for (config,) in conn.execute("SELECT config FROM runs"):
+        result_dir = os.path.dirname(os.path.dirname(os.path.dirname(config)))
+        result_dirs[result_dir] = result_dirs.get(result_dir, 0) + 1
+    conn.close()
+    for result_dir, num_runs in sorted(result_dirs.items()):
+        print(f"[INFO] {result_dir}: {num_runs} runs")
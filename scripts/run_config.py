@@ -1,5 +1,6 @@
-import itertools
+import os
 from .calc_rh_parameters import *
+from .sweep import load_sweep, get_sweep_points
 
 SECONDS_IN_MINUTE = 60
 
@@ -9,18 +10,59 @@ SLURM_USERNAME = "$USER"
 # Maximum Slurm jobs
 MAX_SLURM_JOBS = 500 
 
+# Maximum number of tasks in a single Slurm job array (should not exceed the cluster's MaxArraySize)
+SLURM_MAX_ARRAY_SIZE = 1000
+
+# Number of long-lived Podman workers per mix that drain the simulations of run_with_slurm_podman.sh (0 submits one job per simulation)
+PODMAN_NODE_WORKERS = 0
+
 # Delay between submitting Slurm jobs (while job limit is not reached)
 SLURM_SUBMIT_DELAY = 0.1 
 
 # Delay between retrying Slurm job submission (when job limit is reached)
 SLURM_RETRY_DELAY = 1 * SECONDS_IN_MINUTE 
 
-# Number of threads used for the personal computer runs
-PERSONAL_RUN_THREADS = 4
+# Number of parallel simulations for the personal computer runs (None uses all available CPU cores)
+PERSONAL_RUN_THREADS = None
+
+# Minimum available memory (in GB) required to start another personal computer run
+PERSONAL_RUN_MIN_FREE_MEM_GB = 2
+
+# Timeout (in seconds) of a single personal computer run (None disables the timeout)
+PERSONAL_RUN_TIMEOUT = None
+
+# Number of times a failed personal computer run is retried
+PERSONAL_RUN_RETRIES = 1
+
+# Number of worker processes used to parse simulation results (1 parses serially)
+PARSE_JOBS = 1
+
+# Interval (in seconds) at which ./check_run_status.sh --watch checks every run again (changes made on this host are picked up immediately)
+STATUS_WATCH_INTERVAL = 60
+
+# Number of worker processes used to write the simulation configs (None uses all available CPU cores, 1 writes serially)
+CONFIG_GEN_JOBS = None
+
+# How the setup scripts configure each run ("file" writes one config per run, "override" writes one base config per
+# parameter configuration and passes the per-run values to ramulator2 with -p)
+CONFIG_MODE = "file"
+
+# Output format of the parsed result tables ("csv" or "parquet", parquet requires pyarrow)
+RESULT_FORMAT = "csv"
+
+# Whether ramulator2 also writes the stats of every run as a JSON document (<mitigation>/stats/<run>.stats.json), which is
+# parsed instead of the text stats and can be loaded into a single table with all stats by scripts/stats_dump.py
+STATS_DUMP = True
 
 # Memory histogram precision
 MEM_HIST_PREC = 5
 
+# Format of the per-core memory latency histogram dumps ("text" or "binary", binary dumps are faster to parse)
+MEM_LAT_DUMP_FORMAT = "text"
+
+# Columns the latency percentiles are aggregated over in the <name>_mem_summary tables
+MEM_SUMMARY_KEYS = ["mitigation", "thresh_type", "tRH", "pN_key"]
+
 # Number of instructions the slowest core must execute before the simulation ends
 NUM_EXPECTED_INSTS = 100_000_000
 
@@ -32,33 +74,15 @@ SCHEDULER = "BHScheduler"
 RFMMANAGER = 2
 COLUMN_CAP = 4
 
-mitigation_list = []
-tRH_list = []
-flat_thresh_list = []
-dynamic_thresh_list = []
-thresh_type_list = []
-cache_only_list = []
-
-# List of evaluated RowHammer mitigation mechanisms
-mitigation_list = ["AQUA", "Graphene", "Hydra", "PARA", "REGA", "RFM", "TWiCe-Ideal"]
-
-# List of evaluated RowHammer thresholds
-tRH_list = [4096, 2048, 1024, 512, 256, 128, 64]
-
-# BreakHammer parameters
-flat_thresh_list = [32]
-dynamic_thresh_list = [0.65]
-thresh_type_list = ["MEAN"]
-cache_only_list = [False]
-
-params_list = [
-    mitigation_list,
-    thresh_type_list,
-    cache_only_list,
-    tRH_list,
-    flat_thresh_list,
-    dynamic_thresh_list
-]
+# Sweep specification of the simulated parameter points (see sweeps/breakhammer.yaml)
+SWEEP_FILE = f"{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}/sweeps/breakhammer.yaml"
+
+# Store of the simulated run contents shared by all mixes and sweeps, the setup scripts skip runs whose identical run
+# already finished (or is set up to run) and link its results instead (None disables the store)
+RESULT_STORE = f"{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}/ae_results/result_store.sqlite"
+
+# Blocks of the sweep that are set up and parsed (None uses every block), the baselines of a block are always included
+SWEEP_BLOCKS = None
 
 PARAM_STR_LIST = [
     "mitigation",
@@ -69,19 +93,27 @@ PARAM_STR_LIST = [
     "dynamic_thresh"
 ]
 
-def get_multicore_params_list():
-    params = list(itertools.product(*params_list))
-    for cache_only in cache_only_list:
-        params.append(("Dummy", "NONE", cache_only, 0, 0, 0.0))
-    for mitigation in mitigation_list:
-        for tRH in tRH_list:
-            params.append((mitigation, "NONE", False, tRH, 0, 0.0))
-    for tRH in tRH_list:
-        params.append(("BlockHammer", "NONE", False, tRH, 0, 0.0))
-    return params
-
-def get_singlecore_params_list():
-    return [("Dummy", "NONE", False, 0, 0, 0.0)]
+def get_sweep(sweep_file=SWEEP_FILE):
+    sweep = load_sweep(sweep_file)
+    if sweep["parameters"] != PARAM_STR_LIST:
+        raise ValueError(f"{sweep_file} parameters must be {', '.join(PARAM_STR_LIST)}")
+    return sweep
+
+def get_multicore_sweep_points(sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
+    return get_sweep_points(get_sweep(sweep_file), "multicore", sweep_blocks)
+
+def get_singlecore_sweep_points(sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
+    return get_sweep_points(get_sweep(sweep_file), "singlecore", sweep_blocks)
+
+def get_multicore_params_list(sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
+    return [point.params for point in get_multicore_sweep_points(sweep_file, sweep_blocks)]
+
+def get_singlecore_params_list(sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
+    return [point.params for point in get_singlecore_sweep_points(sweep_file, sweep_blocks)]
+
+def get_sweep_mitigations(sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
+    params_list = get_multicore_params_list(sweep_file, sweep_blocks) + get_singlecore_params_list(sweep_file, sweep_blocks)
+    return list(dict.fromkeys(params[0] for params in params_list))
 
 def get_trace_lists(trace_combination_file):
     trace_comb_line_count = 0
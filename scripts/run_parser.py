@@ -1,9 +1,22 @@
 import os
 import sys
+import time
+import argparse
+import numpy as np
 import pandas as pd
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 
 from . import result_parser as parser
 from . import mem_parser
+from . import parse_cache
+from . import result_io
+from . import result_archive
+from .run_status import probe_run_status, RunStatusWatcher
+from .stats_dump import STATS_DUMP_SUFFIX, load_stats_dump
+from .slurm_array import write_array_task_script, write_manifest, get_array_submit_commands, get_array_wait_lines
+from .config_gen import load_run_overrides, get_rerun_config_args
+from .result_store import unlink_run_files
 from .run_config import *
 
 SBATCH_CMD = "sbatch --exclude=kratos10,kratos17,kratos18,kratos19 --cpus-per-task=1 --nodes=1 --ntasks=1"
@@ -12,9 +25,16 @@ PRINT_ERROR = False
 PRINT_MISSING = False
 PRINT_RUNNING = False
 
-def dump_runs(work_dir, result_dir, missing_runs, filename):
+def dump_runs(work_dir, result_dir, missing_runs, filename, num_cores):
     if not os.path.exists(f"{work_dir}/rerun_scripts"):
         os.makedirs(f"{work_dir}/rerun_scripts")
+    # Runs linked to the results of an identical run (see result_store.py) would overwrite them when simulated again
+    num_unlinked = 0
+    for mitigation, stat_str, trace in missing_runs:
+        config_filename = f"{result_dir}/{mitigation}/configs/{stat_str}_{trace}.yaml"
+        num_unlinked += unlink_run_files(config_filename, num_cores)
+    if num_unlinked > 0:
+        print(f"[INFO] Removed the links of {num_unlinked} runs to the results of identical runs")
     slurm_filename = f"{work_dir}/rerun_scripts/{filename}_slurm.sh"
     with open(slurm_filename, "w") as f:
         f.write("#! /bin/bash\n")
@@ -29,6 +49,7 @@ def dump_runs(work_dir, result_dir, missing_runs, filename):
             sb_cmd += f" {sbatch_filename}"
             f.write(f"{sb_cmd}\n")
 
+    run_overrides = load_run_overrides(result_dir)
     personal_filename = f"{work_dir}/rerun_scripts/{filename}_personal.sh"
     with open(personal_filename, "w") as f:
         f.write("#! /bin/bash\n")
@@ -36,111 +57,247 @@ def dump_runs(work_dir, result_dir, missing_runs, filename):
             config_filename = f"{result_dir}/{mitigation}/configs/{stat_str}_{trace}.yaml"
             result_filename = f"{result_dir}/{mitigation}/stats/{stat_str}_{trace}.txt"
             f.write(f"echo \"[INFO] Running configuration '{config_filename}' with output at '{result_filename}'\"\n")
-            f.write(f"{work_dir}/ramulator2 -f {config_filename} > {result_filename} 2>&1\n")
+            f.write(f"{work_dir}/ramulator2 {get_rerun_config_args(result_dir, config_filename, run_overrides)} > {result_filename} 2>&1\n")
+
+    manifest_filename = f"{work_dir}/rerun_scripts/{filename}_manifest.txt"
+    manifest_cmds = []
+    for mitigation, stat_str, trace in missing_runs:
+        config_filename = f"{result_dir}/{mitigation}/configs/{stat_str}_{trace}.yaml"
+        result_filename = f"{result_dir}/{mitigation}/stats/{stat_str}_{trace}.txt"
+        error_filename = f"{result_dir}/{mitigation}/errors/{stat_str}_{trace}.txt"
+        manifest_cmds.append(f"{work_dir}/ramulator2 {get_rerun_config_args(result_dir, config_filename, run_overrides)} > {result_filename} 2> {error_filename}")
+    write_manifest(manifest_filename, manifest_cmds)
+    task_script = write_array_task_script(f"{work_dir}/rerun_scripts")
+    slurm_array_filename = f"{work_dir}/rerun_scripts/{filename}_slurm_array.sh"
+    with open(slurm_array_filename, "w") as f:
+        f.write("#! /bin/bash\n")
+        submit_cmds = get_array_submit_commands(SBATCH_CMD, work_dir, "cpu_part", task_script,\
+                                                    manifest_filename, len(manifest_cmds), f"{work_dir}/rerun_scripts")
+        for line in get_array_wait_lines(submit_cmds) + submit_cmds:
+            f.write(f"{line}\n")
 
     os.system(f"chmod uog+x {slurm_filename}")
     os.system(f"chmod uog+x {personal_filename}")
+    os.system(f"chmod uog+x {slurm_array_filename}")
+
+def get_df_columns(num_cores):
+    return PARAM_STR_LIST + ["trace"] + [f"ipc_{i}" for i in range(num_cores)] +\
+            ["VRR", "RFM", "RRS_reswap", "RRS_unswap", "RRS_swap",\
+            "AQUA_migrate", "AQUA_r_migrate"] + ["total_energy"] +\
+            [f"insn_{i}" for i in range(num_cores)]
+
+def get_mem_df_columns():
+    return PARAM_STR_LIST + ["trace", "core_id", "pN_key", "pN_val"]
+
+def build_mem_df(mem_blocks):
+    if len(mem_blocks) == 0:
+        return pd.DataFrame(columns=get_mem_df_columns())
+    mem_df = pd.DataFrame.from_records([run_key for run_key, _, _, _ in mem_blocks], columns=PARAM_STR_LIST + ["trace"])
+    mem_df = mem_df.loc[mem_df.index.repeat([len(core_ids) for _, core_ids, _, _ in mem_blocks])].reset_index(drop=True)
+    mem_df["core_id"] = np.concatenate([core_ids for _, core_ids, _, _ in mem_blocks])
+    mem_df["pN_key"] = np.concatenate([pN_keys for _, _, pN_keys, _ in mem_blocks])
+    mem_df["pN_val"] = np.concatenate([pN_vals for _, _, _, pN_vals in mem_blocks])
+    return mem_df
 
-def check_runs(work_dir, result_dir, csv_dir, trace_name_list, num_cores, name_prefix, mix_name, parse_results):
+def get_mem_summary_df_columns():
+    return MEM_SUMMARY_KEYS + ["pN_mean", "pN_min", "pN_max", "pN_count"]
+
+def build_mem_summary_df(mem_df):
+    # Latency of each percentile aggregated over all traces and cores of a configuration
+    if len(mem_df) == 0:
+        return pd.DataFrame(columns=get_mem_summary_df_columns())
+    summary_df = mem_df.groupby(MEM_SUMMARY_KEYS)["pN_val"].agg(["mean", "min", "max", "count"]).reset_index()
+    summary_df.columns = get_mem_summary_df_columns()
+    return summary_df
+
+def get_run_files(result_dir, item, trace_name, num_cores):
+    stat_str = make_stat_str(item[1:])
+    result_file = f"{result_dir}/{item[0]}/stats/{stat_str}_{trace_name}.txt"
+    error_file = f"{result_dir}/{item[0]}/errors/{stat_str}_{trace_name}.txt"
+    cmd_count_file = f"{result_dir}/{item[0]}/cmd_count/{stat_str}_{trace_name}.cmd.count"
+    mem_latency_file = f"{result_dir}/{item[0]}/mem_latency/{stat_str}_{trace_name}.memlat.dump"
+    stats_dump_file = f"{result_dir}/{item[0]}/stats/{stat_str}_{trace_name}{STATS_DUMP_SUFFIX}"
+    return [result_file, error_file, cmd_count_file] + [f"{mem_latency_file}.core{i}" for i in range(num_cores)] + [stats_dump_file]
+
+def parse_run(result_dir, item, trace_name, num_cores, parse_results):
+    item = list(item)
+    result_file, error_file, cmd_count_file, *mem_latency_files, stats_dump_file = get_run_files(result_dir, item, trace_name, num_cores)
+    open_file, file_exists = result_archive.get_file_access(result_dir)
+    if not parse_results:
+        return probe_run_status(result_file, error_file, open_file, file_exists), None, None
+    stats = load_stats_dump(stats_dump_file, open_file) if file_exists(stats_dump_file) else None
+    core_stat, global_stat = parser.parse(result_file, error_file, open_file, file_exists, stats)
+    prog_stat = global_stat["prog_stat"]
+    if prog_stat != "DONE":
+        return prog_stat, None, None
+    pN_keys = []
+    pN_vals = []
+    for i in range(num_cores):
+        core_pN_keys, core_pN_vals = mem_parser.get_percentiles(*mem_parser.load_mem_hist(mem_latency_files[i], open_file))
+        pN_keys.append(core_pN_keys)
+        pN_vals.append(core_pN_vals)
+    core_ids = np.repeat(np.arange(num_cores), [len(core_pN_keys) for core_pN_keys in pN_keys])
+    mem_block = (tuple(item + [trace_name]), core_ids, np.concatenate(pN_keys), np.concatenate(pN_vals))
+    num_commands = parser.parse_command_count(cmd_count_file, open_file)
+    item += [trace_name]
+    item += [parser.metric_ipc(core_stat[core_id]) for core_id in range(num_cores)]
+    item += [num_commands["VRR"], global_stat["RFM"], global_stat["RRS_reswap"],\
+                global_stat["RRS_unswap"], global_stat["RRS_swap"], global_stat["AQUA_migrate"],
+                global_stat["AQUA_r_migrate"]]
+    item += [global_stat["total_energy"]]
+    item += [core_stat[core_id]["ins"] for core_id in range(num_cores)]
+    return prog_stat, tuple(item), mem_block
+
+def check_runs(work_dir, result_dir, csv_dir, trace_name_list, num_cores, name_prefix, mix_name, parse_results, jobs=PARSE_JOBS, use_cache=True, result_format=RESULT_FORMAT, sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
     running = 0
     missing = 0
     error = 0
     done = 0
-    num_configs = len(trace_name_list) *\
-        len(get_singlecore_params_list() if "single" in name_prefix else get_multicore_params_list())
-    stat_expected_size = num_configs 
-    df_index = 0
-    df = pd.DataFrame(index=range(stat_expected_size), columns=PARAM_STR_LIST + ["trace"] + [f"ipc_{i}" for i in range(num_cores)] +\
-                        ["VRR", "RFM", "RRS_reswap", "RRS_unswap", "RRS_swap",\
-                        "AQUA_migrate", "AQUA_r_migrate"] + ["total_energy"] +\
-                        [f"insn_{i}" for i in range(num_cores)])
-    mem_expected_size = 101 * 4 * num_configs
-    mem_df_index = 0
-    mem_df = pd.DataFrame(index = range(mem_expected_size), columns = PARAM_STR_LIST + ["trace", "core_id", "pN_key", "pN_val"])
+    if "single" in name_prefix:
+        params_list = get_singlecore_params_list(sweep_file, sweep_blocks)
+    else:
+        params_list = get_multicore_params_list(sweep_file, sweep_blocks)
+    runs = [(item, trace_name) for trace_name in trace_name_list for item in params_list]
+    rows = []
+    mem_blocks = []
     error_runs = []
     missing_runs = []
-    for trace_name in trace_name_list:
-        params_list = get_singlecore_params_list() if "single" in name_prefix else get_multicore_params_list()
-        for item in params_list:
-            item = list(item)
-            stat_str = make_stat_str(item[1:])
-            result_file = f"{result_dir}/{item[0]}/stats/{stat_str}_{trace_name}.txt"
-            error_file = f"{result_dir}/{item[0]}/errors/{stat_str}_{trace_name}.txt"
-            cmd_count_file = f"{result_dir}/{item[0]}/cmd_count/{stat_str}_{trace_name}.cmd.count"
-            mem_latency_file = f"{result_dir}/{item[0]}/mem_latency/{make_stat_str(item[1:])}_{trace_name}.memlat.dump"
-            core_stat, global_stat = parser.parse(result_file, error_file)
-            if global_stat["prog_stat"] == "ERROR":
-                error += 1
-                error_runs.append((item[0], stat_str, trace_name))
-                continue 
-            if global_stat["prog_stat"] == "MISSING":
-                missing += 1
-                missing_runs.append((item[0], stat_str, trace_name))
-                continue 
-            if global_stat["prog_stat"] == "RUNNING":
-                running += 1
-                continue
-            done += 1
-            if not parse_results:
-                continue
-            for i in range(num_cores):
-                mem_hist = mem_parser.get_mem_hist(f"{mem_latency_file}.core{i}")
-                if len(mem_hist) == 0:
-                    for pN in range(101):
-                        mem_df.iloc[mem_df_index] = item + [trace_name, i, pN, 0]
-                        mem_df_index += 1
-                    continue
-                _, total_reqs = mem_hist[-1]
-                n_percentile = 0
-                pN_step = total_reqs / 100
-                for bucket, running_sum in mem_hist:
-                    while running_sum >= (pN_step * n_percentile):
-                        mem_df.iloc[mem_df_index] = item + [trace_name, i, n_percentile, bucket + MEM_HIST_PREC - 1]
-                        n_percentile += 1
-                        mem_df_index += 1
-            num_commands = parser.parse_command_count(cmd_count_file)
-            item += [trace_name]
-            item += [parser.metric_ipc(core_stat[core_id]) for core_id in range(num_cores)]
-            item += [num_commands["VRR"], global_stat["RFM"], global_stat["RRS_reswap"],\
-                        global_stat["RRS_unswap"], global_stat["RRS_swap"], global_stat["AQUA_migrate"],
-                        global_stat["AQUA_r_migrate"]]
-            item += [global_stat["total_energy"]]
-            item += [core_stat[core_id]["ins"] for core_id in range(num_cores)]
-            df.iloc[df_index] =  item 
-            df_index += 1
     if not os.path.exists(csv_dir):
         os.makedirs(csv_dir)
+    results = [None] * len(runs)
+    cache = parse_cache.open_cache(csv_dir) if use_cache else None
+    if cache is not None:
+        cached_runs = parse_cache.load_runs(cache)
+        archive_index = result_archive.get_archive_index(result_dir)
+        run_keys = []
+        signatures = []
+        for idx, (item, trace_name) in enumerate(runs):
+            run_files = get_run_files(result_dir, item, trace_name, num_cores)
+            run_keys.append(run_files[0])
+            signatures.append(parse_cache.get_run_signature(run_files, num_cores, archive_index))
+            results[idx] = parse_cache.get_cached_result(cached_runs, run_keys[idx], signatures[idx], parse_results)
+    pending = [idx for idx in range(len(runs)) if results[idx] is None]
+    if cache is not None:
+        print(f" >Cached : {len(runs) - len(pending)}")
+    run_args = (
+        repeat(result_dir),
+        [runs[idx][0] for idx in pending],
+        [runs[idx][1] for idx in pending],
+        repeat(num_cores),
+        repeat(parse_results)
+    )
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            parsed_results = list(executor.map(parse_run, *run_args, chunksize=max(1, len(pending) // (jobs * 8))))
+    else:
+        parsed_results = list(map(parse_run, *run_args))
+    for idx, result in zip(pending, parsed_results):
+        results[idx] = result
+    if cache is not None:
+        parse_cache.store_runs(cache, [(run_keys[idx], signatures[idx], parse_results, results[idx]) for idx in pending])
+        cache.close()
+    for (item, trace_name), (prog_stat, row, mem_block) in zip(runs, results):
+        stat_str = make_stat_str(item[1:])
+        if prog_stat == "ERROR":
+            error += 1
+            error_runs.append((item[0], stat_str, trace_name))
+            continue 
+        if prog_stat == "MISSING":
+            missing += 1
+            missing_runs.append((item[0], stat_str, trace_name))
+            continue 
+        if prog_stat == "RUNNING":
+            running += 1
+            continue
+        done += 1
+        if not parse_results:
+            continue
+        rows.append(row)
+        mem_blocks.append(mem_block)
     print(f" >Done   : {done}\n >Running: {running}\n >Error  : {error}\n >Missing: {missing}")
     if len(error_runs) > 0:
-        dump_runs(work_dir, result_dir, error_runs, f"{mix_name}_{name_prefix}_error")
+        dump_runs(work_dir, result_dir, error_runs, f"{mix_name}_{name_prefix}_error", num_cores)
         print(f"[INFO] You can rerun simulations with errors using scripts at: {work_dir}/rerun_scripts")
     if len(missing_runs) > 0:
-        dump_runs(work_dir, result_dir, missing_runs, f"{mix_name}_{name_prefix}_missing")
+        dump_runs(work_dir, result_dir, missing_runs, f"{mix_name}_{name_prefix}_missing", num_cores)
         print(f"[INFO] You can rerun missing simulations using scripts at: {work_dir}/rerun_scripts" +\
                 " (if you are using slurm make sure these runs are not waiting for resources)")
     if not parse_results:
         return
-    mem_df = mem_df[:mem_df_index]
-    df = df[:df_index]
-    df.to_csv(f"{csv_dir}/{name_prefix}.csv", index=False)
-    mem_df.to_csv(f"{csv_dir}/{name_prefix}_mem.csv", index=False)
+    df = pd.DataFrame.from_records(rows, columns=get_df_columns(num_cores))
+    mem_df = build_mem_df(mem_blocks)
+    result_io.write_result_df(df, csv_dir, name_prefix, result_format)
+    result_io.write_result_df(mem_df, csv_dir, f"{name_prefix}_mem", result_format)
+    result_io.write_result_df(build_mem_summary_df(mem_df), csv_dir, f"{name_prefix}_mem_summary", result_format)
 
-def parse_runs(work_dir, result_dir, csv_dir, trace_path, num_cores, parse_results):
+def parse_runs(work_dir, result_dir, csv_dir, trace_path, num_cores, parse_results, jobs=PARSE_JOBS, use_cache=True, result_format=RESULT_FORMAT, sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
     singlecore_trace_list, multicore_trace_list = get_trace_lists(trace_path)
     mix_name = trace_path[trace_path.rindex("/")+1:trace_path.rindex(".mix")]
     action_str = "Parsing" if parse_results else "Checking"
     caution_str = " (This might take a while, e.g., >5 mins)" if parse_results else ""
     print(f"[INFO] {action_str} {mix_name} multicore runs{caution_str}")
-    check_runs(work_dir, result_dir, csv_dir, multicore_trace_list, num_cores, "multicore", mix_name, parse_results)
+    check_runs(work_dir, result_dir, csv_dir, multicore_trace_list, num_cores, "multicore", mix_name, parse_results, jobs, use_cache, result_format, sweep_file, sweep_blocks)
     print(f"[INFO] {action_str} {mix_name} singlecore runs")
-    check_runs(work_dir, result_dir, csv_dir, singlecore_trace_list, 1, "singlecore", mix_name, parse_results)
+    check_runs(work_dir, result_dir, csv_dir, singlecore_trace_list, 1, "singlecore", mix_name, parse_results, jobs, use_cache, result_format, sweep_file, sweep_blocks)
+
+def watch_runs(result_dir, trace_path, num_cores, interval=STATUS_WATCH_INTERVAL, sweep_file=SWEEP_FILE, sweep_blocks=SWEEP_BLOCKS):
+    singlecore_trace_list, multicore_trace_list = get_trace_lists(trace_path)
+    mix_name = trace_path[trace_path.rindex("/")+1:trace_path.rindex(".mix")]
+    groups = [
+        ("multicore", multicore_trace_list, num_cores, get_multicore_params_list(sweep_file, sweep_blocks)),
+        ("singlecore", singlecore_trace_list, 1, get_singlecore_params_list(sweep_file, sweep_blocks))
+    ]
+    runs = {}
+    group_runs = {}
+    for name_prefix, trace_name_list, run_cores, params_list in groups:
+        group_runs[name_prefix] = [(name_prefix, tuple(item), trace_name) for trace_name in trace_name_list for item in params_list]
+        for run in group_runs[name_prefix]:
+            runs[run] = tuple(get_run_files(result_dir, run[1], run[2], run_cores)[:2])
+    open_file, file_exists = result_archive.get_file_access(result_dir)
+    watcher = RunStatusWatcher(runs, interval, open_file, file_exists)
+    watch_str = "on file changes and " if watcher.uses_inotify() else ""
+    print(f"[INFO] Watching {mix_name} runs ({watch_str}every {interval} s), press Ctrl+C to stop")
+    try:
+        while True:
+            if watcher.wait() == 0:
+                continue
+            counts = {name_prefix: watcher.get_counts(group_runs[name_prefix]) for name_prefix in group_runs}
+            count_str = " | ".join(f"{name_prefix} done {c['DONE']}, running {c['RUNNING']}, error {c['ERROR']}, missing {c['MISSING']}" for name_prefix, c in counts.items())
+            print(f"[INFO] {time.strftime('%H:%M:%S')} {mix_name}: {count_str}", flush=True)
+            if all(c["RUNNING"] + c["MISSING"] == 0 for c in counts.values()):
+                print(f"[INFO] All {mix_name} runs finished, run ./check_run_status.sh to write the rerun scripts of failed runs")
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def get_argparser(prog, description):
+    argparser = argparse.ArgumentParser(prog=prog, description=description)
+    argparser.add_argument("work_dir")
+    argparser.add_argument("trace_path")
+    argparser.add_argument("result_dir")
+    argparser.add_argument("num_benign_cores", type=int)
+    argparser.add_argument("-j", "--jobs", type=int, default=PARSE_JOBS)
+    argparser.add_argument("--no_cache", action="store_true")
+    argparser.add_argument("--format", choices=result_io.RESULT_FORMATS, default=RESULT_FORMAT)
+    argparser.add_argument("--sweep_file", default=SWEEP_FILE)
+    argparser.add_argument("--sweep_blocks", nargs="*", default=SWEEP_BLOCKS)
+    return argparser
 
 if __name__ == "__main__":
-    work_dir = sys.argv[1]
-    trace_path = sys.argv[2]
-    result_dir = sys.argv[3]
-    num_benign_cores = int(sys.argv[4])
+    argparser = get_argparser("RunParser", "Check the status of ramulator2 simulation runs")
+    argparser.add_argument("--watch", action="store_true")
+    argparser.add_argument("--interval", type=float, default=STATUS_WATCH_INTERVAL)
+    args = argparser.parse_args()
+    work_dir = args.work_dir
+    trace_path = args.trace_path
+    result_dir = args.result_dir
+    num_benign_cores = args.num_benign_cores
     csv_dir = f"{result_dir}/_csvs"
     if not os.path.exists(csv_dir):
         os.makedirs(csv_dir)
-    parse_runs(work_dir, result_dir, csv_dir, trace_path, num_benign_cores, False)
\ No newline at end of file
+    if args.watch:
+        watch_runs(result_dir, trace_path, num_benign_cores, args.interval, args.sweep_file, args.sweep_blocks)
+        sys.exit(0)
+    parse_runs(work_dir, result_dir, csv_dir, trace_path, num_benign_cores, False, args.jobs, not args.no_cache, args.format, args.sweep_file, args.sweep_blocks)
\ No newline at end of file
@@ -1,27 +1,33 @@
 import os
-import sys
 import pandas as pd
 
 from .run_config import *
-from .run_parser import parse_runs
+from .run_parser import parse_runs, get_argparser
+from .result_io import read_result_df, write_result_df
 
-def merge_alone_ipcs_dummy(row, sc_df, mixes):
-    if row["trace"] in mixes:
-        workload_mix = mixes[row["trace"]]
-        for core, workload in enumerate(workload_mix):
-            matching_row = sc_df[\
-                (sc_df.mitigation == "Dummy") &\
-                (sc_df.workload == workload)]
-            row[f"aipc_{int(core)}"] = matching_row["alone_ipc"].values[0]
-        return row
+def get_alone_ipcs_dummy(sc_df, mixes, traces):
+    alone_df = sc_df[sc_df.mitigation == "Dummy"].drop_duplicates(subset="workload", keep="first")
+    mix_df = pd.DataFrame(
+        [(mix, core, workload) for mix in traces if mix in mixes for core, workload in enumerate(mixes[mix])],
+        columns=["trace", "core", "workload"]
+    )
+    mix_df = mix_df.merge(alone_df[["workload", "alone_ipc"]], on="workload", how="left")
+    missing_df = mix_df[mix_df.alone_ipc.isna()]
+    if len(missing_df) > 0:
+        missing_workloads = ", ".join(sorted(missing_df.workload.unique()))
+        raise ValueError(f"No alone IPC (Dummy singlecore run) found for workload(s): {missing_workloads}." +\
+                            " Check the singlecore runs with check_run_status.sh")
+    aipc_df = mix_df.pivot(index="trace", columns="core", values="alone_ipc")
+    aipc_df.columns = [f"aipc_{int(core)}" for core in aipc_df.columns]
+    return aipc_df.reset_index()
 
-def process_results(csv_dir, trace_path, num_cores):
-    sc_df = pd.read_csv(f"{csv_dir}/singlecore.csv")
+def process_results(csv_dir, trace_path, num_cores, result_format=RESULT_FORMAT):
+    sc_df = read_result_df(csv_dir, "singlecore")
     sc_df.drop(columns=list(set(sc_df.columns) - set(["mitigation", "thresh_type", "tRH", "flat_thresh", "dynamic_thresh", "trace", "ipc_0"])), inplace=True)
     sc_df["alone_ipc"] = sc_df["ipc_0"]
     sc_df["workload"] = sc_df["trace"]
 
-    mc_df = pd.read_csv(f"{csv_dir}/multicore.csv")
+    mc_df = read_result_df(csv_dir, "multicore")
 
     trace_combination_file = open(trace_path, "r")
     mixes = {}
@@ -33,7 +39,7 @@ def process_results(csv_dir, trace_path, num_cores):
         mixes[mix] = traces
         types[mix] = trace_type
 
-    mc_df = mc_df.apply(lambda row: merge_alone_ipcs_dummy(row, sc_df, mixes), axis=1)
+    mc_df = mc_df.merge(get_alone_ipcs_dummy(sc_df, mixes, mc_df.trace.unique()), on="trace", how="left")
 
     # Calculate the shared IPCs
     for core_id in range(num_cores):
@@ -62,16 +68,17 @@ def process_results(csv_dir, trace_path, num_cores):
     for metric in ["weighted_speedup", "harmonic_speedup", "max_slowdown"]:
         merged_df[f"norm_{metric}"] = merged_df[metric] / merged_df[f"{metric}_base"]
     merged_df["norm_energy"] = merged_df["total_energy"] / merged_df["total_energy_base"]
-    merged_df.to_csv(f"{csv_dir}/merged.csv")
+    write_result_df(merged_df, csv_dir, "merged", result_format, index=True)
 
 if __name__ == "__main__":
-    work_dir = sys.argv[1]
-    trace_path = sys.argv[2]
-    result_dir = sys.argv[3]
-    num_benign_cores = int(sys.argv[4])
+    args = get_argparser("RunProcessor", "Parse ramulator2 simulation results and extract statistics").parse_args()
+    work_dir = args.work_dir
+    trace_path = args.trace_path
+    result_dir = args.result_dir
+    num_benign_cores = args.num_benign_cores
     csv_dir = f"{result_dir}/_csvs"
     if not os.path.exists(csv_dir):
         os.makedirs(csv_dir)
-    parse_runs(work_dir, result_dir, csv_dir, trace_path, num_benign_cores, True)
+    parse_runs(work_dir, result_dir, csv_dir, trace_path, num_benign_cores, True, args.jobs, not args.no_cache, args.format, args.sweep_file, args.sweep_blocks)
     print("[INFO] Extracting statistics from raw simulation data")
-    process_results(csv_dir, trace_path, num_benign_cores)
\ No newline at end of file
+    process_results(csv_dir, trace_path, num_benign_cores, args.format)
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import time
+import ctypes
+import select
+import struct
+import ctypes.util
+
+from .result_parser import DONE_TOKEN, open_file
+
+# The stats are printed when a simulation ends, with the memory system (and its CommandCounter) last, so the completion
+# marker of a finished run is found in the tail of its (large) stats file. Running simulations have only printed a few lines
+STATUS_TAIL_BYTES = 64 << 10
+STATUS_READ_SIZE = 1 << 20
+
+# Directory changes that can change the status of a run
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MOVED_FROM = 0x040
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MOVED_FROM
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# Events of a burst of writes are collected together before the affected runs are probed
+WATCH_SETTLE_TIME = 1
+
+def contains_token(f, token, start=0):
+    f.seek(start)
+    carry = b""
+    while True:
+        chunk = f.read(STATUS_READ_SIZE)
+        if not chunk:
+            return False
+        window = carry + chunk
+        if token in window:
+            return True
+        carry = window[-(len(token) - 1):]
+
+def is_done(result_file, open_file=open_file):
+    token = DONE_TOKEN.encode()
+    with open_file(result_file, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        tail_start = max(0, f.tell() - STATUS_TAIL_BYTES)
+        if contains_token(f, token, tail_start):
+            return True
+        return tail_start > 0 and contains_token(f, token)
+
+def has_multiple_lines(error_file, open_file=open_file):
+    # Same as len(readlines()) > 1, reading only up to the start of the second line
+    with open_file(error_file, "rb") as f:
+        while True:
+            chunk = f.read(STATUS_READ_SIZE)
+            if not chunk:
+                return False
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            if newline < len(chunk) - 1:
+                return True
+            return len(f.read(1)) > 0
+
+def probe_run_status(result_file, error_file, open_file=open_file, file_exists=os.path.exists):
+    # Classifies a run like result_parser.parse without tokenizing its stats
+    if not file_exists(result_file):
+        return "MISSING"
+    if file_exists(error_file) and has_multiple_lines(error_file, open_file):
+        return "ERROR"
+    return "DONE" if is_done(result_file, open_file) else "RUNNING"
+
+def get_status_signature(result_file, error_file):
+    signature = []
+    for path in [result_file, error_file]:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def open_inotify(dirs):
+    # Returns an inotify file descriptor watching the given directories, or None if inotify is unavailable
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None, {}
+    if fd < 0:
+        return None, {}
+    watches = {}
+    for watch_dir in dirs:
+        wd = libc.inotify_add_watch(fd, os.fsencode(watch_dir), WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            return None, {}
+        watches[wd] = watch_dir
+    return fd, watches
+
+def read_inotify_paths(fd, watches):
+    paths = set()
+    while True:
+        try:
+            data = os.read(fd, 1 << 16)
+        except BlockingIOError:
+            return paths
+        offset = 0
+        while offset < len(data):
+            wd, _, _, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + name_len].rstrip(b"\0")
+            offset += INOTIFY_EVENT.size + name_len
+            if wd in watches and len(name) > 0:
+                paths.add(f"{watches[wd]}/{os.fsdecode(name)}")
+
+class RunStatusWatcher:
+    # Keeps the status of a set of runs up to date: only runs whose stats or error file changed size or
+    # modification time are probed again. inotify reports local changes right away, while changes made by
+    # other hosts of a shared file system (which inotify does not see) are found by polling every interval
+    def __init__(self, runs, interval, open_file=open_file, file_exists=os.path.exists):
+        # runs: {run: (result_file, error_file)}
+        self.runs = runs
+        self.interval = interval
+        self.open_file = open_file
+        self.file_exists = file_exists
+        self.run_of_file = {}
+        for run, files in runs.items():
+            for path in files:
+                self.run_of_file[path] = run
+        self.signatures = {}
+        self.statuses = {}
+        watch_dirs = sorted(set(os.path.dirname(path) for path in self.run_of_file if os.path.isdir(os.path.dirname(path))))
+        self.inotify_fd, self.watches = open_inotify(watch_dirs)
+        self.next_poll = 0
+
+    def uses_inotify(self):
+        return self.inotify_fd is not None
+
+    def refresh(self, runs=None):
+        changed = 0
+        for run in self.runs if runs is None else runs:
+            result_file, error_file = self.runs[run]
+            signature = get_status_signature(result_file, error_file)
+            if self.signatures.get(run) == signature and run in self.statuses:
+                continue
+            self.signatures[run] = signature
+            status = probe_run_status(result_file, error_file, self.open_file, self.file_exists)
+            if self.statuses.get(run) != status:
+                changed += 1
+            self.statuses[run] = status
+        return changed
+
+    def wait(self):
+        # Blocks until files of some runs change (inotify) or the next poll is due, then refreshes the affected runs
+        now = time.monotonic()
+        if self.inotify_fd is not None and now < self.next_poll:
+            ready, _, _ = select.select([self.inotify_fd], [], [], self.next_poll - now)
+            if len(ready) > 0:
+                time.sleep(WATCH_SETTLE_TIME)
+                paths = read_inotify_paths(self.inotify_fd, self.watches)
+                return self.refresh(set(self.run_of_file[path] for path in paths if path in self.run_of_file))
+        elif now < self.next_poll:
+            time.sleep(self.next_poll - now)
+        self.next_poll = time.monotonic() + self.interval
+        return self.refresh()
+
+    def get_counts(self, runs=None):
+        counts = {"DONE": 0, "RUNNING": 0, "ERROR": 0, "MISSING": 0}
+        for run in self.runs if runs is None else runs:
+            counts[self.statuses[run]] += 1
+        return counts
+
+    def close(self):
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
@@ -0,0 +1,82 @@
+import os
+import re
+
+from .run_config import MAX_SLURM_JOBS, SLURM_MAX_ARRAY_SIZE, SLURM_USERNAME, SLURM_RETRY_DELAY
+
+ARRAY_TASK_SCRIPT = "array_task.sh"
+
+ARRAY_SPEC_REGEX = re.compile(r"--array=0-(\d+)%(\d+)")
+
+# Counts every running or pending task of the user, including each pending task of a job array (-r)
+QUEUED_TASKS_CMD = f"squeue -u {SLURM_USERNAME} -h -r | wc -l"
+
+# Runs line (OFFSET + SLURM_ARRAY_TASK_ID + 1) of the manifest
+ARRAY_TASK_BODY = """#! /bin/bash
+MANIFEST="$1"
+OFFSET="$2"
+LINE=$((OFFSET + SLURM_ARRAY_TASK_ID + 1))
+CMD=$(sed -n "${LINE}p" "$MANIFEST")
+if [ -z "$CMD" ]; then
+  echo "[ERR] No command at line $LINE of $MANIFEST" >&2
+  exit 1
+fi
+eval "$CMD"
+"""
+
+def write_array_task_script(script_dir):
+    task_script = f"{script_dir}/{ARRAY_TASK_SCRIPT}"
+    with open(task_script, "w") as f:
+        f.write(ARRAY_TASK_BODY)
+    os.system(f"chmod uog+x {task_script}")
+    return task_script
+
+def write_manifest(manifest_path, commands):
+    with open(manifest_path, "w") as f:
+        for cmd in commands:
+            f.write(f"{cmd}\n")
+
+def get_array_throttles(array_sizes, max_jobs=MAX_SLURM_JOBS):
+    # The arrays of a manifest run at the same time, so they share the job limit instead of each getting all of it.
+    # Shares are proportional to the array sizes so that all arrays drain at about the same time
+    num_tasks = sum(array_sizes)
+    throttles = [max(1, max_jobs * size // num_tasks) for size in array_sizes]
+    by_size = sorted(range(len(array_sizes)), key=lambda idx: array_sizes[idx], reverse=True)
+    for idx in by_size[:max(0, max_jobs - sum(throttles))]:
+        throttles[idx] += 1
+    # Every array runs at least one task at a time, which the larger arrays make up for
+    while sum(throttles) > max_jobs and throttles[by_size[0]] > 1:
+        throttles[by_size[0]] -= 1
+        by_size.sort(key=lambda idx: throttles[idx], reverse=True)
+    return throttles
+
+def get_array_submit_commands(sbatch_cmd, work_dir, partition_name, task_script, manifest_path, num_tasks, log_dir, job_name="ramulator2"):
+    # Slurm caps the size of a single array (MaxArraySize), so large manifests are split into several arrays
+    submit_commands = []
+    offsets = list(range(0, num_tasks, SLURM_MAX_ARRAY_SIZE))
+    array_sizes = [min(SLURM_MAX_ARRAY_SIZE, num_tasks - offset) for offset in offsets]
+    for offset, array_size, throttle in zip(offsets, array_sizes, get_array_throttles(array_sizes)):
+        sb_cmd = f"{sbatch_cmd} --chdir={work_dir} --output=/dev/null --error={log_dir}/array_%A.err --open-mode=append"
+        sb_cmd += f" --partition={partition_name} --job-name='{job_name}' --array=0-{array_size - 1}%{throttle}"
+        sb_cmd += f" {task_script} {manifest_path} {offset}"
+        submit_commands.append(sb_cmd)
+    return submit_commands
+
+def get_array_slots(sb_cmd):
+    # Number of tasks that a submitted array runs at the same time, None if the command does not submit an array
+    match = ARRAY_SPEC_REGEX.search(sb_cmd)
+    if match is None:
+        return None
+    return min(int(match.group(1)) + 1, int(match.group(2)))
+
+def get_queued_tasks():
+    return int(os.popen(QUEUED_TASKS_CMD).read())
+
+def get_array_wait_lines(submit_commands):
+    # Shell lines that wait until the arrays fit under MAX_SLURM_JOBS next to the other tasks of the user (see execute_run_script.py)
+    slots = min(MAX_SLURM_JOBS, sum(get_array_slots(sb_cmd) for sb_cmd in submit_commands))
+    return [
+        f"while [ $(( $({QUEUED_TASKS_CMD}) + {slots} )) -gt {MAX_SLURM_JOBS} ]; do",
+        f"  echo \"[INFO] Maximum Slurm Job limit ({MAX_SLURM_JOBS}) reached. Retrying in {SLURM_RETRY_DELAY} seconds\"",
+        f"  sleep {SLURM_RETRY_DELAY}",
+        "done"
+    ]
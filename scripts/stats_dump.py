@@ -0,0 +1,97 @@
+import os
+import json
+import glob
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from . import result_io
+from . import result_archive
+from .result_parser import open_file
+from .run_config import PARSE_JOBS, RESULT_FORMAT
+
+# Written by ramulator2 next to the text stats of a run when the config sets stats_dump_path (see config_gen.py)
+STATS_DUMP_SUFFIX = ".stats.json"
+
+def get_stats_dump_filename(config_filename):
+    # <result_dir>/<mitigation>/configs/<run>.yaml -> <result_dir>/<mitigation>/stats/<run>.stats.json
+    mitigation_dir = os.path.dirname(os.path.dirname(config_filename))
+    run_name = os.path.splitext(os.path.basename(config_filename))[0]
+    return f"{mitigation_dir}/stats/{run_name}{STATS_DUMP_SUFFIX}"
+
+def iter_stats(node):
+    # (component, stat name, value) of a component and its children, in the order ramulator2 prints them
+    component = node.get("id", node["impl"])
+    for name, value in node["stats"].items():
+        if isinstance(value, list):
+            for idx, val in enumerate(value):
+                yield component, f"{name}_{idx}", val
+        else:
+            yield component, name, value
+    for child in node["children"]:
+        yield from iter_stats(child)
+
+def flatten_stats(document):
+    # Maps every stat of the run to its value. Stat names are unique across the components of a run, except for
+    # components that exist more than once (e.g., the controllers of a multi-channel system), whose stats are
+    # named <stat>[<component id>] instead
+    stats = []
+    for top_level in document.values():
+        stats += list(iter_stats(top_level))
+    name_counts = {}
+    for _, name, _ in stats:
+        name_counts[name] = name_counts.get(name, 0) + 1
+    flat = {}
+    for component, name, value in stats:
+        if name_counts[name] > 1:
+            name = f"{name}[{component}]"
+            while name in flat:
+                name += "'"
+        flat[name] = value
+    return flat
+
+def load_stats_dump(dump_filename, open_file=open_file):
+    with open_file(dump_filename) as f:
+        return flatten_stats(json.load(f))
+
+def list_stats_dumps(result_dir):
+    dumps = set(glob.glob(f"{result_dir}/*/stats/*{STATS_DUMP_SUFFIX}"))
+    index = result_archive.get_archive_index(result_dir)
+    dumps |= set(path for path in index if path.endswith(STATS_DUMP_SUFFIX) and result_archive.is_archived(index, path))
+    return sorted(dumps)
+
+def load_run_stats(result_dir, dump_filename):
+    open_file, _ = result_archive.get_file_access(result_dir)
+    row = {
+        "mitigation": os.path.basename(os.path.dirname(os.path.dirname(dump_filename))),
+        "run": os.path.basename(dump_filename)[:-len(STATS_DUMP_SUFFIX)]
+    }
+    row.update(load_stats_dump(dump_filename, open_file))
+    return row
+
+def load_stats_dir(result_dir, jobs=PARSE_JOBS):
+    # One row per finished run (<mitigation>, <run> = <stat_str>_<trace>) and one typed column per stat, so new
+    # counters show up without changes here. Stats that a run does not have (e.g., those of another mitigation) are <NA>
+    dumps = list_stats_dumps(result_dir)
+    if jobs > 1 and len(dumps) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            rows = list(executor.map(load_run_stats, [result_dir] * len(dumps), dumps, chunksize=max(1, len(dumps) // (jobs * 8))))
+    else:
+        rows = [load_run_stats(result_dir, dump) for dump in dumps]
+    return pd.DataFrame.from_records(rows).convert_dtypes()
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="StatsDump",
+        description="Collect the JSON stats of every finished run of a mix into a single table"
+    )
+    argparser.add_argument("result_dir")
+    argparser.add_argument("-j", "--jobs", type=int, default=PARSE_JOBS)
+    argparser.add_argument("--format", choices=result_io.RESULT_FORMATS, default=RESULT_FORMAT)
+    args = argparser.parse_args()
+
+    df = load_stats_dir(args.result_dir, args.jobs)
+    csv_dir = f"{args.result_dir}/_csvs"
+    os.makedirs(csv_dir, exist_ok=True)
+    result_io.write_result_df(df, csv_dir, "stats", args.format)
+    print(f"[INFO] Collected {len(df.columns) - 2} stats of {len(df)} runs to {csv_dir}")
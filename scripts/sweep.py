@@ -0,0 +1,143 @@
+import csv
+import json
+import yaml
+import hashlib
+import argparse
+import itertools
+from collections import namedtuple
+
+SWEEP_KINDS = ["multicore", "singlecore"]
+BLOCK_KEYS = {"name", "baselines", "set", "product", "zip", "exclude"}
+
+# One simulated parameter point, params follows the parameter order of the sweep
+SweepPoint = namedtuple("SweepPoint", ["params", "block", "run_id"])
+
+def load_sweep(sweep_file):
+    with open(sweep_file, "r") as f:
+        sweep = yaml.safe_load(f)
+    if not isinstance(sweep, dict) or not isinstance(sweep.get("parameters"), list):
+        raise ValueError(f"{sweep_file} does not define the sweep parameters")
+    names = set()
+    for kind in SWEEP_KINDS:
+        for block in sweep.get(kind, []):
+            check_block(sweep, block)
+            if block["name"] in names:
+                raise ValueError(f"block {block['name']} is defined more than once")
+            names.add(block["name"])
+    for kind in SWEEP_KINDS:
+        for block in sweep.get(kind, []):
+            unknown = set(block.get("baselines", [])) - names
+            if len(unknown) > 0:
+                raise ValueError(f"block {block['name']} refers to unknown baselines {', '.join(sorted(unknown))}")
+    return sweep
+
+def check_block(sweep, block):
+    if "name" not in block:
+        raise ValueError(f"sweep block {block} has no name")
+    unknown_keys = set(block) - BLOCK_KEYS
+    if len(unknown_keys) > 0:
+        raise ValueError(f"block {block['name']} has unknown keys {', '.join(sorted(unknown_keys))}")
+    parameters = set(sweep["parameters"])
+    for key in ["set", "product", "zip"]:
+        unknown = set(block.get(key, {})) - parameters
+        if len(unknown) > 0:
+            raise ValueError(f"block {block['name']} sets unknown parameters {', '.join(sorted(unknown))}")
+    zip_lengths = set(len(values) for values in block.get("zip", {}).values())
+    if len(zip_lengths) > 1:
+        raise ValueError(f"zipped parameters of block {block['name']} have different lengths")
+    unset = parameters - set(sweep.get("defaults", {})) - set(block.get("set", {})) - set(block.get("product", {})) - set(block.get("zip", {}))
+    if len(unset) > 0:
+        raise ValueError(f"block {block['name']} does not set parameters {', '.join(sorted(unset))}")
+
+def get_run_id(parameters, params):
+    # Stable identifier of a point, independent of the block and the position of the point in the sweep
+    point = json.dumps(dict(zip(parameters, params)), sort_keys=True)
+    return hashlib.sha1(point.encode()).hexdigest()[:12]
+
+def is_excluded(point, exclusions):
+    for condition in exclusions:
+        if all(point[param] in (values if isinstance(values, list) else [values]) for param, values in condition.items()):
+            return True
+    return False
+
+def expand_block(sweep, block):
+    # Product axes and the zipped axis are iterated in the parameter order, the zipped axis at its first parameter
+    parameters = sweep["parameters"]
+    base = {**sweep.get("defaults", {}), **block.get("set", {})}
+    product = block.get("product", {})
+    zipped = block.get("zip", {})
+    axes = []
+    zip_position = min((parameters.index(param) for param in zipped), default=None)
+    for position, param in enumerate(parameters):
+        if param in product:
+            axes.append([{param: value} for value in product[param]])
+        if position == zip_position:
+            axes.append([dict(zip(zipped, values)) for values in zip(*zipped.values())])
+    points = []
+    for fragments in itertools.product(*axes):
+        point = dict(base)
+        for fragment in fragments:
+            point.update(fragment)
+        if not is_excluded(point, block.get("exclude", [])):
+            points.append(tuple(point[param] for param in parameters))
+    return points
+
+def get_selected_blocks(sweep, blocks):
+    # Selected blocks and, recursively, their named baselines, None selects every block
+    all_blocks = {block["name"]: block for kind in SWEEP_KINDS for block in sweep.get(kind, [])}
+    if blocks is None:
+        return set(all_blocks)
+    unknown = set(blocks) - set(all_blocks)
+    if len(unknown) > 0:
+        raise ValueError(f"unknown sweep blocks {', '.join(sorted(unknown))}")
+    selected = set()
+    pending = list(blocks)
+    while len(pending) > 0:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending += all_blocks[name].get("baselines", [])
+    return selected
+
+def get_sweep_points(sweep, kind, blocks=None):
+    selected = get_selected_blocks(sweep, blocks)
+    points = []
+    seen = set()
+    for block in sweep.get(kind, []):
+        if block["name"] not in selected:
+            continue
+        for params in expand_block(sweep, block):
+            if params in seen:
+                continue
+            seen.add(params)
+            points.append(SweepPoint(params, block["name"], get_run_id(sweep["parameters"], params)))
+    return points
+
+def write_sweep_manifest(sweep, blocks, manifest_file):
+    with open(manifest_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["run_id", "kind", "block"] + sweep["parameters"])
+        for kind in SWEEP_KINDS:
+            for point in get_sweep_points(sweep, kind, blocks):
+                writer.writerow([point.run_id, kind, point.block] + list(point.params))
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="Sweep",
+        description="List the parameter points of a sweep specification"
+    )
+    argparser.add_argument("sweep_file")
+    argparser.add_argument("-b", "--blocks", nargs="*", default=None, help="blocks to list (default: every block), their baselines are included")
+    argparser.add_argument("-v", "--verbose", action="store_true", help="list every point")
+    args = argparser.parse_args()
+
+    sweep = load_sweep(args.sweep_file)
+    for kind in SWEEP_KINDS:
+        points = get_sweep_points(sweep, kind, args.blocks)
+        block_counts = {}
+        for point in points:
+            block_counts[point.block] = block_counts.get(point.block, 0) + 1
+        print(f"[INFO] {kind}: {len(points)} points ({', '.join(f'{block}: {count}' for block, count in block_counts.items())})")
+        if args.verbose:
+            for point in points:
+                print(f"  {point.run_id} {point.block} {' '.join(str(param) for param in point.params)}")
@@ -0,0 +1,57 @@
+import numpy as np
+
+# Binary trace layout read by BHO3Core::Trace (little-endian): "BHTR", uint32 version, uint64 number of instructions,
+# followed by one record per instruction laid out like BHO3Core::Inst
+BINARY_TRACE_MAGIC = b"BHTR"
+BINARY_TRACE_VERSION = 1
+BINARY_TRACE_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("num_insts", "<u8")])
+BINARY_TRACE_RECORD = np.dtype([("bubble_count", "<i4"), ("padding", "<i4"), ("load_addr", "<i8"), ("store_addr", "<i8")])
+
+WHITESPACE = np.frombuffer(b" \t\r", dtype=np.uint8)
+NEWLINE = ord("\n")
+
+def make_binary_header(num_insts):
+    return np.array([(BINARY_TRACE_MAGIC, BINARY_TRACE_VERSION, num_insts)], dtype=BINARY_TRACE_HEADER)
+
+def parse_text_trace(data):
+    # Each line is "<bubble_count> <load_addr> [<store_addr>]", lines without a store get -1
+    chars = np.frombuffer(data, dtype=np.uint8)
+    is_newline = chars == NEWLINE
+    is_separator = np.isin(chars, WHITESPACE) | is_newline
+    token_starts = np.flatnonzero(~is_separator & np.concatenate(([True], is_separator[:-1])))
+    line_ids = np.cumsum(is_newline)[token_starts]
+    line_ids, tokens_per_line = np.unique(line_ids, return_counts=True)
+    if len(line_ids) == 0:
+        return np.zeros(0, dtype=BINARY_TRACE_RECORD)
+    if np.any((tokens_per_line != 2) & (tokens_per_line != 3)):
+        bad_line = line_ids[(tokens_per_line != 2) & (tokens_per_line != 3)][0] + 1
+        raise ValueError(f"line {bad_line} does not have 2 or 3 tokens")
+    tokens = np.array(data.split(), dtype=np.int64)
+    first_tokens = np.concatenate(([0], np.cumsum(tokens_per_line)[:-1]))
+    records = np.zeros(len(line_ids), dtype=BINARY_TRACE_RECORD)
+    records["bubble_count"] = tokens[first_tokens]
+    records["load_addr"] = tokens[first_tokens + 1]
+    records["store_addr"] = np.where(tokens_per_line == 3, tokens[np.minimum(first_tokens + 2, len(tokens) - 1)], -1)
+    return records
+
+def read_trace_records(path, chunk_bytes):
+    # Yields the records of a text or binary trace in chunks of about chunk_bytes, text chunks end at a line break
+    with open(path, "rb") as f:
+        head = f.read(BINARY_TRACE_HEADER.itemsize)
+        if head[:len(BINARY_TRACE_MAGIC)] == BINARY_TRACE_MAGIC:
+            header = np.frombuffer(head, dtype=BINARY_TRACE_HEADER)[0]
+            if header["version"] != BINARY_TRACE_VERSION:
+                raise ValueError(f"unsupported binary trace version {header['version']}")
+            record_bytes = max(1, chunk_bytes // BINARY_TRACE_RECORD.itemsize) * BINARY_TRACE_RECORD.itemsize
+            for data in iter(lambda: f.read(record_bytes), b""):
+                yield np.frombuffer(data, dtype=BINARY_TRACE_RECORD)
+            return
+        rest = head
+        for data in iter(lambda: f.read(chunk_bytes), b""):
+            data = rest + data
+            end = data.rfind(b"\n") + 1
+            rest = data[end:]
+            if end > 0:
+                yield parse_text_trace(data[:end])
+        if rest.strip():
+            yield parse_text_trace(rest)
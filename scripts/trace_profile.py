@@ -0,0 +1,266 @@
+import os
+import pickle
+import sqlite3
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from .trace_format import read_trace_records
+
+TRACE_PROFILE_FILENAME = "trace_profiles.sqlite"
+TRACE_PROFILE_VERSION = 1
+
+TRACE_CHUNK_BYTES = 32 << 20
+HASH_CHUNK_SIZE = 1 << 20
+
+# Cache line and DRAM row granularity of the access stream, and the per-core LLC capacity of base_config.yaml
+LINE_BITS = 6
+ROW_BITS = 13
+LLC_CAPACITY_BYTES = 2 << 20
+
+# Reuse times (number of accesses between two accesses to the same line) are kept in a log-scale histogram
+REUSE_BINS_PER_OCTAVE = 8
+NUM_REUSE_BINS = 64 * REUSE_BINS_PER_OCTAVE
+
+def get_reuse_bins(reuse_times):
+    bins = np.floor(np.log2(reuse_times.astype(np.float64)) * REUSE_BINS_PER_OCTAVE).astype(np.int64)
+    return np.minimum(bins, NUM_REUSE_BINS - 1)
+
+def get_trace_checksum(path):
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def analyze_trace(path):
+    # Streams the trace once in chunks. Every load and store (the store of a record follows its load) is an access to
+    # the LLC, each record retires its bubbles and its load as instructions (see BHO3Core::tick)
+    num_insts = 0
+    num_loads = 0
+    num_stores = 0
+    num_cold = 0
+    num_row_hits = 0
+    prev_row = None
+    reuse_hist = np.zeros(NUM_REUSE_BINS, dtype=np.int64)
+    # Sorted lines seen so far and the position of their last access
+    seen_lines = np.zeros(0, dtype=np.int64)
+    last_positions = np.zeros(0, dtype=np.int64)
+    position = 0
+    for records in read_trace_records(path, TRACE_CHUNK_BYTES):
+        if len(records) == 0:
+            continue
+        num_insts += int(records["bubble_count"].sum(dtype=np.int64)) + len(records)
+        num_loads += int(np.count_nonzero(records["load_addr"] != -1))
+        num_stores += int(np.count_nonzero(records["store_addr"] != -1))
+        addrs = np.column_stack((records["load_addr"], records["store_addr"])).ravel()
+        addrs = addrs[addrs != -1]
+        if len(addrs) == 0:
+            continue
+
+        rows = addrs >> ROW_BITS
+        num_row_hits += int(np.count_nonzero(rows[1:] == rows[:-1])) + int(prev_row == rows[0])
+        prev_row = rows[-1]
+
+        lines = addrs >> LINE_BITS
+        positions = np.arange(position, position + len(lines), dtype=np.int64)
+        position += len(lines)
+        order = np.argsort(lines, kind="stable")
+        sorted_lines = lines[order]
+        sorted_positions = positions[order]
+        is_first = np.concatenate(([True], sorted_lines[1:] != sorted_lines[:-1]))
+        is_last = np.concatenate((sorted_lines[1:] != sorted_lines[:-1], [True]))
+
+        # Reuses within the chunk are consecutive positions of the same line, the first access of every line in the
+        # chunk reuses its last access in an earlier chunk (or is a cold access)
+        chunk_reuses = np.diff(sorted_positions)[~is_first[1:]]
+        first_lines = sorted_lines[is_first]
+        insert_idx = np.searchsorted(seen_lines, first_lines)
+        found = insert_idx < len(seen_lines)
+        found[found] = seen_lines[insert_idx[found]] == first_lines[found]
+        prev_reuses = sorted_positions[is_first][found] - last_positions[insert_idx[found]]
+        num_cold += int(np.count_nonzero(~found))
+        reuse_hist += np.bincount(get_reuse_bins(np.concatenate((chunk_reuses, prev_reuses))), minlength=NUM_REUSE_BINS)
+
+        chunk_last_positions = sorted_positions[is_last]
+        last_positions[insert_idx[found]] = chunk_last_positions[found]
+        seen_lines = np.insert(seen_lines, insert_idx[~found], first_lines[~found])
+        last_positions = np.insert(last_positions, insert_idx[~found], chunk_last_positions[~found])
+
+    if num_insts == 0:
+        raise ValueError("empty trace")
+    return {
+        "num_insts": num_insts,
+        "num_loads": num_loads,
+        "num_stores": num_stores,
+        "num_cold": num_cold,
+        "num_row_hits": num_row_hits,
+        "footprint_lines": len(seen_lines),
+        "reuse_hist": reuse_hist,
+    }
+
+def get_stack_distances(profile):
+    # StatStack estimate of the LRU stack distance at the upper edge of every reuse time bin: the expected stack
+    # distance of reuse time t is the sum of P(reuse time > k) over k < t, cold accesses never being reused
+    reuse_hist = profile["reuse_hist"]
+    num_accesses = reuse_hist.sum() + profile["num_cold"]
+    if num_accesses == 0:
+        return np.zeros(NUM_REUSE_BINS)
+    edges = 2 ** (np.arange(NUM_REUSE_BINS + 1) / REUSE_BINS_PER_OCTAVE)
+    survival = (num_accesses - np.concatenate(([0], np.cumsum(reuse_hist)[:-1])) - reuse_hist / 2) / num_accesses
+    return 1 + np.cumsum(np.diff(edges) * survival)
+
+def estimate_misses(profile, capacity_lines):
+    # Misses of a fully-associative LRU cache: cold accesses and reuses whose stack distance exceeds the capacity
+    reuse_hist = profile["reuse_hist"]
+    stack_distances = get_stack_distances(profile)
+    miss_bin = int(np.searchsorted(stack_distances, capacity_lines))
+    if miss_bin >= NUM_REUSE_BINS:
+        return profile["num_cold"]
+    lower = stack_distances[miss_bin - 1] if miss_bin > 0 else 1
+    miss_fraction = (stack_distances[miss_bin] - capacity_lines) / max(stack_distances[miss_bin] - lower, 1e-9)
+    return profile["num_cold"] + reuse_hist[miss_bin + 1:].sum() + reuse_hist[miss_bin] * min(max(miss_fraction, 0), 1)
+
+def get_median_reuse_distance(profile):
+    reuse_hist = profile["reuse_hist"]
+    if reuse_hist.sum() == 0:
+        return np.nan
+    median_bin = int(np.searchsorted(np.cumsum(reuse_hist), reuse_hist.sum() / 2))
+    return get_stack_distances(profile)[median_bin]
+
+def get_profile_metrics(profile, llc_capacity_bytes=LLC_CAPACITY_BYTES):
+    num_accesses = profile["num_loads"] + profile["num_stores"]
+    misses = estimate_misses(profile, llc_capacity_bytes >> LINE_BITS)
+    kilo_insts = profile["num_insts"] / 1000
+    return {
+        # Load misses estimated with the miss ratio of the whole access stream
+        "MPKI": misses * profile["num_loads"] / max(num_accesses, 1) / kilo_insts,
+        "APKI": num_accesses / kilo_insts,
+        "footprint_mb": (profile["footprint_lines"] << LINE_BITS) / (1 << 20),
+        "row_locality": profile["num_row_hits"] / max(num_accesses - 1, 1),
+        "reuse_distance_p50": get_median_reuse_distance(profile),
+    }
+
+def open_profile_store(store_path):
+    conn = sqlite3.connect(store_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS traces (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, checksum TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS profiles (checksum TEXT PRIMARY KEY, profile BLOB)")
+    version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if version is None or version[0] != TRACE_PROFILE_VERSION:
+        conn.execute("DELETE FROM traces")
+        conn.execute("DELETE FROM profiles")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (TRACE_PROFILE_VERSION,))
+        conn.commit()
+    return conn
+
+def load_stored_profile(conn, checksum):
+    row = conn.execute("SELECT profile FROM profiles WHERE checksum = ?", (checksum,)).fetchone()
+    return pickle.loads(row[0]) if row is not None else None
+
+def profile_trace(path, store_path):
+    # Profiles are keyed by the trace content, so a renamed or copied trace reuses the profile of the original
+    checksum = get_trace_checksum(path)
+    conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+    profile = load_stored_profile(conn, checksum)
+    conn.close()
+    return checksum, profile if profile is not None else analyze_trace(path)
+
+def get_trace_profiles(trace_dir, traces, jobs=None, store_path=None):
+    # Returns {trace: profile}, analyzing only the traces whose size or modification time changed since they were profiled
+    if store_path is None:
+        store_path = f"{trace_dir}/{TRACE_PROFILE_FILENAME}"
+    conn = open_profile_store(store_path)
+    profiles = {}
+    pending = {}
+    for trace in traces:
+        path = f"{trace_dir}/{trace}"
+        st = os.stat(path)
+        row = conn.execute("SELECT size, mtime_ns, checksum FROM traces WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        profile = load_stored_profile(conn, row[2]) if row is not None and row[:2] == (st.st_size, st.st_mtime_ns) else None
+        if profile is not None:
+            profiles[trace] = profile
+        else:
+            pending[trace] = (path, st)
+
+    if len(pending) > 0:
+        print(f"[INFO] Profiling {len(pending)} traces ({len(profiles)} cached in {store_path})")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {trace: executor.submit(profile_trace, path, store_path) for trace, (path, _) in pending.items()}
+            for trace, future in futures.items():
+                checksum, profile = future.result()
+                path, st = pending[trace]
+                conn.execute("INSERT OR REPLACE INTO traces VALUES (?, ?, ?, ?)", (os.path.abspath(path), st.st_size, st.st_mtime_ns, checksum))
+                conn.execute("INSERT OR REPLACE INTO profiles VALUES (?, ?)", (checksum, pickle.dumps(profile, protocol=pickle.HIGHEST_PROTOCOL)))
+                conn.commit()
+                profiles[trace] = profile
+    conn.close()
+    return profiles
+
+def get_trace_checksums(paths, jobs=None):
+    # Returns {path: checksum}, hashing only the traces whose size or modification time changed since they were hashed.
+    # Checksums share the traces table of the profile store in the directory of each trace
+    checksums = {}
+    pending = {}
+    for trace_dir in sorted(set(os.path.dirname(os.path.abspath(path)) for path in paths)):
+        conn = open_profile_store(f"{trace_dir}/{TRACE_PROFILE_FILENAME}")
+        for path in paths:
+            if os.path.dirname(os.path.abspath(path)) != trace_dir:
+                continue
+            st = os.stat(path)
+            row = conn.execute("SELECT size, mtime_ns, checksum FROM traces WHERE path = ?", (os.path.abspath(path),)).fetchone()
+            if row is not None and row[:2] == (st.st_size, st.st_mtime_ns):
+                checksums[path] = row[2]
+            else:
+                pending[path] = st
+        conn.close()
+
+    if len(pending) > 0:
+        print(f"[INFO] Hashing {len(pending)} traces")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {path: executor.submit(get_trace_checksum, path) for path in pending}
+            for path, future in futures.items():
+                checksums[path] = future.result()
+        for trace_dir in sorted(set(os.path.dirname(os.path.abspath(path)) for path in pending)):
+            conn = open_profile_store(f"{trace_dir}/{TRACE_PROFILE_FILENAME}")
+            conn.executemany("INSERT OR REPLACE INTO traces VALUES (?, ?, ?, ?)", [
+                (os.path.abspath(path), st.st_size, st.st_mtime_ns, checksums[path])
+                for path, st in pending.items() if os.path.dirname(os.path.abspath(path)) == trace_dir
+            ])
+            conn.commit()
+            conn.close()
+    return checksums
+
+def get_profile_df(trace_dir, traces, jobs=None, store_path=None, llc_capacity_bytes=LLC_CAPACITY_BYTES):
+    profiles = get_trace_profiles(trace_dir, traces, jobs, store_path)
+    return pd.DataFrame([
+        {"benchmark": trace, **get_profile_metrics(profiles[trace], llc_capacity_bytes)} for trace in traces
+    ], columns=["benchmark", "MPKI", "APKI", "footprint_mb", "row_locality", "reuse_distance_p50"])
+
+def list_traces(trace_dir):
+    return sorted(name for name in os.listdir(trace_dir)
+                  if os.path.isfile(f"{trace_dir}/{name}") and not name.endswith((".csv", ".sqlite")))
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        prog="TraceProfile",
+        description="Estimate the memory intensity of CPU traces without simulating them"
+    )
+    argparser.add_argument("trace_dir")
+    argparser.add_argument("-t", "--traces", nargs="*", help="trace names to profile (default: every file in trace_dir except .csv and .sqlite files)")
+    argparser.add_argument("-j", "--jobs", type=int, default=None, help="number of traces profiled in parallel (default: number of CPU cores)")
+    argparser.add_argument("-s", "--store", default=None, help=f"profile store (default: <trace_dir>/{TRACE_PROFILE_FILENAME})")
+    argparser.add_argument("-o", "--output", default=None, help="write the profiles as a csv file (e.g., <trace_dir>/mpki.csv)")
+    argparser.add_argument("--llc_capacity_mb", type=float, default=LLC_CAPACITY_BYTES / (1 << 20), help="per-core LLC capacity the MPKI is estimated for")
+    args = argparser.parse_args()
+
+    trace_dir = args.trace_dir.rstrip("/")
+    traces = args.traces if args.traces is not None else list_traces(trace_dir)
+    df = get_profile_df(trace_dir, traces, args.jobs, args.store, int(args.llc_capacity_mb * (1 << 20)))
+    if args.output is not None:
+        df.to_csv(args.output, index=False)
+        print(f"[INFO] Wrote the profiles of {len(df)} traces to {args.output}")
+    else:
+        print(df.to_string(index=False))
@@ -1,10 +1,12 @@
 import os
 import yaml
-import copy
 import argparse
 import pandas as pd
 
 from scripts.run_config import *
+from scripts.config_gen import write_configs, write_override_configs, get_config_args
+from scripts.sweep import write_sweep_manifest
+from scripts.result_store import ResultStore
 
 argparser = argparse.ArgumentParser(
     prog="RunPersonal",
@@ -16,6 +18,11 @@ argparser.add_argument("-bc", "--base_config")
 argparser.add_argument("-tc", "--trace_combination")
 argparser.add_argument("-td", "--trace_directory")
 argparser.add_argument("-rd", "--result_directory")
+argparser.add_argument("-sw", "--sweep_file", default=SWEEP_FILE)
+argparser.add_argument("-sb", "--sweep_blocks", nargs="*", default=SWEEP_BLOCKS)
+argparser.add_argument("-cm", "--config_mode", choices=["file", "override"], default=CONFIG_MODE)
+argparser.add_argument("-st", "--result_store", default=RESULT_STORE)
+argparser.add_argument("--no_result_store", action="store_true")
 
 args = argparser.parse_args()
 
@@ -24,6 +31,10 @@ BASE_CONFIG_FILE = args.base_config
 TRACE_COMBINATION_FILE = args.trace_combination
 TRACE_DIR = args.trace_directory
 RESULT_DIR = args.result_directory
+SWEEP_FILE = args.sweep_file
+SWEEP_BLOCKS = args.sweep_blocks
+CONFIG_MODE = args.config_mode
+RESULT_STORE = None if args.no_result_store else args.result_store
 
 CMD_HEADER = "#! /bin/bash"
 BASE_CMD = f"{WORK_DIR}/ramulator2"
@@ -56,7 +67,7 @@ with open(TRACE_COMBINATION_FILE, "r") as f:
         TRACE_COMBS[trace_name] = traces
         TRACE_TYPES[trace_name] = trace_type
 
-for mitigation in mitigation_list + ["Dummy", "BlockHammer"]:
+for mitigation in get_sweep_mitigations(SWEEP_FILE, SWEEP_BLOCKS):
     for path in [
             f"{RESULT_DIR}/{mitigation}/stats",
             f"{RESULT_DIR}/{mitigation}/configs",
@@ -66,57 +77,41 @@ for mitigation in mitigation_list + ["Dummy", "BlockHammer"]:
         if not os.path.exists(path):
             os.makedirs(path)
 
-def get_singlecore_run_commands():
+def get_singlecore_run_commands(config_groups):
     run_commands = []
-    singlecore_params = get_singlecore_params_list()
+    singlecore_params = get_singlecore_params_list(SWEEP_FILE, SWEEP_BLOCKS)
     singlecore_traces, _ = get_trace_lists(TRACE_COMBINATION_FILE)
     for config in singlecore_params:
         mitigation, throttle_type, _, tRH, flat_thresh, dynamic_thresh = config
         stat_str = make_stat_str(config[1:])
+        group_runs = config_groups.setdefault(tuple(config), [])
         for trace in singlecore_traces:
             result_filename = f"{RESULT_DIR}/{mitigation}/stats/{stat_str}_{trace}.txt"
             config_filename = f"{RESULT_DIR}/{mitigation}/configs/{stat_str}_{trace}.yaml"
             cmd_count_filename = f"{RESULT_DIR}/{mitigation}/cmd_count/{stat_str}_{trace}.cmd.count"
             latency_dump_filename = f"{RESULT_DIR}/{mitigation}/mem_latency/{stat_str}_{trace}.memlat.dump"
-            config = copy.deepcopy(BASE_CONFIG)
-
-            config["Frontend"]["lat_dump_path"] = latency_dump_filename 
-            config["MemorySystem"][CONTROLLER]["plugins"][0]["ControllerPlugin"]["path"] = cmd_count_filename
-            config["MemorySystem"][CONTROLLER]["RowPolicy"]["cap"] = COLUMN_CAP 
-            config["MemorySystem"][CONTROLLER]["plugins"].append({
-                "ControllerPlugin": {
-                    "impl": "Throttler",
-                    "throttle_type": throttle_type,
-                    "throttle_flat_thresh": flat_thresh,
-                    "throttle_dynamic_thresh": dynamic_thresh,
-                    "window_period_ns": 64000000, 
-                    "snapshot_clk": -1,
-                    "blacklist_max_mshr": 5,
-                    "blacklist_mshr_decrement": 1,
-                    "breakhammer_plus": True
-                }
-            })
-                
-            config["Frontend"]["traces"] = [f"{TRACE_DIR}/{trace}"]
-
-            add_mitigation(config, mitigation, tRH)
-
-            config_file = open(config_filename, "w")
-            yaml.dump(config, config_file, default_flow_style=False)
-            config_file.close()
-
-            cmd = f"{BASE_CMD} -f {config_filename} > {result_filename} 2>&1"           
+
+            traces = [f"{TRACE_DIR}/{trace}"]
+            run = (config_filename, traces, [], latency_dump_filename, cmd_count_filename)
+            # Skipped runs keep their config so that check_run_status.sh can simulate them again
+            group_runs.append(run)
+            if result_store is not None and result_store.reuse_run(tuple(config), run):
+                continue
+            config_args = get_config_args(CONFIG_MODE, RESULT_DIR, config, run)
+
+            cmd = f"{BASE_CMD} {config_args} > {result_filename} 2>&1"           
             run_commands.append(cmd)
 
     return run_commands
 
-def get_multicore_run_commands():
+def get_multicore_run_commands(config_groups):
     run_commands = []
-    multicore_params = get_multicore_params_list()
+    multicore_params = get_multicore_params_list(SWEEP_FILE, SWEEP_BLOCKS)
     _, multicore_traces = get_trace_lists(TRACE_COMBINATION_FILE)
     for config in multicore_params:
         mitigation, throttle_type, _, tRH, flat_thresh, dynamic_thresh = config
         stat_str = make_stat_str(config[1:])
+        group_runs = config_groups.setdefault(tuple(config), [])
         for trace in multicore_traces:
             trace_comb = TRACE_COMBS[trace]
             trace_type = TRACE_TYPES[trace]
@@ -125,24 +120,6 @@ def get_multicore_run_commands():
             config_filename = f"{RESULT_DIR}/{mitigation}/configs/{stat_str}_{trace}.yaml"
             cmd_count_filename = f"{RESULT_DIR}/{mitigation}/cmd_count/{stat_str}_{trace}.cmd.count"
             latency_dump_filename = f"{RESULT_DIR}/{mitigation}/mem_latency/{stat_str}_{trace}.memlat.dump"
-            config = copy.deepcopy(BASE_CONFIG)
-
-            config["Frontend"]["lat_dump_path"] = latency_dump_filename 
-            config["MemorySystem"][CONTROLLER]["plugins"][0]["ControllerPlugin"]["path"] = cmd_count_filename
-            config["MemorySystem"][CONTROLLER]["RowPolicy"]["cap"] = COLUMN_CAP 
-            config["MemorySystem"][CONTROLLER]["plugins"].append({
-                "ControllerPlugin": {
-                    "impl": "Throttler",
-                    "throttle_type": throttle_type,
-                    "throttle_flat_thresh": flat_thresh,
-                    "throttle_dynamic_thresh": dynamic_thresh,
-                    "window_period_ns": 64000000, 
-                    "snapshot_clk": -1,
-                    "blacklist_max_mshr": 5,
-                    "blacklist_mshr_decrement": 1,
-                    "breakhammer_plus": True
-                }
-            })
 
             traces = []
             no_wait_traces = []
@@ -153,24 +130,32 @@ def get_multicore_run_commands():
                     traces.append(cur_trace)
                 else:
                     no_wait_traces.append(cur_trace)
-                
-            config["Frontend"]["traces"] = traces
-            if len(no_wait_traces) > 0:
-                config["Frontend"]["no_wait_traces"] = no_wait_traces
-
-            add_mitigation(config, mitigation, tRH)
 
-            config_file = open(config_filename, "w")
-            yaml.dump(config, config_file, default_flow_style=False)
-            config_file.close()
+            run = (config_filename, traces, no_wait_traces, latency_dump_filename, cmd_count_filename)
+            # Skipped runs keep their config so that check_run_status.sh can simulate them again
+            group_runs.append(run)
+            if result_store is not None and result_store.reuse_run(tuple(config), run):
+                continue
+            config_args = get_config_args(CONFIG_MODE, RESULT_DIR, config, run)
 
-            cmd = f"{BASE_CMD} -f {config_filename} > {result_filename} 2>&1"           
+            cmd = f"{BASE_CMD} {config_args} > {result_filename} 2>&1"           
             run_commands.append(cmd)
 
     return run_commands
 
-single_cmds = get_singlecore_run_commands()
-multi_cmds = get_multicore_run_commands()
+result_store = ResultStore(RESULT_STORE, BASE_CONFIG, BASE_CMD) if RESULT_STORE is not None else None
+
+# Runs that share a parameter configuration are generated from a single base config
+config_groups = {}
+single_cmds = get_singlecore_run_commands(config_groups)
+multi_cmds = get_multicore_run_commands(config_groups)
+if result_store is not None:
+    result_store.close()
+if CONFIG_MODE == "override":
+    write_override_configs(BASE_CONFIG, config_groups, RESULT_DIR)
+else:
+    write_configs(BASE_CONFIG, config_groups)
+write_sweep_manifest(get_sweep(SWEEP_FILE), SWEEP_BLOCKS, f"{RESULT_DIR}/sweep_points.csv")
 
 with open("run.sh", "w") as f:
     for cmd in single_cmds + multi_cmds:
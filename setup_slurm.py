@@ -1,10 +1,14 @@
 import os
 import yaml
-import copy
 import argparse
 import pandas as pd
 
 from scripts.run_config import *
+from scripts.config_gen import write_configs, write_override_configs, get_config_args
+from scripts.sweep import write_sweep_manifest
+from scripts.result_store import ResultStore
+from scripts.job_cost import sort_longest_first
+from scripts.slurm_array import write_array_task_script, write_manifest, get_array_submit_commands
 
 argparser = argparse.ArgumentParser(
     prog="RunSlurm",
@@ -16,7 +20,13 @@ argparser.add_argument("-bc", "--base_config")
 argparser.add_argument("-tc", "--trace_combination")
 argparser.add_argument("-td", "--trace_directory")
 argparser.add_argument("-rd", "--result_directory")
+argparser.add_argument("-sw", "--sweep_file", default=SWEEP_FILE)
+argparser.add_argument("-sb", "--sweep_blocks", nargs="*", default=SWEEP_BLOCKS)
+argparser.add_argument("-cm", "--config_mode", choices=["file", "override"], default=CONFIG_MODE)
+argparser.add_argument("-st", "--result_store", default=RESULT_STORE)
+argparser.add_argument("--no_result_store", action="store_true")
 argparser.add_argument("-pn", "--partition_name")
+argparser.add_argument("-ja", "--job_array", action="store_true")
 
 args = argparser.parse_args()
 
@@ -25,7 +35,12 @@ BASE_CONFIG_FILE = args.base_config
 TRACE_COMBINATION_FILE = args.trace_combination
 TRACE_DIR = args.trace_directory
 RESULT_DIR = args.result_directory
+SWEEP_FILE = args.sweep_file
+SWEEP_BLOCKS = args.sweep_blocks
+CONFIG_MODE = args.config_mode
+RESULT_STORE = None if args.no_result_store else args.result_store
 PARTITION_NAME = args.partition_name
+JOB_ARRAY = args.job_array
 
 SBATCH_CMD = "sbatch --cpus-per-task=1 --nodes=1 --ntasks=1"
 
@@ -60,7 +75,7 @@ with open(TRACE_COMBINATION_FILE, "r") as f:
         TRACE_COMBS[trace_name] = traces
         TRACE_TYPES[trace_name] = trace_type
 
-for mitigation in mitigation_list + ["Dummy", "BlockHammer"]:
+for mitigation in get_sweep_mitigations(SWEEP_FILE, SWEEP_BLOCKS):
     for path in [
             f"{RESULT_DIR}/{mitigation}/stats",
             f"{RESULT_DIR}/{mitigation}/errors",
@@ -71,50 +86,39 @@ for mitigation in mitigation_list + ["Dummy", "BlockHammer"]:
         if not os.path.exists(path):
             os.makedirs(path)
 
-def get_singlecore_run_commands():
+def get_singlecore_run_commands(config_groups):
     run_commands = []
-    singlecore_params = get_singlecore_params_list()
+    singlecore_params = get_singlecore_params_list(SWEEP_FILE, SWEEP_BLOCKS)
     singlecore_traces, _ = get_trace_lists(TRACE_COMBINATION_FILE)
     for config in singlecore_params:
         mitigation, throttle_type, _, tRH, flat_thresh, dynamic_thresh = config
         stat_str = make_stat_str(config[1:])
+        group_runs = config_groups.setdefault(tuple(config), [])
         for trace in singlecore_traces:
             result_filename = f"{RESULT_DIR}/{mitigation}/stats/{stat_str}_{trace}.txt"
             error_filename = f"{RESULT_DIR}/{mitigation}/errors/{stat_str}_{trace}.txt"
             config_filename = f"{RESULT_DIR}/{mitigation}/configs/{stat_str}_{trace}.yaml"
             cmd_count_filename = f"{RESULT_DIR}/{mitigation}/cmd_count/{stat_str}_{trace}.cmd.count"
             latency_dump_filename = f"{RESULT_DIR}/{mitigation}/mem_latency/{stat_str}_{trace}.memlat.dump"
-            config = copy.deepcopy(BASE_CONFIG)
-
-            config["Frontend"]["lat_dump_path"] = latency_dump_filename 
-            config["MemorySystem"][CONTROLLER]["plugins"][0]["ControllerPlugin"]["path"] = cmd_count_filename
-            config["MemorySystem"][CONTROLLER]["RowPolicy"]["cap"] = COLUMN_CAP 
-            config["MemorySystem"][CONTROLLER]["plugins"].append({
-                "ControllerPlugin": {
-                    "impl": "Throttler",
-                    "throttle_type": throttle_type,
-                    "throttle_flat_thresh": flat_thresh,
-                    "throttle_dynamic_thresh": dynamic_thresh,
-                    "window_period_ns": 64000000, 
-                    "snapshot_clk": -1,
-                    "blacklist_max_mshr": 5,
-                    "blacklist_mshr_decrement": 1,
-                    "breakhammer_plus": True
-                }
-            })
-                
-            config["Frontend"]["traces"] = [f"{TRACE_DIR}/{trace}"]
-
-            add_mitigation(config, mitigation, tRH)
-
-            config_file = open(config_filename, "w")
-            yaml.dump(config, config_file, default_flow_style=False)
-            config_file.close()
+
+            traces = [f"{TRACE_DIR}/{trace}"]
+            run = (config_filename, traces, [], latency_dump_filename, cmd_count_filename)
+            # Skipped runs keep their config and run script so that check_run_status.sh can simulate them again
+            group_runs.append(run)
+            config_args = get_config_args(CONFIG_MODE, RESULT_DIR, config, run)
+            reused = result_store is not None and result_store.reuse_run(tuple(config), run)
+
+            if JOB_ARRAY:
+                if not reused:
+                    run_commands.append(f"{CMD} {config_args} > {result_filename} 2> {error_filename}")
+                continue
 
             sbatch_filename = f"{WORK_DIR}/run_scripts/{mitigation}_{stat_str}_{trace}.sh"
             sbatch_file = open(sbatch_filename, "w")
-            sbatch_file.write(f"{CMD_HEADER}\n{CMD} -f {config_filename}\n")
+            sbatch_file.write(f"{CMD_HEADER}\n{CMD} {config_args}\n")
             sbatch_file.close()
+            if reused:
+                continue
 
             job_name = f"ramulator2"
             sb_cmd = f"{SBATCH_CMD} --chdir={WORK_DIR} --output={result_filename}"
@@ -124,37 +128,20 @@ def get_singlecore_run_commands():
             run_commands.append(sb_cmd)
     return run_commands
 
-def get_multicore_run_commands():
+def get_multicore_run_commands(config_groups):
     run_commands = []
-    multicore_params = get_multicore_params_list()
+    multicore_params = get_multicore_params_list(SWEEP_FILE, SWEEP_BLOCKS)
     _, multicore_traces = get_trace_lists(TRACE_COMBINATION_FILE)
     for config in multicore_params:
         mitigation, throttle_type, _, tRH, flat_thresh, dynamic_thresh = config
         stat_str = make_stat_str(config[1:])
+        group_runs = config_groups.setdefault(tuple(config), [])
         for trace in multicore_traces:
             result_filename = f"{RESULT_DIR}/{mitigation}/stats/{stat_str}_{trace}.txt"
             error_filename = f"{RESULT_DIR}/{mitigation}/errors/{stat_str}_{trace}.txt"
             config_filename = f"{RESULT_DIR}/{mitigation}/configs/{stat_str}_{trace}.yaml"
             cmd_count_filename = f"{RESULT_DIR}/{mitigation}/cmd_count/{stat_str}_{trace}.cmd.count"
             latency_dump_filename = f"{RESULT_DIR}/{mitigation}/mem_latency/{stat_str}_{trace}.memlat.dump"
-            config = copy.deepcopy(BASE_CONFIG)
-
-            config["Frontend"]["lat_dump_path"] = latency_dump_filename 
-            config["MemorySystem"][CONTROLLER]["plugins"][0]["ControllerPlugin"]["path"] = cmd_count_filename
-            config["MemorySystem"][CONTROLLER]["RowPolicy"]["cap"] = COLUMN_CAP 
-            config["MemorySystem"][CONTROLLER]["plugins"].append({
-                "ControllerPlugin": {
-                    "impl": "Throttler",
-                    "throttle_type": throttle_type,
-                    "throttle_flat_thresh": flat_thresh,
-                    "throttle_dynamic_thresh": dynamic_thresh,
-                    "window_period_ns": 64000000, 
-                    "snapshot_clk": -1,
-                    "blacklist_max_mshr": 5,
-                    "blacklist_mshr_decrement": 1,
-                    "breakhammer_plus": True
-                }
-            })
 
             trace_comb = TRACE_COMBS[trace]
             trace_type = TRACE_TYPES[trace]
@@ -167,21 +154,24 @@ def get_multicore_run_commands():
                     traces.append(cur_trace)
                 else:
                     no_wait_traces.append(cur_trace)
-                
-            config["Frontend"]["traces"] = traces
-            if len(no_wait_traces) > 0:
-                config["Frontend"]["no_wait_traces"] = no_wait_traces
 
-            add_mitigation(config, mitigation, tRH)
+            run = (config_filename, traces, no_wait_traces, latency_dump_filename, cmd_count_filename)
+            # Skipped runs keep their config and run script so that check_run_status.sh can simulate them again
+            group_runs.append(run)
+            config_args = get_config_args(CONFIG_MODE, RESULT_DIR, config, run)
+            reused = result_store is not None and result_store.reuse_run(tuple(config), run)
 
-            config_file = open(config_filename, "w")
-            yaml.dump(config, config_file, default_flow_style=False)
-            config_file.close()
+            if JOB_ARRAY:
+                if not reused:
+                    run_commands.append(f"{CMD} {config_args} > {result_filename} 2> {error_filename}")
+                continue
 
             sbatch_filename = f"{WORK_DIR}/run_scripts/{mitigation}_{stat_str}_{trace}.sh"
             sbatch_file = open(sbatch_filename, "w")
-            sbatch_file.write(f"{CMD_HEADER}\n{CMD} -f {config_filename}\n")
+            sbatch_file.write(f"{CMD_HEADER}\n{CMD} {config_args}\n")
             sbatch_file.close()
+            if reused:
+                continue
 
             job_name = f"ramulator2"
             sb_cmd = f"{SBATCH_CMD} --chdir={WORK_DIR} --output={result_filename}"
@@ -194,12 +184,34 @@ def get_multicore_run_commands():
 os.system(f"rm -r {WORK_DIR}/run_scripts")
 os.system(f"mkdir -p {WORK_DIR}/run_scripts")
 
-single_cmds = get_singlecore_run_commands()
-multi_cmds = get_multicore_run_commands()
+result_store = ResultStore(RESULT_STORE, BASE_CONFIG, CMD) if RESULT_STORE is not None else None
+
+# Runs that share a parameter configuration are generated from a single base config
+config_groups = {}
+single_cmds = get_singlecore_run_commands(config_groups)
+multi_cmds = get_multicore_run_commands(config_groups)
+if result_store is not None:
+    result_store.close()
+if CONFIG_MODE == "override":
+    write_override_configs(BASE_CONFIG, config_groups, RESULT_DIR)
+else:
+    write_configs(BASE_CONFIG, config_groups)
+write_sweep_manifest(get_sweep(SWEEP_FILE), SWEEP_BLOCKS, f"{RESULT_DIR}/sweep_points.csv")
+
+run_cmds = single_cmds + multi_cmds
+if JOB_ARRAY:
+    # Array tasks read the manifest when they start, so it must outlive the run_scripts directory of the next setup
+    manifest_dir = f"{WORK_DIR}/run_manifests"
+    os.system(f"mkdir -p {manifest_dir}")
+    mix_name = os.path.splitext(os.path.basename(TRACE_COMBINATION_FILE))[0]
+    manifest_filename = f"{manifest_dir}/{mix_name}.txt"
+    write_manifest(manifest_filename, sort_longest_first(run_cmds, TRACE_COMBINATION_FILE))
+    task_script = write_array_task_script(manifest_dir)
+    run_cmds = get_array_submit_commands(SBATCH_CMD, WORK_DIR, PARTITION_NAME, task_script, manifest_filename, len(run_cmds), manifest_dir)
 
 with open("run.sh", "w") as f:
     f.write(f"{CMD_HEADER}\n")
-    for cmd in single_cmds + multi_cmds:
+    for cmd in run_cmds:
         f.write(f"{cmd}\n")
 
 os.system("chmod uog+x run.sh")
\ No newline at end of file
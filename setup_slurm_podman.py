@@ -1,10 +1,15 @@
 import os
 import yaml
-import copy
 import argparse
 import pandas as pd
 
 from scripts.run_config import *
+from scripts.config_gen import write_configs, write_override_configs, get_config_args
+from scripts.sweep import write_sweep_manifest
+from scripts.result_store import ResultStore
+from scripts.job_cost import sort_longest_first
+from scripts.slurm_array import write_manifest
+from scripts.podman_node import PODMAN_TASK_SCRIPT, PODMAN_WORKER_SCRIPT, write_podman_scripts, reset_manifest_claims, get_worker_submit_commands
 
 argparser = argparse.ArgumentParser(
     prog="RunPodmanSlurm",
@@ -16,7 +21,13 @@ argparser.add_argument("-bc", "--base_config")
 argparser.add_argument("-tc", "--trace_combination")
 argparser.add_argument("-td", "--trace_directory")
 argparser.add_argument("-rd", "--result_directory")
+argparser.add_argument("-sw", "--sweep_file", default=SWEEP_FILE)
+argparser.add_argument("-sb", "--sweep_blocks", nargs="*", default=SWEEP_BLOCKS)
+argparser.add_argument("-cm", "--config_mode", choices=["file", "override"], default=CONFIG_MODE)
+argparser.add_argument("-st", "--result_store", default=RESULT_STORE)
+argparser.add_argument("--no_result_store", action="store_true")
 argparser.add_argument("-pn", "--partition_name")
+argparser.add_argument("-nw", "--node_workers", type=int, default=PODMAN_NODE_WORKERS)
 
 args = argparser.parse_args()
 
@@ -25,7 +36,12 @@ BASE_CONFIG_FILE = args.base_config
 TRACE_COMBINATION_FILE = args.trace_combination
 TRACE_DIR = args.trace_directory
 RESULT_DIR = args.result_directory
+SWEEP_FILE = args.sweep_file
+SWEEP_BLOCKS = args.sweep_blocks
+CONFIG_MODE = args.config_mode
+RESULT_STORE = None if args.no_result_store else args.result_store
 PARTITION_NAME = args.partition_name
+NODE_WORKERS = args.node_workers
 
 HOST_RESULT_DIR = RESULT_DIR.replace("/app", WORK_DIR)
 
@@ -33,7 +49,11 @@ SBATCH_CMD = "sbatch --cpus-per-task=1 --nodes=1 --ntasks=1"
 
 CMD_HEADER = "#! /bin/bash"
 CMD = "/app/ramulator2"
-LOAD_CMD = f"podman load --quiet -i {WORK_DIR}/breakhammer_artifact.tar"
+
+# The Podman scripts are read when the jobs start, so they must outlive the run_scripts directory of the next setup
+MANIFEST_DIR = f"{WORK_DIR}/run_manifests"
+PODMAN_MANIFEST_DIR = "/app/run_manifests"
+TASK_CMD = f"{MANIFEST_DIR}/{PODMAN_TASK_SCRIPT} {WORK_DIR}"
 
 BASE_CONFIG = None
 
@@ -63,7 +83,7 @@ with open(TRACE_COMBINATION_FILE, "r") as f:
         TRACE_COMBS[trace_name] = traces
         TRACE_TYPES[trace_name] = trace_type
 
-for mitigation in mitigation_list + ["Dummy", "BlockHammer"]:
+for mitigation in get_sweep_mitigations(SWEEP_FILE, SWEEP_BLOCKS):
     for path in [
             f"{RESULT_DIR}/{mitigation}/stats",
             f"{RESULT_DIR}/{mitigation}/errors",
@@ -74,51 +94,34 @@ for mitigation in mitigation_list + ["Dummy", "BlockHammer"]:
         if not os.path.exists(path):
             os.makedirs(path)
 
-def get_singlecore_run_commands():
+def get_singlecore_run_commands(config_groups, worker_commands):
     run_commands = []
-    singlecore_params = get_singlecore_params_list()
+    singlecore_params = get_singlecore_params_list(SWEEP_FILE, SWEEP_BLOCKS)
     singlecore_traces, _ = get_trace_lists(TRACE_COMBINATION_FILE)
     for config in singlecore_params:
         mitigation, throttle_type, _, tRH, flat_thresh, dynamic_thresh = config
         stat_str = make_stat_str(config[1:])
+        group_runs = config_groups.setdefault(tuple(config), [])
         for trace in singlecore_traces:
             result_filename = f"{HOST_RESULT_DIR}/{mitigation}/stats/{stat_str}_{trace}.txt"
             error_filename = f"{HOST_RESULT_DIR}/{mitigation}/errors/{stat_str}_{trace}.txt"
             config_filename = f"{RESULT_DIR}/{mitigation}/configs/{stat_str}_{trace}.yaml"
             cmd_count_filename = f"{RESULT_DIR}/{mitigation}/cmd_count/{stat_str}_{trace}.cmd.count"
             latency_dump_filename = f"{RESULT_DIR}/{mitigation}/mem_latency/{stat_str}_{trace}.memlat.dump"
-            config = copy.deepcopy(BASE_CONFIG)
-
-            config["Frontend"]["lat_dump_path"] = latency_dump_filename 
-            config["MemorySystem"][CONTROLLER]["plugins"][0]["ControllerPlugin"]["path"] = cmd_count_filename
-            config["MemorySystem"][CONTROLLER]["RowPolicy"]["cap"] = COLUMN_CAP 
-            config["MemorySystem"][CONTROLLER]["plugins"].append({
-                "ControllerPlugin": {
-                    "impl": "Throttler",
-                    "throttle_type": throttle_type,
-                    "throttle_flat_thresh": flat_thresh,
-                    "throttle_dynamic_thresh": dynamic_thresh,
-                    "window_period_ns": 64000000, 
-                    "snapshot_clk": -1,
-                    "blacklist_max_mshr": 5,
-                    "blacklist_mshr_decrement": 1,
-                    "breakhammer_plus": True
-                }
-            })
-                
-            config["Frontend"]["traces"] = [f"{TRACE_DIR}/{trace}"]
-
-            add_mitigation(config, mitigation, tRH)
-
-            config_file = open(config_filename, "w")
-            yaml.dump(config, config_file, default_flow_style=False)
-            config_file.close()
+
+            traces = [f"{TRACE_DIR}/{trace}"]
+            run = (config_filename, traces, [], latency_dump_filename, cmd_count_filename)
+            # Skipped runs keep their config and run script so that check_run_status.sh can simulate them again
+            group_runs.append(run)
+            config_args = get_config_args(CONFIG_MODE, RESULT_DIR, config, run)
 
             sbatch_filename = f"{WORK_DIR}/run_scripts/{mitigation}_{stat_str}_{trace}.sh"
             podman_sbatch_filename = f"/app/run_scripts/{mitigation}_{stat_str}_{trace}.sh"
             sbatch_file = open(podman_sbatch_filename, "w")
-            sbatch_file.write(f"{CMD_HEADER}\n{LOAD_CMD}\npodman run --rm -v $PWD:/app breakhammer_artifact \"{CMD} -f {config_filename}\"\n")
+            sbatch_file.write(f"{CMD_HEADER}\n{TASK_CMD} {config_args}\n")
             sbatch_file.close()
+            if result_store is not None and result_store.reuse_run(tuple(config), run):
+                continue
 
             job_name = f"ramulator2"
             sb_cmd = f"{SBATCH_CMD} --chdir={WORK_DIR} --output={result_filename}"
@@ -126,39 +129,23 @@ def get_singlecore_run_commands():
             sb_cmd += f" {sbatch_filename}"
 
             run_commands.append(sb_cmd)
+            worker_commands.append(f"{CMD} {config_args} > {RESULT_DIR}/{mitigation}/stats/{stat_str}_{trace}.txt 2> {RESULT_DIR}/{mitigation}/errors/{stat_str}_{trace}.txt")
     return run_commands
 
-def get_multicore_run_commands():
+def get_multicore_run_commands(config_groups, worker_commands):
     run_commands = []
-    multicore_params = get_multicore_params_list()
+    multicore_params = get_multicore_params_list(SWEEP_FILE, SWEEP_BLOCKS)
     _, multicore_traces = get_trace_lists(TRACE_COMBINATION_FILE)
     for config in multicore_params:
         mitigation, throttle_type, _, tRH, flat_thresh, dynamic_thresh = config
         stat_str = make_stat_str(config[1:])
+        group_runs = config_groups.setdefault(tuple(config), [])
         for trace in multicore_traces:
             result_filename = f"{HOST_RESULT_DIR}/{mitigation}/stats/{stat_str}_{trace}.txt"
             error_filename = f"{HOST_RESULT_DIR}/{mitigation}/errors/{stat_str}_{trace}.txt"
             config_filename = f"{RESULT_DIR}/{mitigation}/configs/{stat_str}_{trace}.yaml"
             cmd_count_filename = f"{RESULT_DIR}/{mitigation}/cmd_count/{stat_str}_{trace}.cmd.count"
             latency_dump_filename = f"{RESULT_DIR}/{mitigation}/mem_latency/{stat_str}_{trace}.memlat.dump"
-            config = copy.deepcopy(BASE_CONFIG)
-
-            config["Frontend"]["lat_dump_path"] = latency_dump_filename 
-            config["MemorySystem"][CONTROLLER]["plugins"][0]["ControllerPlugin"]["path"] = cmd_count_filename
-            config["MemorySystem"][CONTROLLER]["RowPolicy"]["cap"] = COLUMN_CAP 
-            config["MemorySystem"][CONTROLLER]["plugins"].append({
-                "ControllerPlugin": {
-                    "impl": "Throttler",
-                    "throttle_type": throttle_type,
-                    "throttle_flat_thresh": flat_thresh,
-                    "throttle_dynamic_thresh": dynamic_thresh,
-                    "window_period_ns": 64000000, 
-                    "snapshot_clk": -1,
-                    "blacklist_max_mshr": 5,
-                    "blacklist_mshr_decrement": 1,
-                    "breakhammer_plus": True
-                }
-            })
 
             trace_comb = TRACE_COMBS[trace]
             trace_type = TRACE_TYPES[trace]
@@ -171,22 +158,19 @@ def get_multicore_run_commands():
                     traces.append(cur_trace)
                 else:
                     no_wait_traces.append(cur_trace)
-                
-            config["Frontend"]["traces"] = traces
-            if len(no_wait_traces) > 0:
-                config["Frontend"]["no_wait_traces"] = no_wait_traces
 
-            add_mitigation(config, mitigation, tRH)
-
-            config_file = open(config_filename, "w")
-            yaml.dump(config, config_file, default_flow_style=False)
-            config_file.close()
+            run = (config_filename, traces, no_wait_traces, latency_dump_filename, cmd_count_filename)
+            # Skipped runs keep their config and run script so that check_run_status.sh can simulate them again
+            group_runs.append(run)
+            config_args = get_config_args(CONFIG_MODE, RESULT_DIR, config, run)
 
             sbatch_filename = f"{WORK_DIR}/run_scripts/{mitigation}_{stat_str}_{trace}.sh"
             podman_sbatch_filename = f"/app/run_scripts/{mitigation}_{stat_str}_{trace}.sh"
             sbatch_file = open(podman_sbatch_filename, "w")
-            sbatch_file.write(f"{CMD_HEADER}\n{LOAD_CMD}\npodman run --rm -v $PWD:/app breakhammer_artifact \"{CMD} -f {config_filename}\"\n")
+            sbatch_file.write(f"{CMD_HEADER}\n{TASK_CMD} {config_args}\n")
             sbatch_file.close()
+            if result_store is not None and result_store.reuse_run(tuple(config), run):
+                continue
 
             job_name = f"ramulator2"
             sb_cmd = f"{SBATCH_CMD} --chdir={WORK_DIR} --output={result_filename}"
@@ -194,17 +178,43 @@ def get_multicore_run_commands():
             sb_cmd += f" {sbatch_filename}"
 
             run_commands.append(sb_cmd)
+            worker_commands.append(f"{CMD} {config_args} > {RESULT_DIR}/{mitigation}/stats/{stat_str}_{trace}.txt 2> {RESULT_DIR}/{mitigation}/errors/{stat_str}_{trace}.txt")
     return run_commands
 
 os.system(f"rm -r /app/run_scripts")
 os.system(f"mkdir -p /app/run_scripts")
-
-single_cmds = get_singlecore_run_commands()
-multi_cmds = get_multicore_run_commands()
+os.system(f"mkdir -p {PODMAN_MANIFEST_DIR}")
+write_podman_scripts(PODMAN_MANIFEST_DIR)
+
+result_store = ResultStore(RESULT_STORE, BASE_CONFIG, CMD) if RESULT_STORE is not None else None
+
+# Runs that share a parameter configuration are generated from a single base config
+config_groups = {}
+worker_cmds = []
+single_cmds = get_singlecore_run_commands(config_groups, worker_cmds)
+multi_cmds = get_multicore_run_commands(config_groups, worker_cmds)
+if result_store is not None:
+    result_store.close()
+if CONFIG_MODE == "override":
+    write_override_configs(BASE_CONFIG, config_groups, RESULT_DIR)
+else:
+    write_configs(BASE_CONFIG, config_groups)
+write_sweep_manifest(get_sweep(SWEEP_FILE), SWEEP_BLOCKS, f"{RESULT_DIR}/sweep_points.csv")
+
+run_cmds = single_cmds + multi_cmds
+if NODE_WORKERS > 0:
+    # Each worker loads the image and starts one container that drains the manifest, longest simulations first
+    mix_name = os.path.splitext(os.path.basename(TRACE_COMBINATION_FILE))[0]
+    manifest_filename = f"{mix_name}_podman.txt"
+    write_manifest(f"{PODMAN_MANIFEST_DIR}/{manifest_filename}", sort_longest_first(worker_cmds, TRACE_COMBINATION_FILE))
+    reset_manifest_claims(f"{PODMAN_MANIFEST_DIR}/{manifest_filename}")
+    num_workers = min(NODE_WORKERS, len(worker_cmds))
+    run_cmds = get_worker_submit_commands(SBATCH_CMD, WORK_DIR, PARTITION_NAME, f"{MANIFEST_DIR}/{PODMAN_WORKER_SCRIPT}",
+                                          f"{PODMAN_MANIFEST_DIR}/{manifest_filename}", num_workers, MANIFEST_DIR)
 
 with open("run.sh", "w") as f:
     f.write(f"{CMD_HEADER}\n")
-    for cmd in single_cmds + multi_cmds:
+    for cmd in run_cmds:
         f.write(f"{cmd}\n")
     
 os.system("chmod uog+x run.sh")
\ No newline at end of file
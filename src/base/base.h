@@ -187,6 +187,31 @@ class Implementation {
       emitter << YAML::Newline;
     };
 
+    /**
+     * @brief    Recursively print the stats of myself and all my childs as a JSON object
+     *
+     */
+    virtual void print_stats_json(std::ostream& os) {
+      os << "{\"ifce\": ";
+      JSON::emit_string(os, get_ifce_name());
+      os << ", \"impl\": ";
+      JSON::emit_string(os, get_name());
+      if (get_id() != "_default_id") {
+        os << ", \"id\": ";
+        JSON::emit_string(os, get_id());
+      }
+      os << ", \"stats\": {";
+      emit_json(os, m_stats);
+      os << "}, \"children\": [";
+      for (size_t i = 0; i < m_children.size(); i++) {
+        if (i > 0) {
+          os << ", ";
+        }
+        m_children[i]->print_stats_json(os);
+      }
+      os << "]}";
+    };
+
     std::string get_id() const { return m_id; };
     void set_id(std::string id) { m_id = id; };
 
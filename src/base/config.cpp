@@ -66,21 +66,17 @@ void Config::Details::resolve_included_configs(YAML::Node node) {
 
 
 void Config::Details::override_configs(YAML::Node config, const std::vector<std::string>& params) {
-  // Get the key-value pairs from the command line options
-  std::map<std::string, std::string> kv;
+  // Get the key-value pairs from the command line options, kept in command line order so that
+  // sequence elements can be appended one after another (e.g., traces[0], traces[1], ..., traces[10])
+  std::vector<std::pair<std::string, std::string>> kv;
 
   for (const auto& param : params) {
-    std::stringstream ss(param);
-    std::string token;
-    std::vector<std::string> tokens;
-    while (std::getline(ss, token, '=')) {
-      tokens.push_back(std::move(token));
-    }
-
-    if (tokens.size() != 2 ) {
+    // Only the first '=' separates the key from the value, which can be a path that contains '='
+    size_t separator = param.find('=');
+    if (separator == std::string::npos || separator == 0) {
       spdlog::warn("Unrecognized parameter override {}. Ignoring it.", param);
     } else {
-      kv[tokens[0]] = tokens[1];
+      kv.emplace_back(param.substr(0, separator), param.substr(separator + 1));
     }
   }
 
@@ -9,4 +9,15 @@ YAML::Emitter& operator << (YAML::Emitter& emitter, const Stats& s) {
 	return emitter;
 }
 
+void emit_json(std::ostream& os, const Stats& s) {
+  bool first = true;
+  for (auto [stat_name, stat_ptr] : s._registry) {
+    if (!first) {
+      os << ", ";
+    }
+    stat_ptr->emit_json_to(os);
+    first = false;
+  }
+}
+
 }        // namespace Ramulator
@@ -1,9 +1,12 @@
 #ifndef     RAMULATOR_BASE_STATS_H
 #define     RAMULATOR_BASE_STATS_H
 
+#include <cmath>
 #include <vector>
 #include <string>
 #include <variant>
+#include <ostream>
+#include <type_traits>
 
 #include <spdlog/spdlog.h>
 #include <yaml-cpp/yaml.h>
@@ -18,8 +21,51 @@ class Implementation;
 class StatWrapperBase {
   public:
     virtual void emit_to(YAML::Emitter& emitter) = 0;
+    virtual void emit_json_to(std::ostream& os) = 0;
 };
 
+namespace JSON {
+
+inline void emit_string(std::ostream& os, const std::string& str) {
+  os << '"';
+  for (const char c : str) {
+    switch (c) {
+      case '"':  os << "\\\""; break;
+      case '\\': os << "\\\\"; break;
+      case '\n': os << "\\n"; break;
+      case '\t': os << "\\t"; break;
+      case '\r': os << "\\r"; break;
+      default:
+        if (static_cast<unsigned char>(c) < 0x20) {
+          os << fmt::format("\\u{:04x}", static_cast<int>(c));
+        } else {
+          os << c;
+        }
+    }
+  }
+  os << '"';
+}
+
+template<typename T>
+void emit_value(std::ostream& os, const T& val) {
+  if constexpr (std::is_same_v<T, bool>) {
+    os << (val ? "true" : "false");
+  } else if constexpr (std::is_floating_point_v<T>) {
+    // JSON has no representation of NaN and infinity
+    if (std::isfinite(val)) {
+      os << val;
+    } else {
+      os << "null";
+    }
+  } else if constexpr (std::is_arithmetic_v<T>) {
+    os << +val;
+  } else {
+    emit_string(os, val);
+  }
+}
+
+}        // namespace JSON
+
 template<typename T>
 class StatWrapper;
 
@@ -27,6 +73,7 @@ class Stats {
   template<typename T>
   friend class StatWrapper;
   friend YAML::Emitter& operator << (YAML::Emitter& emitter, const Stats& s);
+  friend void emit_json(std::ostream& os, const Stats& s);
 
   private:
     Registry_t<StatWrapperBase*> _registry;
@@ -89,8 +136,33 @@ class StatWrapper : public StatWrapperBase {
       }
 
     };
+
+    void emit_json_to(std::ostream& os) override {
+      JSON::emit_string(os, _name);
+      os << ": ";
+      if        (std::holds_alternative<T*>(_ref)) {
+        JSON::emit_value(os, *(std::get<T*>(_ref)));
+      } else if (std::holds_alternative<std::vector<T>*>(_ref)) {
+        os << "[";
+        bool first = true;
+        for (const auto _val : *(std::get<std::vector<T>*>(_ref))) {
+          if (!first) {
+            os << ", ";
+          }
+          JSON::emit_value(os, _val);
+          first = false;
+        }
+        os << "]";
+      }
+    };
 };
 
+/**
+ * @brief    Writes the stats as the members of a JSON object, in the same order as they are emitted to YAML
+ * 
+ */
+void emit_json(std::ostream& os, const Stats& s);
+
 }        // namespace Ramulator
 
 
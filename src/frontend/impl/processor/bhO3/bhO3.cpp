@@ -1,6 +1,7 @@
 #include <functional>
 #include <limits>
 
+#include "base/exception.h"
 #include "base/utils.h"
 #include "frontend/frontend.h"
 #include "translation/translation.h"
@@ -28,6 +29,11 @@ void BHO3::init() {
 
   int lat_hist_sensitivity = param<int>("lat_hist_sensitivity").default_val(5);
   std::string lat_dump_path = param<std::string>("lat_dump_path").default_val(std::string(""));
+  std::string lat_dump_format = param<std::string>("lat_dump_format").desc("Format of the latency histogram dump (text or binary).").default_val(std::string("text"));
+  if (lat_dump_format != "text" && lat_dump_format != "binary") {
+    throw ConfigurationError("Unknown latency dump format: {}", lat_dump_format);
+  }
+  bool lat_dump_binary = lat_dump_format == "binary";
 
   // LLC params
   int llc_latency           = param<int>("llc_latency").desc("Aggregated latency of the LLC.").default_val(47);
@@ -69,9 +75,10 @@ void BHO3::init() {
     auto* cur_translate = is_blocking ? m_translation : nullptr;
     // auto* cur_translate = m_translation;
     std::cout << "name_trace_" << id << ": " << active_list[active_id] << std::endl;
+    m_trace_names.push_back(active_list[active_id]);
     BHO3Core* core = new BHO3Core(id, ipc, depth,
       m_num_expected_insts, m_num_max_cycles, active_list[active_id],
-      cur_translate, m_llc, lat_hist_sensitivity, lat_dump_path, is_attacker, spec_type);
+      cur_translate, m_llc, lat_hist_sensitivity, lat_dump_path, lat_dump_binary, is_attacker, spec_type);
     core->m_callback = [this](Request& req){return this->receive(req);} ;
     m_cores.push_back(core);
   }
@@ -80,6 +87,7 @@ void BHO3::init() {
 
   // Register the stats
   register_stat(m_num_expected_insts).name("num_expected_insts");
+  register_stat(m_trace_names).name("name_trace");
   register_stat(m_llc->s_llc_eviction).name("llc_eviction");
   register_stat(m_llc->s_llc_read_access).name("llc_read_access");
   register_stat(m_llc->s_llc_write_access).name("llc_write_access");
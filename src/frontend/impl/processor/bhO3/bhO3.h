@@ -18,6 +18,7 @@ class BHO3 final : public IFrontEnd, public Implementation {
     int m_num_cores = -1;
     int m_num_blocking_cores = -1;
     std::vector<BHO3Core*> m_cores;
+    std::vector<std::string> m_trace_names;
     BHO3LLC* m_llc;
 
     size_t m_num_expected_insts = 0;
@@ -1,3 +1,11 @@
+#include <bit>
+#include <cstddef>
+#include <cstring>
+#include <algorithm>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 #include <filesystem>
 #include <iostream>
 #include <fstream>
@@ -19,7 +27,26 @@ BHO3Core::Trace::Trace(std::string file_path_str) {
     throw ConfigurationError("Trace {} does not exist!", file_path_str);
   }
 
-  std::ifstream trace_file(trace_path);
+  char magic[sizeof(BINARY_TRACE_MAGIC)] = {};
+  std::ifstream trace_file(trace_path, std::ios::binary);
+  if (!trace_file.is_open()) {
+    throw ConfigurationError("Trace {} cannot be opened!", file_path_str);
+  }
+  trace_file.read(magic, sizeof(magic));
+  trace_file.close();
+
+  if (std::memcmp(magic, BINARY_TRACE_MAGIC, sizeof(magic)) == 0) {
+    load_binary_trace(file_path_str);
+  } else {
+    load_text_trace(file_path_str);
+  }
+  if (m_trace_length == 0) {
+    throw ConfigurationError("Trace {} is empty!", file_path_str);
+  }
+}
+
+void BHO3Core::Trace::load_text_trace(const std::string& file_path_str) {
+  std::ifstream trace_file(file_path_str);
   if (!trace_file.is_open()) {
     throw ConfigurationError("Trace {} cannot be opened!", file_path_str);
   }
@@ -46,11 +73,55 @@ BHO3Core::Trace::Trace(std::string file_path_str) {
   }
 
   trace_file.close();
+  m_insts = m_trace.data();
   m_trace_length = m_trace.size();
 }
 
+void BHO3Core::Trace::load_binary_trace(const std::string& file_path_str) {
+  // The records are mapped as they are, so their layout must match Inst (int32 bubble count, 4 bytes padding, int64 addresses)
+  static_assert(std::endian::native == std::endian::little, "Binary traces are stored in little-endian order.");
+  static_assert(sizeof(Inst) == 24 && offsetof(Inst, load_addr) == 8 && offsetof(Inst, store_addr) == 16,
+                "Binary trace records do not match the Inst layout.");
+
+  int fd = open(file_path_str.c_str(), O_RDONLY);
+  if (fd < 0) {
+    throw ConfigurationError("Trace {} cannot be opened!", file_path_str);
+  }
+  struct stat trace_stat;
+  if (fstat(fd, &trace_stat) != 0 || trace_stat.st_size < (off_t) BINARY_TRACE_HEADER_SIZE) {
+    close(fd);
+    throw ConfigurationError("Trace {} format invalid!", file_path_str);
+  }
+  m_mapped_size = trace_stat.st_size;
+  m_mapped_trace = mmap(nullptr, m_mapped_size, PROT_READ, MAP_PRIVATE, fd, 0);
+  close(fd);
+  if (m_mapped_trace == MAP_FAILED) {
+    m_mapped_trace = nullptr;
+    throw ConfigurationError("Trace {} cannot be memory-mapped!", file_path_str);
+  }
+
+  const char* data = static_cast<const char*>(m_mapped_trace);
+  uint32_t version = 0;
+  uint64_t num_insts = 0;
+  std::memcpy(&version, data + 4, sizeof(version));
+  std::memcpy(&num_insts, data + 8, sizeof(num_insts));
+  if (version != BINARY_TRACE_VERSION || m_mapped_size != BINARY_TRACE_HEADER_SIZE + num_insts * sizeof(Inst)) {
+    munmap(m_mapped_trace, m_mapped_size);
+    m_mapped_trace = nullptr;
+    throw ConfigurationError("Trace {} format invalid!", file_path_str);
+  }
+  m_insts = reinterpret_cast<const Inst*>(data + BINARY_TRACE_HEADER_SIZE);
+  m_trace_length = num_insts;
+}
+
+BHO3Core::Trace::~Trace() {
+  if (m_mapped_trace != nullptr) {
+    munmap(m_mapped_trace, m_mapped_size);
+  }
+}
+
 const BHO3Core::Inst& BHO3Core::Trace::get_next_inst() {
-  const Inst& inst = m_trace[m_curr_trace_idx];
+  const Inst& inst = m_insts[m_curr_trace_idx];
   m_curr_trace_idx = (m_curr_trace_idx + 1) % m_trace_length;
   return inst;
 }
@@ -109,11 +180,11 @@ Clk_t BHO3Core::InstWindow::set_ready(Addr_t addr) {
 
 BHO3Core::BHO3Core(int id, int ipc, int depth, size_t num_expected_insts,
   uint64_t num_max_cycles, std::string trace_path, ITranslation* translation,
-  BHO3LLC* llc, int lat_hist_sens, std::string& dump_path, bool is_attacker,
+  BHO3LLC* llc, int lat_hist_sens, std::string& dump_path, bool dump_binary, bool is_attacker,
   Request::SpecType spec_type):
 m_id(id), m_window(ipc, depth), m_trace(trace_path),
 m_num_expected_insts(num_expected_insts), m_num_max_cycles(num_max_cycles), m_translation(translation),
-m_llc(llc), m_lat_hist_sens(lat_hist_sens), m_is_attacker(is_attacker), m_spec_type(spec_type) {
+m_llc(llc), m_lat_hist_sens(lat_hist_sens), m_dump_binary(dump_binary), m_is_attacker(is_attacker), m_spec_type(spec_type) {
   // Fetch the instructions and addresses for tick 0
   auto inst = m_trace.get_next_inst();
   m_num_bubbles = inst.bubble_count;
@@ -231,6 +302,10 @@ void BHO3Core::dump_latency_histogram() {
   if (m_dump_path == "") {
     return;
   }
+  if (m_dump_binary) {
+    dump_latency_histogram_binary();
+    return;
+  }
   std::ofstream output(m_dump_path);
   for (const auto& [bucket_base, count] : m_lat_histogram) {
     output << fmt::format("{}, {}", bucket_base, count) << std::endl;
@@ -238,4 +313,26 @@ void BHO3Core::dump_latency_histogram() {
   output.close();
 }
 
+void BHO3Core::dump_latency_histogram_binary() {
+  // Layout (little-endian): "BHLH", uint32 version, uint32 bucket size, uint32 number of buckets,
+  // followed by the sorted bucket bases (int64) and then their counts (uint64)
+  static_assert(std::endian::native == std::endian::little, "Binary latency dumps are written in little-endian order.");
+  std::vector<std::pair<int64_t, uint64_t>> histogram(m_lat_histogram.begin(), m_lat_histogram.end());
+  std::sort(histogram.begin(), histogram.end());
+  std::vector<int64_t> buckets;
+  std::vector<uint64_t> counts;
+  for (const auto& [bucket_base, count] : histogram) {
+    buckets.push_back(bucket_base);
+    counts.push_back(count);
+  }
+  uint32_t header[4] = {0, LAT_HIST_DUMP_VERSION, (uint32_t) m_lat_hist_sens, (uint32_t) histogram.size()};
+  std::memcpy(&header[0], LAT_HIST_DUMP_MAGIC, sizeof(uint32_t));
+
+  std::ofstream output(m_dump_path, std::ios::binary);
+  output.write(reinterpret_cast<const char*>(header), sizeof(header));
+  output.write(reinterpret_cast<const char*>(buckets.data()), buckets.size() * sizeof(int64_t));
+  output.write(reinterpret_cast<const char*>(counts.data()), counts.size() * sizeof(uint64_t));
+  output.close();
+}
+
 }        // namespace Ramulator
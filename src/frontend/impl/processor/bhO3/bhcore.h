@@ -27,11 +27,25 @@ class BHO3Core: public Clocked<BHO3Core> {
     friend class BHO3Core;
 
     std::vector<Inst> m_trace;
+    const Inst* m_insts = nullptr;      // Points to m_trace or to the memory-mapped binary trace
+    void* m_mapped_trace = nullptr;
+    size_t m_mapped_size = 0;
     size_t m_trace_length = 0;
     size_t m_curr_trace_idx = 0;
 
+    // Binary traces (see convert_traces.py) start with this header followed by the Inst records
+    static constexpr char BINARY_TRACE_MAGIC[4] = {'B', 'H', 'T', 'R'};
+    static constexpr uint32_t BINARY_TRACE_VERSION = 1;
+    static constexpr size_t BINARY_TRACE_HEADER_SIZE = 16;
+
+    void load_text_trace(const std::string& file_path_str);
+    void load_binary_trace(const std::string& file_path_str);
+
     public:
       Trace(std::string file_path_str);
+      Trace(const Trace&) = delete;
+      Trace& operator=(const Trace&) = delete;
+      ~Trace();
       const Inst& get_next_inst();
   };
 
@@ -104,10 +118,14 @@ class BHO3Core: public Clocked<BHO3Core> {
     int m_lat_hist_sens = 0;
     std::unordered_map<int, uint64_t> m_lat_histogram;
     std::filesystem::path m_dump_path;
+    bool m_dump_binary = false;
+    static constexpr char LAT_HIST_DUMP_MAGIC[4] = {'B', 'H', 'L', 'H'};
+    static constexpr uint32_t LAT_HIST_DUMP_VERSION = 1;
 
     bool m_is_attacker = false;
 
     void dump_latency_histogram();
+    void dump_latency_histogram_binary();
 
   /************************************************
    *              Core Statistics
@@ -123,7 +141,7 @@ class BHO3Core: public Clocked<BHO3Core> {
   public:
     BHO3Core(int id, int ipc, int depth,
       size_t num_expected_insts, uint64_t num_max_cycles, std::string trace_path,
-      ITranslation* translation, BHO3LLC* llc, int lat_hist_sens, std::string& dump_path, bool is_attacker, Request::SpecType spec_type);
+      ITranslation* translation, BHO3LLC* llc, int lat_hist_sens, std::string& dump_path, bool dump_binary, bool is_attacker, Request::SpecType spec_type);
 
     /**
      * @brief   Ticks the core.
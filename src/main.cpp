@@ -1,4 +1,8 @@
 #include <iostream>
+#include <fstream>
+#include <iomanip>
+#include <limits>
+#include <filesystem>
 
 #include <argparse/argparse.hpp>
 #include <spdlog/spdlog.h>
@@ -82,6 +86,16 @@ int main(int argc, char* argv[]) {
     config = Ramulator::Config::parse_config_file(config_file_path, params);
   }
 
+  // Are we also writing the statistics to a JSON document?
+  std::filesystem::path stats_dump_path = config["stats_dump_path"].as<std::string>("");
+  if (!stats_dump_path.empty()) {
+    // A document left by an earlier simulation of the same configuration must not be mistaken for the result of this one
+    std::filesystem::remove(stats_dump_path);
+    if (stats_dump_path.has_parent_path()) {
+      std::filesystem::create_directories(stats_dump_path.parent_path());
+    }
+  }
+
   // Instaniate the frontend of the simulated system, this is one of the top-level objects in Ramulator 2.0.
   // It also recursively instaniate all components in the frontend.
   auto frontend = Ramulator::Factory::create_frontend(config);
@@ -118,5 +132,24 @@ int main(int argc, char* argv[]) {
   frontend->finalize();
   memory_system->finalize();
 
+  if (!stats_dump_path.empty()) {
+    // Written to a temporary file first so that the document only appears once it is complete
+    std::filesystem::path stats_tmp_path = stats_dump_path;
+    stats_tmp_path += ".tmp";
+    std::ofstream stats_file(stats_tmp_path);
+    if (!stats_file) {
+      spdlog::error("Could not open the stats dump file {}!", stats_tmp_path.string());
+      std::exit(1);
+    }
+    stats_file << std::setprecision(std::numeric_limits<double>::max_digits10);
+    stats_file << "{\"Frontend\": ";
+    frontend->m_impl->print_stats_json(stats_file);
+    stats_file << ", \"MemorySystem\": ";
+    memory_system->m_impl->print_stats_json(stats_file);
+    stats_file << "}" << std::endl;
+    stats_file.close();
+    std::filesystem::rename(stats_tmp_path, stats_dump_path);
+  }
+
   return 0;
 }
\ No newline at end of file